@@ -29,9 +29,11 @@ import os
 
 from app.base import Base
 from app.timekeeping import models
-from app.models.core import Tenant, User, TenantSettings
+from app.models.core import Tenant, User, ApiKey, TenantSettings
 from app.models.crm import Client, Site
-from app.models.quoting import Deal, Quote, QuoteParam, QuoteLine, QuoteOverhead, QuoteTotals
+from app.models.quoting import Deal, Quote, QuoteSequence, QuoteParam, QuoteLine, QuoteOverhead, QuoteTotals, BomRule
+from app.models.ops import SlowRequest
+from app.models.catalog import CatalogItem, CatalogImport
 
 config = context.config
 fileConfig(config.config_file_name)
@@ -0,0 +1,21 @@
+"""quotes.is_template (quote cloning and templates)
+
+Revision ID: 0a6e3f9d2c58
+Revises: f6b2c8d41a73
+Create Date: 2026-03-19 13:36:08.942215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0a6e3f9d2c58'
+down_revision = 'f6b2c8d41a73'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('quotes', sa.Column('is_template', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+def downgrade():
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.drop_column('is_template')
@@ -0,0 +1,65 @@
+"""crew log snapshots + distance_km on segments
+
+Revision ID: 19f59f403438
+Revises: fe9be68fb91e
+Create Date: 2026-02-02 09:14:21.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '19f59f403438'
+down_revision = 'fe9be68fb91e'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('tk_crew_work_segments', sa.Column('distance_km', sa.Float(), nullable=True, server_default='0'))
+
+    op.create_table('tk_crew_log_snapshots',
+    sa.Column('crew_log_id', sa.Integer(), nullable=False),
+    sa.Column('work_date', sa.Date(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=True),
+    sa.Column('vehicle_plate', sa.String(length=32), nullable=True),
+    sa.Column('site_id', sa.Integer(), nullable=True),
+    sa.Column('site_name', sa.String(length=200), nullable=True),
+    sa.Column('work_minutes', sa.Integer(), nullable=False),
+    sa.Column('travel_minutes', sa.Integer(), nullable=False),
+    sa.Column('work_minutes_raw', sa.Float(), nullable=False),
+    sa.Column('travel_minutes_raw', sa.Float(), nullable=False),
+    sa.Column('km', sa.Float(), nullable=False),
+    sa.Column('segments_count', sa.Integer(), nullable=False),
+    sa.Column('employee_names', sa.JSON(), nullable=True),
+    sa.Column('sites', sa.JSON(), nullable=True),
+    sa.Column('locked_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['crew_log_id'], ['tk_crew_logs.id'], ),
+    sa.PrimaryKeyConstraint('crew_log_id')
+    )
+    op.create_index(op.f('ix_tk_crew_log_snapshots_work_date'), 'tk_crew_log_snapshots', ['work_date'], unique=False)
+    op.create_index(op.f('ix_tk_crew_log_snapshots_vehicle_id'), 'tk_crew_log_snapshots', ['vehicle_id'], unique=False)
+
+    op.create_table('tk_crew_log_snapshot_members',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('crew_log_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('employee_name', sa.String(length=200), nullable=True),
+    sa.Column('work_date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['crew_log_id'], ['tk_crew_log_snapshots.crew_log_id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('crew_log_id', 'employee_id', name='uq_tk_crew_log_snapshot_members_log_employee')
+    )
+    op.create_index(op.f('ix_tk_crew_log_snapshot_members_id'), 'tk_crew_log_snapshot_members', ['id'], unique=False)
+    op.create_index(op.f('ix_tk_crew_log_snapshot_members_crew_log_id'), 'tk_crew_log_snapshot_members', ['crew_log_id'], unique=False)
+    op.create_index(op.f('ix_tk_crew_log_snapshot_members_employee_id'), 'tk_crew_log_snapshot_members', ['employee_id'], unique=False)
+    op.create_index(op.f('ix_tk_crew_log_snapshot_members_work_date'), 'tk_crew_log_snapshot_members', ['work_date'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_tk_crew_log_snapshot_members_work_date'), table_name='tk_crew_log_snapshot_members')
+    op.drop_index(op.f('ix_tk_crew_log_snapshot_members_employee_id'), table_name='tk_crew_log_snapshot_members')
+    op.drop_index(op.f('ix_tk_crew_log_snapshot_members_crew_log_id'), table_name='tk_crew_log_snapshot_members')
+    op.drop_index(op.f('ix_tk_crew_log_snapshot_members_id'), table_name='tk_crew_log_snapshot_members')
+    op.drop_table('tk_crew_log_snapshot_members')
+    op.drop_index(op.f('ix_tk_crew_log_snapshots_vehicle_id'), table_name='tk_crew_log_snapshots')
+    op.drop_index(op.f('ix_tk_crew_log_snapshots_work_date'), table_name='tk_crew_log_snapshots')
+    op.drop_table('tk_crew_log_snapshots')
+    op.drop_column('tk_crew_work_segments', 'distance_km')
@@ -0,0 +1,42 @@
+"""ops_slow_requests (slow request ring buffer)
+
+Revision ID: 3c71a9e4d2f8
+Revises: 8e3f6a0d2b71
+Create Date: 2026-02-23 09:12:40.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3c71a9e4d2f8'
+down_revision = '8e3f6a0d2b71'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('ops_slow_requests',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=True),
+    sa.Column('user_id', sa.String(length=36), nullable=True),
+    sa.Column('method', sa.String(length=10), nullable=False),
+    sa.Column('route', sa.String(length=255), nullable=False),
+    sa.Column('path', sa.String(length=500), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('status', sa.Integer(), nullable=False),
+    sa.Column('duration_ms', sa.Float(), nullable=False),
+    sa.Column('db_ms', sa.Float(), nullable=False),
+    sa.Column('query_count', sa.Integer(), nullable=False),
+    sa.Column('sampled', sa.Boolean(), nullable=False),
+    sa.Column('statements', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ops_slow_requests_created_at'), 'ops_slow_requests', ['created_at'], unique=False)
+    op.create_index(op.f('ix_ops_slow_requests_tenant_id'), 'ops_slow_requests', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_ops_slow_requests_route'), 'ops_slow_requests', ['route'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_ops_slow_requests_route'), table_name='ops_slow_requests')
+    op.drop_index(op.f('ix_ops_slow_requests_tenant_id'), table_name='ops_slow_requests')
+    op.drop_index(op.f('ix_ops_slow_requests_created_at'), table_name='ops_slow_requests')
+    op.drop_table('ops_slow_requests')
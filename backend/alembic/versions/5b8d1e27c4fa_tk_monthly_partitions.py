@@ -0,0 +1,170 @@
+"""work_date on segments + monthly partitions of tk_crew_logs / tk_crew_work_segments (PG)
+
+Revision ID: 5b8d1e27c4fa
+Revises: 19f59f403438
+Create Date: 2026-02-09 10:41:07.113524
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '5b8d1e27c4fa'
+down_revision = '19f59f403438'
+branch_labels = None
+depends_on = None
+
+
+# PG: klucz partycji musi byc w PK i w kazdym UNIQUE, wiec PK to (id, work_date),
+# a FK na tk_crew_logs musi wskazywac (id, work_date). Segmenty dostaja wlasne work_date
+# i zlozony FK; czlonkowie i snapshoty trzymaja tylko crew_log_id, wiec ich FK znika
+# (spojnosc pilnuje aplikacja - logi nie sa usuwane).
+_LOG_INDEXES = ['created_by_employee_id', 'id', 'vehicle_id', 'work_date']
+_SEGMENT_INDEXES = ['crew_log_id', 'end_at', 'id', 'site_id', 'start_at', 'work_date']
+_LOG_FK_CHILDREN = [
+    ('tk_crew_log_members', 'tk_crew_log_members_crew_log_id_fkey'),
+    ('tk_crew_log_snapshots', 'tk_crew_log_snapshots_crew_log_id_fkey'),
+]
+
+# Kopia logiki z app/timekeeping/partitions.py z chwili tej migracji - migracja nie importuje
+# kodu aplikacji, zeby pozniejsze zmiany w nim nie zmienialy historii schematu.
+_PARTITIONED_TABLES = ('tk_crew_logs', 'tk_crew_work_segments')
+_MONTHS_AHEAD = 3
+
+
+def _add_months(d, n):
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def _create_default_partition(table):
+    op.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+
+def _create_month_partitions(start):
+    """Partycje od miesiaca `start` (brak danych: biezacy) do biezacy + _MONTHS_AHEAD."""
+    today = date.today()
+    first = date((start or today).year, (start or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), _MONTHS_AHEAD)
+    for table in _PARTITIONED_TABLES:
+        month = first
+        while month <= last:
+            hi = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{month.year:04d}_{month.month:02d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{hi.isoformat()}')"
+            )
+            month = hi
+
+
+def upgrade():
+    op.add_column('tk_crew_work_segments', sa.Column('work_date', sa.Date(), nullable=True))
+    op.execute(
+        "UPDATE tk_crew_work_segments SET work_date = "
+        "(SELECT l.work_date FROM tk_crew_logs l WHERE l.id = tk_crew_work_segments.crew_log_id)"
+    )
+    with op.batch_alter_table('tk_crew_work_segments') as batch_op:
+        batch_op.alter_column('work_date', existing_type=sa.Date(), nullable=False)
+    op.create_index(op.f('ix_tk_crew_work_segments_work_date'), 'tk_crew_work_segments', ['work_date'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_pg()
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_pg()
+
+    op.drop_index(op.f('ix_tk_crew_work_segments_work_date'), table_name='tk_crew_work_segments')
+    with op.batch_alter_table('tk_crew_work_segments') as batch_op:
+        batch_op.drop_column('work_date')
+
+
+def _drop_fks_to(bind, table):
+    # conparentid = 0: na partycjonowanej tabeli PG klonuje FK na kazda partycje (po obu
+    # stronach); klonow nie da sie usunac osobno - znikaja razem z FK rodzica
+    rows = bind.execute(sa.text(
+        "SELECT c.conname, c.conrelid::regclass::text FROM pg_constraint c "
+        "WHERE c.contype = 'f' AND c.confrelid = CAST(:t AS regclass) AND c.conparentid = 0"
+    ), {"t": table}).all()
+    for name, child in rows:
+        op.execute(f'ALTER TABLE {child} DROP CONSTRAINT "{name}"')
+
+
+def _swap_table(bind, table, partitioned):
+    """Przepina `table` na nowa tabele (partycjonowana albo zwykla) z tymi samymi kolumnami.
+
+    Sekwencja id zostaje ta sama (OWNED BY przenosimy przed DROP starej tabeli).
+    """
+    seq = bind.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    suffix = " PARTITION BY RANGE (work_date)" if partitioned else ""
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS){suffix}")
+    if seq:
+        op.execute(f"ALTER SEQUENCE {seq} OWNED BY {table}.id")
+    if partitioned:
+        _create_default_partition(table)
+
+
+def _copy_and_drop_old(table):
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+    op.execute(f"DROP TABLE {table}_old CASCADE")
+
+
+def _create_indexes(table, columns):
+    for col in columns:
+        op.create_index(op.f(f'ix_{table}_{col}'), table, [col], unique=False)
+
+
+def _partition_pg():
+    bind = op.get_bind()
+    min_date = bind.execute(sa.text("SELECT MIN(work_date) FROM tk_crew_logs")).scalar()
+
+    _drop_fks_to(bind, 'tk_crew_logs')
+    _swap_table(bind, 'tk_crew_logs', partitioned=True)
+    _swap_table(bind, 'tk_crew_work_segments', partitioned=True)
+
+    # partycje od najstarszego logu do biezacy miesiac + MONTHS_AHEAD; reszta laduje w DEFAULT
+    _create_month_partitions(min_date)
+
+    _copy_and_drop_old('tk_crew_logs')
+    _copy_and_drop_old('tk_crew_work_segments')
+
+    op.create_primary_key('tk_crew_logs_pkey', 'tk_crew_logs', ['id', 'work_date'])
+    op.create_unique_constraint('uq_tk_crew_logs_work_date_vehicle', 'tk_crew_logs', ['work_date', 'vehicle_id'])
+    op.create_foreign_key(None, 'tk_crew_logs', 'tk_vehicles', ['vehicle_id'], ['id'])
+    op.create_foreign_key(None, 'tk_crew_logs', 'tk_employees', ['created_by_employee_id'], ['id'])
+    _create_indexes('tk_crew_logs', _LOG_INDEXES)
+
+    op.create_primary_key('tk_crew_work_segments_pkey', 'tk_crew_work_segments', ['id', 'work_date'])
+    op.create_foreign_key(
+        'fk_tk_crew_work_segments_crew_log', 'tk_crew_work_segments', 'tk_crew_logs',
+        ['crew_log_id', 'work_date'], ['id', 'work_date'],
+    )
+    op.create_foreign_key(None, 'tk_crew_work_segments', 'tk_sites', ['site_id'], ['id'])
+    _create_indexes('tk_crew_work_segments', _SEGMENT_INDEXES)
+
+
+def _unpartition_pg():
+    bind = op.get_bind()
+
+    _drop_fks_to(bind, 'tk_crew_logs')
+    _swap_table(bind, 'tk_crew_logs', partitioned=False)
+    _swap_table(bind, 'tk_crew_work_segments', partitioned=False)
+    _copy_and_drop_old('tk_crew_logs')
+    _copy_and_drop_old('tk_crew_work_segments')
+
+    op.create_primary_key('tk_crew_logs_pkey', 'tk_crew_logs', ['id'])
+    op.create_unique_constraint('uq_tk_crew_logs_work_date_vehicle', 'tk_crew_logs', ['work_date', 'vehicle_id'])
+    op.create_foreign_key(None, 'tk_crew_logs', 'tk_vehicles', ['vehicle_id'], ['id'])
+    op.create_foreign_key(None, 'tk_crew_logs', 'tk_employees', ['created_by_employee_id'], ['id'])
+    _create_indexes('tk_crew_logs', _LOG_INDEXES)
+
+    op.create_primary_key('tk_crew_work_segments_pkey', 'tk_crew_work_segments', ['id'])
+    op.create_foreign_key(None, 'tk_crew_work_segments', 'tk_crew_logs', ['crew_log_id'], ['id'])
+    op.create_foreign_key(None, 'tk_crew_work_segments', 'tk_sites', ['site_id'], ['id'])
+    _create_indexes('tk_crew_work_segments', _SEGMENT_INDEXES)
+
+    for child, name in _LOG_FK_CHILDREN:
+        op.create_foreign_key(name, child, 'tk_crew_logs', ['crew_log_id'], ['id'])
@@ -0,0 +1,32 @@
+"""quote_totals raw sums for incremental maintenance
+
+Revision ID: 6f0b2d94c3e1
+Revises: d81f5b3e6a27
+Create Date: 2026-03-06 11:27:14.093561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '6f0b2d94c3e1'
+down_revision = 'd81f5b3e6a27'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('quote_totals', sa.Column('cost_net_lines', sa.Numeric(20, 8), server_default=sa.text('0'), nullable=False))
+    op.add_column('quote_totals', sa.Column('sell_net_lines', sa.Numeric(16, 4), server_default=sa.text('0'), nullable=False))
+    op.add_column('quote_totals', sa.Column('overhead_pct', sa.Numeric(8, 4), server_default=sa.text('0'), nullable=False))
+    # istniejace sumy: surowe wartosci z linii i narzutow (pochodne zostaja, do czasu check_quote_totals --fix)
+    op.execute("""
+        UPDATE quote_totals SET
+            cost_net_lines = COALESCE((SELECT SUM(l.qty * l.purchase_price_net) FROM quote_lines l WHERE l.quote_id = quote_totals.quote_id), 0),
+            sell_net_lines = COALESCE((SELECT SUM(l.sell_price_net_total) FROM quote_lines l WHERE l.quote_id = quote_totals.quote_id), 0),
+            overhead_pct = COALESCE((SELECT SUM(o.pct) FROM quote_overheads o WHERE o.quote_id = quote_totals.quote_id), 0)
+    """)
+
+def downgrade():
+    with op.batch_alter_table('quote_totals') as batch_op:
+        batch_op.drop_column('overhead_pct')
+        batch_op.drop_column('sell_net_lines')
+        batch_op.drop_column('cost_net_lines')
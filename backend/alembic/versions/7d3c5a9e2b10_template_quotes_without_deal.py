@@ -0,0 +1,31 @@
+"""quotes.deal_id nullable: templates are not attached to a deal
+
+Revision ID: 7d3c5a9e2b10
+Revises: 0a6e3f9d2c58
+Create Date: 2026-03-20 09:12:44.508137
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '7d3c5a9e2b10'
+down_revision = '0a6e3f9d2c58'
+branch_labels = None
+depends_on = None
+
+_QUOTE_CHILDREN = ('quote_params', 'quote_lines', 'quote_overheads', 'quote_totals')
+
+def upgrade():
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.alter_column('deal_id', existing_type=sa.String(length=36), nullable=True)
+    # szablony zapisane dotad trzymaly deal zrodla - usuniecie deala kasowalo je kaskadowo
+    op.execute(sa.text('UPDATE quotes SET deal_id = NULL WHERE is_template = :t').bindparams(t=True))
+
+def downgrade():
+    # szablon bez deala nie ma gdzie wrocic (deal_id NOT NULL) - usuwany razem z wierszami podrzednymi
+    orphans = 'SELECT id FROM quotes WHERE deal_id IS NULL'
+    for table in _QUOTE_CHILDREN:
+        op.execute(f'DELETE FROM {table} WHERE quote_id IN ({orphans})')
+    op.execute('DELETE FROM quotes WHERE deal_id IS NULL')
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.alter_column('deal_id', existing_type=sa.String(length=36), nullable=False)
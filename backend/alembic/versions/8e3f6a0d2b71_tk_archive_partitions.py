@@ -0,0 +1,35 @@
+"""tk_archive_partitions manifest
+
+Revision ID: 8e3f6a0d2b71
+Revises: 5b8d1e27c4fa
+Create Date: 2026-02-16 08:22:53.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '8e3f6a0d2b71'
+down_revision = '5b8d1e27c4fa'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('tk_archive_partitions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('path', sa.String(length=500), nullable=False),
+    sa.Column('format', sa.String(length=32), nullable=False),
+    sa.Column('crew_logs', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tk_archive_partitions_id'), 'tk_archive_partitions', ['id'], unique=False)
+    op.create_index(op.f('ix_tk_archive_partitions_month'), 'tk_archive_partitions', ['month'], unique=True)
+
+def downgrade():
+    op.drop_index(op.f('ix_tk_archive_partitions_month'), table_name='tk_archive_partitions')
+    op.drop_index(op.f('ix_tk_archive_partitions_id'), table_name='tk_archive_partitions')
+    op.drop_table('tk_archive_partitions')
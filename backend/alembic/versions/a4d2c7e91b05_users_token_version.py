@@ -0,0 +1,21 @@
+"""users.token_version (JWT revocation)
+
+Revision ID: a4d2c7e91b05
+Revises: 3c71a9e4d2f8
+Create Date: 2026-02-27 10:41:06.213874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a4d2c7e91b05'
+down_revision = '3c71a9e4d2f8'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
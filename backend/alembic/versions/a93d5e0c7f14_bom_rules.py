@@ -0,0 +1,39 @@
+"""bom_rules (rule-based BOM generation)
+
+Revision ID: a93d5e0c7f14
+Revises: e52c9a7f1b38
+Create Date: 2026-03-13 10:18:55.604127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a93d5e0c7f14'
+down_revision = 'e52c9a7f1b38'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('bom_rules',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('scenario', sa.String(length=20), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('line_type', sa.String(length=20), nullable=False),
+    sa.Column('ref_id', sa.String(length=36), nullable=True),
+    sa.Column('unit', sa.String(length=20), nullable=True),
+    sa.Column('qty_formula', sa.Text(), nullable=False),
+    sa.Column('condition', sa.Text(), nullable=True),
+    sa.Column('purchase_price_net', sa.Numeric(14, 4), nullable=True),
+    sa.Column('markup_pct', sa.Numeric(6, 4), nullable=False),
+    sa.Column('sort_order', sa.Numeric(10, 0), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bom_rules_tenant_id'), 'bom_rules', ['tenant_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_bom_rules_tenant_id'), table_name='bom_rules')
+    op.drop_table('bom_rules')
@@ -0,0 +1,55 @@
+"""catalog_items and catalog_imports (supplier price lists)
+
+Revision ID: b7e4a1c0d952
+Revises: 6f0b2d94c3e1
+Create Date: 2026-03-09 09:42:18.530217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b7e4a1c0d952'
+down_revision = '6f0b2d94c3e1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('catalog_items',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('supplier', sa.String(length=100), nullable=False),
+    sa.Column('sku', sa.String(length=100), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('unit', sa.String(length=20), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=True),
+    sa.Column('ean', sa.String(length=20), nullable=True),
+    sa.Column('purchase_price_net', sa.Numeric(14, 4), nullable=False),
+    sa.Column('currency', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tenant_id', 'supplier', 'sku', name='uq_catalog_items_tenant_supplier_sku')
+    )
+    op.create_index(op.f('ix_catalog_items_tenant_id'), 'catalog_items', ['tenant_id'], unique=False)
+    op.create_table('catalog_imports',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('supplier', sa.String(length=100), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('upserted', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by_user_id', sa.String(length=36), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_catalog_imports_tenant_id'), 'catalog_imports', ['tenant_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_catalog_imports_tenant_id'), table_name='catalog_imports')
+    op.drop_table('catalog_imports')
+    op.drop_index(op.f('ix_catalog_items_tenant_id'), table_name='catalog_items')
+    op.drop_table('catalog_items')
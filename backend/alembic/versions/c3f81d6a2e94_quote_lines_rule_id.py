@@ -0,0 +1,27 @@
+"""quote_lines.rule_id, quotes.bom_generated_at (incremental BOM regeneration)
+
+Revision ID: c3f81d6a2e94
+Revises: a93d5e0c7f14
+Create Date: 2026-03-16 09:27:41.508316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c3f81d6a2e94'
+down_revision = 'a93d5e0c7f14'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('quote_lines', sa.Column('rule_id', sa.String(length=36), nullable=True))
+    op.create_index(op.f('ix_quote_lines_rule_id'), 'quote_lines', ['rule_id'], unique=False)
+    # bez backfillu: linie z wczesniejszych generowan nie maja rule_id, pierwsze generate-lines je zastapi
+    op.add_column('quotes', sa.Column('bom_generated_at', sa.DateTime(timezone=True), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.drop_column('bom_generated_at')
+    op.drop_index(op.f('ix_quote_lines_rule_id'), table_name='quote_lines')
+    with op.batch_alter_table('quote_lines') as batch_op:
+        batch_op.drop_column('rule_id')
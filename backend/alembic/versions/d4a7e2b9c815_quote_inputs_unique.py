@@ -0,0 +1,31 @@
+"""unique (quote_id, key) on quote_params, (quote_id, overhead_type) on quote_overheads
+
+Revision ID: d4a7e2b9c815
+Revises: c3f81d6a2e94
+Create Date: 2026-03-17 11:04:12.730945
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd4a7e2b9c815'
+down_revision = 'c3f81d6a2e94'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # duplikaty z czasow "usun wszystko i dodaj" (ten sam klucz dwa razy w payloadzie) - zostaje jeden wiersz
+    for table, key in (('quote_params', 'key'), ('quote_overheads', 'overhead_type')):
+        op.execute(sa.text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY quote_id, {key})"
+        ))
+    with op.batch_alter_table('quote_params') as batch_op:
+        batch_op.create_unique_constraint('uq_quote_params_quote_key', ['quote_id', 'key'])
+    with op.batch_alter_table('quote_overheads') as batch_op:
+        batch_op.create_unique_constraint('uq_quote_overheads_quote_type', ['quote_id', 'overhead_type'])
+
+def downgrade():
+    with op.batch_alter_table('quote_overheads') as batch_op:
+        batch_op.drop_constraint('uq_quote_overheads_quote_type', type_='unique')
+    with op.batch_alter_table('quote_params') as batch_op:
+        batch_op.drop_constraint('uq_quote_params_quote_key', type_='unique')
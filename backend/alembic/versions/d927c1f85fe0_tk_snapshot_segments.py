@@ -0,0 +1,78 @@
+"""tk_crew_log_snapshots.segments (per-segment rows for payroll of locked logs)
+
+Revision ID: d927c1f85fe0
+Revises: 7d3c5a9e2b10
+Create Date: 2026-03-24 08:37:15.204611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd927c1f85fe0'
+down_revision = '7d3c5a9e2b10'
+branch_labels = None
+depends_on = None
+
+_snapshots = sa.table(
+    'tk_crew_log_snapshots',
+    sa.column('crew_log_id', sa.Integer()),
+    sa.column('segments', sa.JSON()),
+)
+_segments = sa.table(
+    'tk_crew_work_segments',
+    sa.column('id', sa.Integer()),
+    sa.column('crew_log_id', sa.Integer()),
+    sa.column('site_id', sa.Integer()),
+    sa.column('segment_type', sa.String()),
+    sa.column('start_at', sa.DateTime(timezone=True)),
+    sa.column('end_at', sa.DateTime(timezone=True)),
+    sa.column('distance_km', sa.Float()),
+)
+_sites = sa.table('tk_sites', sa.column('id', sa.Integer()), sa.column('name', sa.String()))
+
+
+def upgrade():
+    op.add_column('tk_crew_log_snapshots', sa.Column('segments', sa.JSON(), nullable=True))
+
+    # snapshoty zablokowanych logow: segmenty sa jeszcze w bazie (archiwum ma je w Parquet),
+    # wiec uzupelniamy je tak, jak zrobilby to snapshots.segment_row
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(
+            _segments.c.id, _segments.c.crew_log_id, _segments.c.site_id, _segments.c.segment_type,
+            _segments.c.start_at, _segments.c.end_at, _segments.c.distance_km, _sites.c.name,
+        )
+        .select_from(
+            _segments
+            .join(_snapshots, _snapshots.c.crew_log_id == _segments.c.crew_log_id)
+            .outerjoin(_sites, _sites.c.id == _segments.c.site_id)
+        )
+        .where(_segments.c.start_at.isnot(None), _segments.c.end_at.isnot(None))
+        .order_by(_segments.c.crew_log_id, _segments.c.start_at, _segments.c.id)
+    ).all()
+
+    by_log = {}
+    for r in rows:
+        seg_type = str(getattr(r.segment_type, 'value', r.segment_type) or '').lower()
+        by_log.setdefault(r.crew_log_id, []).append({
+            'segment_id': r.id,
+            'segment_type': 'travel' if seg_type == 'travel' else 'work',
+            'start_at': r.start_at.isoformat(),
+            'end_at': r.end_at.isoformat(),
+            'site_id': r.site_id,
+            'site_name': r.name,
+            'distance_km': float(r.distance_km or 0.0),
+        })
+
+    log_ids = [r.crew_log_id for r in bind.execute(sa.select(_snapshots.c.crew_log_id)).all()]
+    for crew_log_id in log_ids:
+        bind.execute(
+            _snapshots.update()
+            .where(_snapshots.c.crew_log_id == crew_log_id)
+            .values(segments=by_log.get(crew_log_id, []))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('tk_crew_log_snapshots') as batch_op:
+        batch_op.drop_column('segments')
@@ -0,0 +1,58 @@
+"""catalog_items manufacturer/model/search_text + trigram search index (PG)
+
+Revision ID: e52c9a7f1b38
+Revises: b7e4a1c0d952
+Create Date: 2026-03-11 15:06:42.318804
+
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e52c9a7f1b38'
+down_revision = 'b7e4a1c0d952'
+branch_labels = None
+depends_on = None
+
+_BATCH = 1000
+
+# Kopia normalize_text/search_text z app/services/catalog_search.py z chwili tej migracji -
+# migracja nie importuje kodu aplikacji, zeby jego pozniejsze zmiany nie zmienialy historii.
+def _normalize_text(value):
+    s = unicodedata.normalize("NFKD", str(value or "")).replace("ł", "l").replace("Ł", "L")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    s = re.sub(r"(?<=\d),(?=\d)", ".", s)
+    return " ".join(re.findall(r"[a-z0-9]+(?:[./-][a-z0-9]+)*", s))
+
+def _search_text(sku, name):
+    return _normalize_text(" ".join(v for v in (sku, name) if v))[:700]
+
+def upgrade():
+    op.add_column('catalog_items', sa.Column('manufacturer', sa.String(length=100), nullable=True))
+    op.add_column('catalog_items', sa.Column('model', sa.String(length=100), nullable=True))
+    op.add_column('catalog_items', sa.Column('search_text', sa.String(length=700), server_default='', nullable=False))
+
+    # normalizacja (bez polskich znakow) tylko w Pythonie - ta sama co przy imporcie;
+    # zapis paczkami po _BATCH wierszy jednym UPDATE z lista parametrow (executemany)
+    bind = op.get_bind()
+    items = sa.table('catalog_items', sa.column('id'), sa.column('sku'), sa.column('name'), sa.column('search_text'))
+    update = items.update().where(items.c.id == sa.bindparam('item_id')).values(search_text=sa.bindparam('text'))
+    rows = bind.execute(sa.select(items.c.id, items.c.sku, items.c.name).order_by(items.c.id)).all()
+    for i in range(0, len(rows), _BATCH):
+        bind.execute(update, [
+            {'item_id': item_id, 'text': _search_text(sku, name)} for item_id, sku, name in rows[i:i + _BATCH]
+        ])
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_catalog_items_search_trgm ON catalog_items USING gin (search_text gin_trgm_ops)')
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_catalog_items_search_trgm')
+    with op.batch_alter_table('catalog_items') as batch_op:
+        batch_op.drop_column('search_text')
+        batch_op.drop_column('model')
+        batch_op.drop_column('manufacturer')
@@ -0,0 +1,70 @@
+"""quote_sequences (per-tenant, per-year quote numbering), unique (tenant_id, quote_no)
+
+Revision ID: f6b2c8d41a73
+Revises: d4a7e2b9c815
+Create Date: 2026-03-18 08:52:30.117402
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f6b2c8d41a73'
+down_revision = 'd4a7e2b9c815'
+branch_labels = None
+depends_on = None
+
+# numer jak _quote_no: "{prefix}-{rok}-{nr}"
+QUOTE_NO = re.compile(r'^(.*)-(\d{4})-(\d+)$')
+
+def upgrade():
+    op.create_table('quote_sequences',
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('last_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tenant_id', 'year')
+    )
+
+    # stan licznikow z istniejacych numerow; duplikaty (count()+1 przy rownoleglych zapisach albo po
+    # usunieciu oferty) dostaja kolejne wolne numery z tego samego roku - pierwsza oferta zostaje przy swoim
+    bind = op.get_bind()
+    quotes = sa.table('quotes', sa.column('id'), sa.column('tenant_id'), sa.column('quote_no'), sa.column('created_at'))
+    rows = bind.execute(
+        sa.select(quotes.c.id, quotes.c.tenant_id, quotes.c.quote_no).order_by(quotes.c.created_at, quotes.c.id)
+    ).all()
+    last, seen, duplicates = {}, set(), []
+    for quote_id, tenant_id, quote_no in rows:
+        m = QUOTE_NO.match(quote_no or '')
+        if m:
+            key = (tenant_id, int(m.group(2)))
+            last[key] = max(last.get(key, 0), int(m.group(3)))
+        if (tenant_id, quote_no) in seen:
+            duplicates.append((quote_id, tenant_id, quote_no))
+        seen.add((tenant_id, quote_no))
+    for quote_id, tenant_id, quote_no in duplicates:
+        m = QUOTE_NO.match(quote_no or '')
+        if m:
+            key = (tenant_id, int(m.group(2)))
+            last[key] += 1
+            new_no = f'{m.group(1)}-{m.group(2)}-{last[key]:04d}'
+        else:
+            n = 2
+            while (tenant_id, f'{quote_no}-{n}') in seen:
+                n += 1
+            new_no = f'{quote_no}-{n}'
+        seen.add((tenant_id, new_no))
+        bind.execute(quotes.update().where(quotes.c.id == quote_id).values(quote_no=new_no))
+    if last:
+        sequences = sa.table('quote_sequences', sa.column('tenant_id'), sa.column('year'), sa.column('last_value'))
+        bind.execute(sequences.insert(), [
+            {'tenant_id': tenant_id, 'year': year, 'last_value': value} for (tenant_id, year), value in last.items()
+        ])
+
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.create_unique_constraint('uq_quotes_tenant_quote_no', ['tenant_id', 'quote_no'])
+
+def downgrade():
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.drop_constraint('uq_quotes_tenant_quote_no', type_='unique')
+    op.drop_table('quote_sequences')
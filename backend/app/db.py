@@ -1,5 +1,11 @@
+import os
+import re
+import sys
+import time
+from contextvars import ContextVar
 from app.base import Base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.config import settings
 db_url = settings.DATABASE_URL
@@ -19,3 +25,115 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# --- SQL stats per request (app/middleware.py ustawia kolektor w ContextVar) ---
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    """Ten sam ksztalt zapytania = ten sam fingerprint (listy IN i liczby zwiniete)."""
+    s = _SPACES.sub(" ", statement).strip()
+    s = _IN_LIST.sub("(?)", s)
+    return _NUMBER.sub("?", s)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+# plik -> sciezka wzgledna ("app/...") albo None (SQLAlchemy, biblioteki); relpath liczony raz na plik
+_caller_files: dict[str, str | None] = {}
+
+def _caller_file(fn: str) -> str | None:
+    rel = _caller_files.get(fn, False)
+    if rel is False:
+        rel = None
+        if fn.startswith(_APP_DIR) and fn != _THIS_FILE:
+            rel = os.path.relpath(fn, os.path.dirname(_APP_DIR)).replace(os.sep, "/")
+        _caller_files[fn] = rel
+    return rel
+
+def _caller() -> str | None:
+    """Pierwsza ramka z kodu aplikacji nad SQLAlchemy: "app/timekeeping/api.py:1190 report_day".
+
+    Tanie na tyle, zeby wolac je dla kazdego zapisywanego zapytania: przejscie po ramkach (max 60)
+    ze slownikiem plikow zamiast relpath/startswith na kazdej ramce.
+    """
+    f = sys._getframe(2)
+    depth = 0
+    while f is not None and depth < 60:
+        rel = _caller_file(f.f_code.co_filename)
+        if rel is not None:
+            return f"{rel}:{f.f_lineno} {f.f_code.co_name}"
+        f = f.f_back
+        depth += 1
+    return None
+
+class QueryStats:
+    def __init__(self, budget: int = 0, strict: bool = False, repeat_threshold: int = 0, capture: int = 0):
+        self.count = 0
+        self.time_ms = 0.0
+        self.budget = budget
+        self.strict = strict
+        self.repeat_threshold = repeat_threshold
+        self.fingerprints = {}
+        # capture > 0: pierwsze `capture` zapytan z czasem i miejscem wywolania (dziennik wolnych requestow)
+        self.capture = capture
+        self.statements = []
+
+    def add(self, statement: str, elapsed_ms: float) -> None:
+        self.time_ms += elapsed_ms
+        fp = fingerprint(statement)
+        self.fingerprints[fp] = self.fingerprints.get(fp, 0) + 1
+        if len(self.statements) < self.capture:
+            self.statements.append({"sql": statement[:2000], "ms": round(elapsed_ms, 3), "caller": _caller()})
+
+    def check(self, statement: str) -> None:
+        # wolane przed wykonaniem zapytania: w trybie strict przerywa request na pierwszym przekroczeniu
+        self.count += 1
+        if not self.strict:
+            return
+        if self.budget and self.count > self.budget:
+            raise QueryBudgetExceeded(f"query budget exceeded: {self.count} > {self.budget}")
+        if self.repeat_threshold:
+            fp = fingerprint(statement)
+            if self.fingerprints.get(fp, 0) + 1 > self.repeat_threshold:
+                raise QueryBudgetExceeded(f"N+1: statement repeated more than {self.repeat_threshold} times: {fp[:200]}")
+
+    def repeated(self, threshold: int) -> list:
+        return sorted(
+            ((n, fp) for fp, n in self.fingerprints.items() if threshold and n >= threshold),
+            reverse=True,
+        )
+
+    @property
+    def max_repeat(self) -> int:
+        return max(self.fingerprints.values(), default=0)
+
+query_stats: ContextVar = ContextVar("query_stats", default=None)
+
+# na klasie Engine, zeby lapac tez silniki podmienione w benchmarkach/testach
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats.get()
+    if stats is None:
+        return
+    stats.check(statement)
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats.get()
+    starts = conn.info.get("query_start")
+    if stats is None or not starts:
+        return
+    stats.add(statement, (time.perf_counter() - starts.pop()) * 1000.0)
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(ctx):
+    starts = ctx.connection.info.get("query_start") if ctx.connection is not None else None
+    if starts:
+        starts.pop()
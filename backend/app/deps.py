@@ -1,14 +1,86 @@
+import hmac
+import threading
+import time
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.db import get_db
-from app.security import decode_token
+from app.security import API_KEY_PREFIX, api_key_digest, api_key_prefix, decode_token
 from app.i18n import t
-from app.models.core import User
+from app.models.core import ApiKey, User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(request: Request, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+@dataclass(frozen=True)
+class Principal:
+    """Zalogowany uzytkownik bez sesji ORM - bezpieczny do trzymania w cache miedzy requestami."""
+    id: str
+    tenant_id: str | None
+    email: str
+    role: str
+    is_active: bool
+    token_version: int = 0
+    # klucz API: id klucza i jego zakresy; None = zwykly uzytkownik bez ograniczen zakresu
+    api_key_id: str | None = None
+    scopes: tuple[str, ...] | None = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, tenant_id=user.tenant_id, email=user.email, role=user.role, is_active=bool(user.is_active), token_version=user.token_version or 0)
+
+    @classmethod
+    def from_api_key(cls, key: ApiKey) -> "Principal":
+        # id = tworca klucza, zeby created_by_user_id itp. wskazywaly na istniejacego uzytkownika
+        return cls(id=key.created_by_user_id, tenant_id=key.tenant_id, email=f"apikey:{key.name}", role=key.role, is_active=True, api_key_id=key.id, scopes=tuple(key.scopes or ()))
+
+# obszary API (pierwszy segment sciezki po API_PREFIX) dostepne dla kluczy; admin i auth tylko dla ludzi
+API_KEY_AREAS = ("crm", "quoting", "catalog", "timekeeping")
+API_KEY_SCOPES = tuple(f"{area}:{action}" for area in API_KEY_AREAS for action in ("read", "write"))
+
+# (user_id, tenant_id) -> (wygasa, Principal). Cache per proces: zmiany z tej repliki uniewazniaja
+# go od razu (invalidate_principal), na pozostalych replikach najpozniej po PRINCIPAL_CACHE_TTL sekundach.
+_principals: dict[tuple, tuple[float, Principal]] = {}
+_principals_lock = threading.Lock()
+
+def invalidate_principal(user_id: str, tenant_id: str | None = None) -> None:
+    with _principals_lock:
+        for key in [k for k in _principals if k[0] == user_id and (tenant_id is None or k[1] == tenant_id)]:
+            _principals.pop(key, None)
+
+def revoke_tokens(user: User) -> None:
+    """Podbija token_version (atomowo w UPDATE) - po commit wszystkie wydane tokeny uzytkownika daja 401.
+
+    Wolajacy po commit robi invalidate_principal(user.id); inne repliki widza zmiane najpozniej
+    po PRINCIPAL_CACHE_TTL.
+    """
+    user.token_version = User.token_version + 1
+
+def _cached_principal(key: tuple) -> Principal | None:
+    hit = _principals.get(key)
+    if hit is None:
+        return None
+    if hit[0] < time.monotonic():
+        with _principals_lock:
+            _principals.pop(key, None)
+        return None
+    return hit[1]
+
+def _cache_principal(key: tuple, principal: Principal) -> None:
+    with _principals_lock:
+        if len(_principals) >= settings.PRINCIPAL_CACHE_SIZE:
+            # pelny cache: wyrzucamy najstarszy wpis (dict zachowuje kolejnosc wstawiania)
+            _principals.pop(next(iter(_principals)), None)
+        _principals[key] = (time.monotonic() + settings.PRINCIPAL_CACHE_TTL, principal)
+
+def _api_key_cache_key(prefix: str) -> str:
+    return f"apikey:{prefix}"
+
+def invalidate_api_key(prefix: str) -> None:
+    invalidate_principal(_api_key_cache_key(prefix))
+
+def _token_principal(request: Request, db: Session, token: str) -> Principal:
     try:
         payload = decode_token(token)
     except Exception:
@@ -17,13 +89,66 @@ def get_current_user(request: Request, db: Session = Depends(get_db), token: str
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
     user_id = payload.get("sub")
     tenant_id = payload.get("tenant_id")
-    user = db.query(User).filter(User.id == user_id, User.tenant_id == tenant_id).first()
-    if not user or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.inactive_user"))
-    return user
+    key = (user_id, tenant_id)
+    version = payload.get("ver", 0)
+    principal = _cached_principal(key) if settings.PRINCIPAL_CACHE_TTL > 0 else None
+    if principal is None or principal.token_version != version:
+        # token nowszy niz cache (logowanie po odwolaniu na innej replice) - czytamy z bazy
+        user = db.query(User).filter(User.id == user_id, User.tenant_id == tenant_id).first()
+        if not user or not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.inactive_user"))
+        principal = Principal.from_user(user)
+        if settings.PRINCIPAL_CACHE_TTL > 0:
+            _cache_principal(key, principal)
+    if principal.token_version != version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.token_revoked"))
+    return principal
+
+def _api_key_principal(request: Request, db: Session, token: str) -> Principal:
+    """Klucz API: jeden lookup po prefiksie + jeden HMAC, potem cache (jak principal z JWT)."""
+    prefix = api_key_prefix(token)
+    if prefix is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
+    # w kluczu cache pelny klucz przez HMAC - inny sekret z tym samym prefiksem nie trafi w cache
+    digest = api_key_digest(token)
+    key = (_api_key_cache_key(prefix), digest)
+    principal = _cached_principal(key) if settings.PRINCIPAL_CACHE_TTL > 0 else None
+    if principal is None:
+        row = db.query(ApiKey).filter(ApiKey.prefix == prefix).first()
+        if not row or row.revoked_at is not None or not hmac.compare_digest(digest, row.key_hash):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
+        principal = Principal.from_api_key(row)
+        if settings.PRINCIPAL_CACHE_TTL > 0:
+            _cache_principal(key, principal)
+    return principal
+
+def _check_scope(request: Request, principal: Principal) -> None:
+    if principal.scopes is None:
+        return
+    path = request.url.path
+    if path.startswith(settings.API_PREFIX):
+        path = path[len(settings.API_PREFIX):]
+    area = path.strip("/").split("/", 1)[0]
+    # write obejmuje read
+    allowed = {f"{area}:write"}
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        allowed.add(f"{area}:read")
+    if not allowed.intersection(principal.scopes):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=t(request, "auth.scope_denied"))
+
+def get_current_user(request: Request, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    if token.startswith(API_KEY_PREFIX):
+        principal = _api_key_principal(request, db, token)
+    else:
+        principal = _token_principal(request, db, token)
+    _check_scope(request, principal)
+    # dla dziennika wolnych requestow (app/slowlog.py)
+    request.state.tenant_id = principal.tenant_id
+    request.state.user_id = principal.id
+    return principal
 
 def require_roles(*roles: str):
-    def _checker(request: Request, user: User = Depends(get_current_user)) -> User:
+    def _checker(request: Request, user: Principal = Depends(get_current_user)) -> Principal:
         if user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=t(request, "auth.forbidden"))
         return user
@@ -6,20 +6,36 @@ MESSAGES = {
         "auth.inactive_user": "User is inactive.",
         "auth.unauthorized": "Not authenticated.",
         "auth.forbidden": "You don't have permission to perform this action.",
+        "auth.too_many_attempts": "Too many failed login attempts. Try again later.",
+        "auth.busy": "Authentication is temporarily overloaded. Try again shortly.",
+        "auth.token_revoked": "Session has ended. Please log in again.",
+        "auth.wrong_password": "Current password is incorrect.",
+        "auth.scope_denied": "This API key is not allowed to call this endpoint.",
         "common.not_found": "Resource not found.",
         "common.validation_failed": "Validation failed.",
+        "catalog.file_too_large": "Price list file is too large.",
         "quote.margin_below_min": "Margin is below tenant minimum.",
         "quote.sell_below_cost": "Sell price is below cost.",
+        "quote.invalid_formula": "Invalid formula",
+        "quote.template_needs_deal": "A template has no deal. Create a quote from it with from-template.",
     },
     "pl": {
         "auth.invalid_credentials": "Nieprawidłowy e-mail lub hasło.",
         "auth.inactive_user": "Użytkownik jest nieaktywny.",
         "auth.unauthorized": "Brak uwierzytelnienia.",
         "auth.forbidden": "Brak uprawnień do wykonania tej operacji.",
+        "auth.too_many_attempts": "Zbyt wiele nieudanych prób logowania. Spróbuj ponownie później.",
+        "auth.busy": "Logowanie jest chwilowo przeciążone. Spróbuj ponownie za chwilę.",
+        "auth.token_revoked": "Sesja wygasła. Zaloguj się ponownie.",
+        "auth.wrong_password": "Obecne hasło jest nieprawidłowe.",
+        "auth.scope_denied": "Ten klucz API nie ma uprawnień do tego endpointu.",
         "common.not_found": "Nie znaleziono zasobu.",
         "common.validation_failed": "Walidacja nie powiodła się.",
+        "catalog.file_too_large": "Plik cennika jest za duży.",
         "quote.margin_below_min": "Marża jest poniżej minimum ustawionego dla firmy.",
         "quote.sell_below_cost": "Cena sprzedaży jest niższa niż koszt.",
+        "quote.invalid_formula": "Niepoprawna formuła",
+        "quote.template_needs_deal": "Szablon nie należy do deala. Utwórz z niego ofertę przez from-template.",
     },
 }
 
@@ -1,11 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from app.timekeeping.api import router as timekeeping_router
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
+from app.db import engine
+from app.metrics import render_metrics
+from app.middleware import MetricsMiddleware, SqlStatsMiddleware
+from app.profiling import ProfilingMiddleware
+from app.security import shutdown_hash_pool
+from app.timekeeping.partitions import ensure_month_partitions_for_engine
+from app.tracing import TracingMiddleware
 from app.routers.auth import router as auth_router
 from app.routers.admin import router as admin_router
 from app.routers.crm import router as crm_router
 from app.routers.quoting import router as quoting_router
+from app.routers.catalog import router as catalog_router
+from app.services.catalog_import import shutdown_import_pool
 
 app = FastAPI(title=settings.APP_NAME)
 
@@ -17,12 +27,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# kolejnosc: ostatni dodany jest zewnetrzny - MetricsMiddleware musi byc w srodku SqlStats
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(SqlStatsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
 app.include_router(auth_router, prefix=settings.API_PREFIX)
 app.include_router(admin_router, prefix=settings.API_PREFIX)
 app.include_router(crm_router, prefix=settings.API_PREFIX)
 app.include_router(quoting_router, prefix=settings.API_PREFIX)
+app.include_router(catalog_router, prefix=settings.API_PREFIX)
 app.include_router(timekeeping_router, prefix=settings.API_PREFIX)
 
+@app.on_event("startup")
+def ensure_partitions():
+    # PG: dokladamy miesieczne partycje tk_crew_logs / tk_crew_work_segments na zapas
+    ensure_month_partitions_for_engine(engine)
+
+@app.on_event("shutdown")
+def stop_hash_pool():
+    shutdown_hash_pool()
+
+@app.on_event("shutdown")
+def stop_import_pool():
+    # przerwany import zostaje w catalog_imports ze statusem queued/running - trzeba go wyslac ponownie
+    shutdown_import_pool()
+
 @app.get("/health")
 def health():
     return {"ok": True, "env": settings.ENV}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # async: odpowiada nawet przy zapchanym threadpoolu (i czyta jego limiter z petli zdarzen)
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,242 @@
+"""Metryki procesu w formacie tekstowym Prometheusa (GET /metrics), bez prometheus_client.
+
+Rejestr jest per proces - przy kilku replikach / workerach uvicorna Prometheus scrapuje kazdy
+osobno i agreguje po etykiecie instance. Zbierane:
+
+- latencja i liczba requestow per trasa (szablon sciezki, nie surowy URL),
+- requesty w toku,
+- nasycenie threadpoola anyio (endpointy sync i generowanie eksportow siedza w nim),
+- pula polaczen SQLAlchemy (checked out / overflow),
+- czas eksportow (.xlsx / .pdf / .csv) z podzialem na baze i renderowanie.
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from app.db import engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class CallbackGauge(_Metric):
+    """Gauge liczony przy scrapie: fn() -> {krotka etykiet: wartosc} albo pojedyncza liczba."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, fn: Callable, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # klucz -> [liczniki kubelkow (bez +Inf), count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            if idx < len(self.buckets):
+                entry[0][idx] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(round(total, 6))}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests_total = REGISTRY.register(Counter(
+    "hqp_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"),
+))
+http_request_duration = REGISTRY.register(Histogram(
+    "hqp_http_request_duration_seconds", "HTTP request latency (until the response body is sent).", ("method", "route"),
+))
+http_request_db_time = REGISTRY.register(Histogram(
+    "hqp_http_request_db_seconds", "Time spent in SQL per HTTP request.", ("method", "route"),
+))
+http_requests_in_progress = REGISTRY.register(Gauge(
+    "hqp_http_requests_in_progress", "HTTP requests currently being handled.", ("method",),
+))
+export_duration = REGISTRY.register(Histogram(
+    "hqp_export_duration_seconds", "Report export (xlsx/pdf/csv) duration.", ("export", "format"), buckets=EXPORT_BUCKETS,
+))
+export_render_time = REGISTRY.register(Histogram(
+    "hqp_export_render_seconds", "Report export duration outside SQL (rendering/serialisation).", ("export", "format"), buckets=EXPORT_BUCKETS,
+))
+
+password_hash_queue = REGISTRY.register(Histogram(
+    "hqp_password_hash_queue_seconds", "Wait before a password hash/verify job starts (slot + process pool queue).", ("op",),
+))
+password_hash_duration = REGISTRY.register(Histogram(
+    "hqp_password_hash_seconds", "Password hash/verify run time in the pool.", ("op",),
+))
+password_hash_rejected = REGISTRY.register(Counter(
+    "hqp_password_hash_rejected_total", "Hash/verify jobs rejected because the pool stayed full (503).", ("op",),
+))
+
+EXPORT_FORMATS = (".xlsx", ".pdf", ".csv")
+
+
+def export_format(route: str) -> str | None:
+    for ext in EXPORT_FORMATS:
+        if route.endswith(ext):
+            return ext[1:]
+    return None
+
+
+def _threadpool_stats() -> dict:
+    # musi byc wolane z petli zdarzen (endpoint /metrics jest async)
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        "total": limiter.total_tokens,
+        "borrowed": stats.borrowed_tokens,
+        "waiting": stats.tasks_waiting,
+    }
+
+
+def _pool_stat(name: str) -> Callable:
+    def _read():
+        # NullPool/StaticPool (np. SQLite w testach) nie maja licznikow - metryka jest pomijana
+        fn = getattr(engine.pool, name, None)
+        return fn() if callable(fn) else None
+    return _read
+
+
+REGISTRY.register(CallbackGauge(
+    "hqp_threadpool_tokens", "anyio default thread limiter capacity.", lambda: _threadpool_stats()["total"],
+))
+REGISTRY.register(CallbackGauge(
+    "hqp_threadpool_busy", "Worker threads currently running sync endpoints/dependencies.", lambda: _threadpool_stats()["borrowed"],
+))
+REGISTRY.register(CallbackGauge(
+    "hqp_threadpool_waiting", "Tasks waiting for a free worker thread (saturation).", lambda: _threadpool_stats()["waiting"],
+))
+REGISTRY.register(CallbackGauge("hqp_db_pool_size", "SQLAlchemy pool size.", _pool_stat("size")))
+REGISTRY.register(CallbackGauge("hqp_db_pool_checked_out", "SQLAlchemy connections checked out.", _pool_stat("checkedout")))
+REGISTRY.register(CallbackGauge("hqp_db_pool_checked_in", "SQLAlchemy idle connections in the pool.", _pool_stat("checkedin")))
+REGISTRY.register(CallbackGauge(
+    "hqp_db_pool_overflow", "SQLAlchemy overflow connections (negative = pool not filled yet).", _pool_stat("overflow"),
+))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,133 @@
+import logging
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics, slowlog
+from app.config import settings
+from app.db import QueryStats, query_stats
+
+log = logging.getLogger("app.sql")
+
+
+def _headers_enabled() -> bool:
+    if settings.SQL_STATS_HEADERS is not None:
+        return settings.SQL_STATS_HEADERS
+    return settings.ENV == "dev"
+
+
+class SqlStatsMiddleware:
+    """Liczy zapytania SQL, czas w bazie i powtorzenia tego samego zapytania per request.
+
+    - naglowki X-DB-Queries / X-DB-Time-ms / X-DB-Max-Repeat (dev albo SQL_STATS_HEADERS=1),
+    - log: linia debug na kazdy request, warning przy N+1 (>= SQL_REPEAT_THRESHOLD powtorzen)
+      albo przekroczonym SQL_QUERY_BUDGET,
+    - SQL_STRICT=1: przekroczenie budzetu / progu powtorzen przerywa request (500) - dla testow.
+      Naglowek X-DB-Budget zmienia budzet jednego requestu poza trybem strict albo w ENV=dev,
+    - wolne requesty (SLOW_REQUEST_MS) i probka szybkich trafiaja do app/slowlog.py.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = settings.SQL_QUERY_BUDGET
+        # w trybie strict budzet z konfiguracji jest wiazacy; klient moze go zmienic tylko w dev
+        if not settings.SQL_STRICT or settings.ENV == "dev":
+            for k, v in scope.get("headers") or []:
+                if k == b"x-db-budget" and v.isdigit():
+                    budget = int(v)
+        capture = settings.SLOW_REQUEST_MAX_STATEMENTS if settings.SLOW_REQUEST_LOG else 0
+        stats = QueryStats(
+            budget=budget, strict=settings.SQL_STRICT, repeat_threshold=settings.SQL_REPEAT_THRESHOLD,
+            capture=capture,
+        )
+        token = query_stats.set(stats)
+        t0 = time.perf_counter()
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if _headers_enabled():
+                    headers = list(message.get("headers") or [])
+                    headers += [
+                        (b"x-db-queries", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.time_ms:.1f}".encode()),
+                        (b"x-db-max-repeat", str(stats.max_repeat).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            duration_ms = (time.perf_counter() - t0) * 1000.0
+            query_stats.reset(token)
+            self._log(scope, status["code"], stats)
+            keep, sampled = slowlog.should_record(duration_ms)
+            if keep:
+                # odpowiedz jest juz wyslana; zapis poza petla zdarzen
+                await run_in_threadpool(slowlog.record, scope, status["code"], duration_ms, stats, sampled)
+
+    def _log(self, scope, status_code, stats):
+        route = f"{scope.get('method')} {scope.get('path')}"
+        log.debug("%s %s queries=%d db_ms=%.1f", route, status_code, stats.count, stats.time_ms)
+        for n, fp in stats.repeated(settings.SQL_REPEAT_THRESHOLD)[:3]:
+            log.warning("N+1 suspect %s: %dx %s", route, n, fp[:300])
+        if stats.budget and stats.count > stats.budget:
+            log.warning("query budget exceeded %s: %d > %d", route, stats.count, stats.budget)
+
+
+class MetricsMiddleware:
+    """Latencja / liczba requestow per trasa i czas eksportow do app/metrics.py.
+
+    Trasa to szablon sciezki z routera (np. /timekeeping/crew-logs/{log_id}), wiec liczba
+    serii nie rosnie z id; requesty bez dopasowanej trasy ida jako "unmatched".
+    Musi byc wewnatrz SqlStatsMiddleware, zeby widziec czas SQL biezacego requestu.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        metrics.http_requests_in_progress.inc(method=method)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            metrics.http_requests_in_progress.dec(method=method)
+            self._observe(scope, method, status["code"], elapsed)
+
+    def _observe(self, scope, method, status_code, elapsed):
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        metrics.http_requests_total.inc(method=method, route=route, status=status_code)
+        metrics.http_request_duration.observe(elapsed, method=method, route=route)
+
+        stats = query_stats.get()
+        db_s = stats.time_ms / 1000.0 if stats is not None else 0.0
+        if stats is not None:
+            metrics.http_request_db_time.observe(db_s, method=method, route=route)
+
+        fmt = metrics.export_format(route)
+        if fmt and status_code < 400:
+            name = route.rsplit("/", 1)[-1]
+            metrics.export_duration.observe(elapsed, export=name, format=fmt)
+            metrics.export_render_time.observe(max(0.0, elapsed - db_s), export=name, format=fmt)
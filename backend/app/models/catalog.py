@@ -0,0 +1,42 @@
+﻿import uuid
+from datetime import datetime, timezone
+from sqlalchemy import String, DateTime, Integer, Numeric, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.base import Base
+
+class CatalogItem(Base):
+    """Pozycja cennika dostawcy - QuoteLine.ref_id wskazuje na CatalogItem.id."""
+    __tablename__ = "catalog_items"
+    __table_args__ = (UniqueConstraint("tenant_id", "supplier", "sku", name="uq_catalog_items_tenant_supplier_sku"),)
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id: Mapped[str] = mapped_column(String(36), index=True)
+    supplier: Mapped[str] = mapped_column(String(100))
+    sku: Mapped[str] = mapped_column(String(100))
+    name: Mapped[str] = mapped_column(String(255))
+    manufacturer: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    model: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    unit: Mapped[str] = mapped_column(String(20), default="szt")
+    category: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    ean: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    purchase_price_net: Mapped[float] = mapped_column(Numeric(14,4), default=0)
+    currency: Mapped[str] = mapped_column(String(10), default="PLN")
+    # sku + nazwa + model + producent, male litery bez polskich znakow (app/services/catalog_search.py); PG: indeks trigramowy
+    search_text: Mapped[str] = mapped_column(String(700), default="")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class CatalogImport(Base):
+    """Import cennika (plik XLSX/CSV) przetwarzany w tle - status do odpytywania przez klienta."""
+    __tablename__ = "catalog_imports"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id: Mapped[str] = mapped_column(String(36), index=True)
+    supplier: Mapped[str] = mapped_column(String(100))
+    filename: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20), default="queued")  # queued/running/done/failed
+    rows: Mapped[int] = mapped_column(Integer, default=0)
+    upserted: Mapped[int] = mapped_column(Integer, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_by_user_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
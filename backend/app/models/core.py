@@ -1,6 +1,6 @@
 ﻿import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, Boolean, ForeignKey, Enum, Numeric, Text
+from sqlalchemy import String, DateTime, Boolean, ForeignKey, Enum, Integer, JSON, Numeric, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from app.base import Base
@@ -20,8 +20,28 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(String(255))
     role: Mapped[str] = mapped_column(String(20))  # admin/sales/manager
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # claim "ver" w JWT; podbicie uniewaznia wszystkie tokeny uzytkownika (logout, deaktywacja, zmiana hasla)
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+class ApiKey(Base):
+    """Klucz API dla klientow maszynowych (telematyka, integracja plac, tablety w pojazdach).
+
+    Klucz "hqp_<prefix>_<sekret>" pokazywany jest tylko przy utworzeniu; w bazie prefix (lookup)
+    i HMAC-SHA256 calego klucza - patrz app/security.py api_key_digest.
+    """
+    __tablename__ = "api_keys"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id: Mapped[str] = mapped_column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), index=True)
+    name: Mapped[str] = mapped_column(String(200))
+    prefix: Mapped[str] = mapped_column(String(16), unique=True, index=True)
+    key_hash: Mapped[str] = mapped_column(String(64))
+    role: Mapped[str] = mapped_column(String(20), default="sales")
+    scopes: Mapped[list] = mapped_column(JSON, default=list)  # ["crm:read", "quoting:write", ...]
+    created_by_user_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
 class TenantSettings(Base):
     __tablename__ = "tenant_settings"
     tenant_id: Mapped[str] = mapped_column(String(36), ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
@@ -0,0 +1,22 @@
+﻿from datetime import datetime, timezone
+from sqlalchemy import String, DateTime, Integer, Float, Boolean, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from app.base import Base
+
+class SlowRequest(Base):
+    """Dziennik wolnych (i probkowanych szybkich) requestow - ring buffer, patrz app/slowlog.py."""
+    __tablename__ = "ops_slow_requests"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+    tenant_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)
+    user_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    method: Mapped[str] = mapped_column(String(10))
+    route: Mapped[str] = mapped_column(String(255), index=True)
+    path: Mapped[str] = mapped_column(String(500))
+    params: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    status: Mapped[int] = mapped_column(Integer)
+    duration_ms: Mapped[float] = mapped_column(Float)
+    db_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    query_count: Mapped[int] = mapped_column(Integer, default=0)
+    sampled: Mapped[bool] = mapped_column(Boolean, default=False)  # szybki request z probkowania, nie przekroczenie progu
+    statements: Mapped[list | None] = mapped_column(JSON, nullable=True)
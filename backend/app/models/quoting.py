@@ -1,6 +1,6 @@
 ﻿import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, ForeignKey, Text, Numeric
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Text, Numeric, Boolean, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.base import Base
@@ -19,22 +19,35 @@ class Deal(Base):
 
 class Quote(Base):
     __tablename__ = "quotes"
+    __table_args__ = (UniqueConstraint("tenant_id", "quote_no", name="uq_quotes_tenant_quote_no"),)
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id: Mapped[str] = mapped_column(String(36), index=True)
-    deal_id: Mapped[str] = mapped_column(String(36), ForeignKey("deals.id", ondelete="CASCADE"), index=True)
+    # NULL tylko dla szablonow (is_template) - nie naleza do deala, wiec jego usuniecie ich nie kasuje
+    deal_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("deals.id", ondelete="CASCADE"), index=True, nullable=True)
     quote_no: Mapped[str] = mapped_column(String(50), index=True)
     scenario: Mapped[str] = mapped_column(String(20))  # split/vrf/vent
     currency: Mapped[str] = mapped_column(String(10), default="PLN")
     vat_rate: Mapped[float] = mapped_column(Numeric(5,4), default=0.23)
     pricing_version: Mapped[int] = mapped_column(Numeric(10,0), default=1)
+    is_template: Mapped[bool] = mapped_column(Boolean, default=False)  # szablon do POST .../quotes/from-template
     notes_internal: Mapped[str | None] = mapped_column(Text, nullable=True)
     notes_customer: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # ustawiane przez generate-lines; od tego momentu zmiana parametrow przelicza linie z regul
+    bom_generated_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_by_user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[str] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
+class QuoteSequence(Base):
+    # ostatni nadany numer oferty tenanta w danym roku (next_quote_seq); rok 0 = numeracja szablonow
+    __tablename__ = "quote_sequences"
+    tenant_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_value: Mapped[int] = mapped_column(Integer, default=0)
+
 class QuoteParam(Base):
     __tablename__ = "quote_params"
+    __table_args__ = (UniqueConstraint("quote_id", "key", name="uq_quote_params_quote_key"),)
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id: Mapped[str] = mapped_column(String(36), index=True)
     quote_id: Mapped[str] = mapped_column(String(36), ForeignKey("quotes.id", ondelete="CASCADE"), index=True)
@@ -57,10 +70,12 @@ class QuoteLine(Base):
     sell_price_net_unit: Mapped[float] = mapped_column(Numeric(14,4), default=0)
     sell_price_net_total: Mapped[float] = mapped_column(Numeric(14,4), default=0)
     source: Mapped[str] = mapped_column(String(20), default="manual")  # manual/rule
+    rule_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)  # bom_rules.id dla source="rule"
     sort_order: Mapped[int] = mapped_column(Numeric(10,0), default=0)
 
 class QuoteOverhead(Base):
     __tablename__ = "quote_overheads"
+    __table_args__ = (UniqueConstraint("quote_id", "overhead_type", name="uq_quote_overheads_quote_type"),)
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     tenant_id: Mapped[str] = mapped_column(String(36), index=True)
     quote_id: Mapped[str] = mapped_column(String(36), ForeignKey("quotes.id", ondelete="CASCADE"), index=True)
@@ -78,5 +93,28 @@ class QuoteTotals(Base):
     sell_gross: Mapped[float] = mapped_column(Numeric(14,4), default=0)
     margin_net: Mapped[float] = mapped_column(Numeric(14,4), default=0)
     margin_pct: Mapped[float] = mapped_column(Numeric(8,6), default=0)
+    # surowe sumy pod przyrostowa aktualizacje (app/services/pricing.py apply_totals_delta);
+    # koszt linii qty * cena ma do 8 miejsc po przecinku - akumulator bez zaokraglen
+    cost_net_lines: Mapped[float] = mapped_column(Numeric(20,8), default=0, server_default="0")
+    sell_net_lines: Mapped[float] = mapped_column(Numeric(16,4), default=0, server_default="0")
+    overhead_pct: Mapped[float] = mapped_column(Numeric(8,4), default=0, server_default="0")
     updated_at: Mapped[str] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
+class BomRule(Base):
+    """Regula BOM: linia oferty z ilosci liczonej formula po parametrach oferty (app/services/rules.py)."""
+    __tablename__ = "bom_rules"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id: Mapped[str] = mapped_column(String(36), index=True)
+    scenario: Mapped[str | None] = mapped_column(String(20), nullable=True)  # split/vrf/vent, None = kazdy
+    name: Mapped[str] = mapped_column(String(255))
+    line_type: Mapped[str] = mapped_column(String(20), default="material")
+    ref_id: Mapped[str | None] = mapped_column(String(36), nullable=True)  # catalog_items.id - cena i jednostka z katalogu
+    unit: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    qty_formula: Mapped[str] = mapped_column(Text)  # np. "ceil(indoor_units * 1.5) + 2"
+    condition: Mapped[str | None] = mapped_column(Text, nullable=True)  # np. "system == 'vrf'"; brak = zawsze
+    purchase_price_net: Mapped[float | None] = mapped_column(Numeric(14,4), nullable=True)  # None = cena z katalogu
+    markup_pct: Mapped[float] = mapped_column(Numeric(6,4), default=0.2)
+    sort_order: Mapped[int] = mapped_column(Numeric(10,0), default=0)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[str] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
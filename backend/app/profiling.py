@@ -0,0 +1,222 @@
+"""Profilowanie pojedynczego requestu na zadanie admina (cProfile), bez restartu i bez attach do uvicorna.
+
+Request z naglowkiem "X-Profile: 1" (albo ?_profile=1) od uzytkownika, ktory przechodzi
+require_roles("admin"), jest profilowany; odpowiedz dostaje naglowki X-Profile-Id i X-Profile-Url,
+a wynik lezy w PROFILE_DIR jako <id>.prof (pstats - snakeviz / python -m pstats) i <id>.txt
+(top funkcji po czasie skumulowanym). Pobranie: GET /admin/profiles/{id}?format=txt|prof.
+
+Profilowana jest funkcja endpointu w watku, w ktorym sie wykonuje (endpointy sync ida do
+threadpoola, a cProfile widzi tylko swoj watek) - dlatego ProfilingRoute, a middleware tylko
+sprawdza uprawnienia i zapisuje wynik. Walidacja response_model i wysylanie body nie wchodza.
+"""
+from __future__ import annotations
+
+import cProfile
+import inspect
+import io
+import json
+import pstats
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.config import settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "_profile"
+TOP_FUNCTIONS = 60
+
+
+class ProfileRequest:
+    """Stan profilowania requestu; wspoldzielony przez ContextVar z watkiem endpointu."""
+
+    def __init__(self, user_id: str | None, tenant_id: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.tenant_id = tenant_id
+        self.profiler: cProfile.Profile | None = None
+        self.endpoint: str | None = None
+
+
+_active: ContextVar[ProfileRequest | None] = ContextVar("profile_request", default=None)
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILE_DIR)
+
+
+def _wants_profile(scope) -> bool:
+    for k, v in scope.get("headers") or []:
+        if k == PROFILE_HEADER and v.strip().lower() in (b"1", b"true", b"yes"):
+            return True
+    qs = (scope.get("query_string") or b"").decode("latin-1")
+    return any(part in (f"{PROFILE_QUERY}=1", f"{PROFILE_QUERY}=true") for part in qs.split("&"))
+
+
+def _admin_user(scope) -> tuple[str, str | None] | None:
+    """require_roles("admin") na tokenie z requestu: (user_id, tenant_id); None gdy brak uprawnien."""
+    from app.db import SessionLocal
+    from app.deps import get_current_user, require_roles
+
+    auth = ""
+    for k, v in scope.get("headers") or []:
+        if k == b"authorization":
+            auth = v.decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return None
+    request = Request(scope)
+    db = SessionLocal()
+    try:
+        user = get_current_user(request, db=db, token=auth[7:].strip())
+        require_roles("admin")(request, user=user)
+        return user.id, user.tenant_id
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+
+def _save(prof: ProfileRequest, scope, status_code: int | None) -> None:
+    out = profile_dir()
+    out.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "id": prof.id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "user_id": prof.user_id,
+        "tenant_id": prof.tenant_id,
+        "method": scope.get("method"),
+        "path": scope.get("path"),
+        "query": (scope.get("query_string") or b"").decode("latin-1"),
+        "endpoint": prof.endpoint,
+        "status": status_code,
+    }
+    if prof.profiler is None:
+        meta["error"] = "endpoint not profiled (no ProfilingRoute on this router)"
+    else:
+        prof.profiler.dump_stats(str(out / f"{prof.id}.prof"))
+        buf = io.StringIO()
+        stats = pstats.Stats(prof.profiler, stream=buf)
+        meta["total_s"] = round(stats.total_tt, 4)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        (out / f"{prof.id}.txt").write_text(buf.getvalue(), encoding="utf-8")
+    (out / f"{prof.id}.json").write_text(json.dumps(meta), encoding="utf-8")
+    _prune(out)
+
+
+def _prune(out: Path) -> None:
+    metas = sorted(out.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for meta in metas[: max(0, len(metas) - settings.PROFILE_MAX_FILES)]:
+        for ext in (".json", ".prof", ".txt"):
+            (out / f"{meta.stem}{ext}").unlink(missing_ok=True)
+
+
+def _read_meta(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def list_profiles(tenant_id: str | None) -> list[dict]:
+    """Profile tenanta (sciezki i stosy wywolan innych tenantow nie wychodza poza nich)."""
+    out = profile_dir()
+    if not out.exists():
+        return []
+    items = [m for m in map(_read_meta, out.glob("*.json")) if m is not None and m.get("tenant_id") == tenant_id]
+    return sorted(items, key=lambda m: m.get("created_at") or "", reverse=True)
+
+
+def profile_file(profile_id: str, ext: str, tenant_id: str | None) -> Path | None:
+    """Plik profilu, gdy istnieje i nalezy do tenanta; None w przeciwnym razie (404 jak brak)."""
+    if not profile_id.isalnum():
+        return None
+    meta = _read_meta(profile_dir() / f"{profile_id}.json")
+    if meta is None or meta.get("tenant_id") != tenant_id:
+        return None
+    path = profile_dir() / f"{profile_id}.{ext}"
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILE_ENABLED or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        admin = await run_in_threadpool(_admin_user, scope)
+        if admin is None:
+            await self.app(scope, receive, send)
+            return
+
+        prof = ProfileRequest(*admin)
+        token = _active.set(prof)
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                # zapis przed wyslaniem naglowkow - klient moze od razu pobrac wynik
+                await run_in_threadpool(_save, prof, scope, message["status"])
+                headers = list(message.get("headers") or []) + [
+                    (b"x-profile-id", prof.id.encode()),
+                    (b"x-profile-url", f"{settings.API_PREFIX}/admin/profiles/{prof.id}".encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _active.reset(token)
+
+
+class ProfilingRoute(APIRoute):
+    """APIRoute, ktorego endpoint moze byc profilowany przez ProfilingMiddleware."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
+
+
+def _wrap_endpoint(endpoint):
+    # include_router tworzy trasy ponownie z route.endpoint - nie owijamy drugi raz
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+    name = f"{endpoint.__module__}.{endpoint.__qualname__}"
+
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            prof = _active.get()
+            if prof is None:
+                return await endpoint(*args, **kwargs)
+            # async: profil obejmuje wszystko, co petla zdarzen robi w tym czasie
+            prof.endpoint = name
+            prof.profiler = cProfile.Profile(time.perf_counter)
+            prof.profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                prof.profiler.disable()
+        async_wrapper.__profiled__ = True
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        prof = _active.get()
+        if prof is None:
+            return endpoint(*args, **kwargs)
+        prof.endpoint = name
+        prof.profiler = cProfile.Profile(time.perf_counter)
+        return prof.profiler.runcall(endpoint, *args, **kwargs)
+    wrapper.__profiled__ = True
+    return wrapper
+
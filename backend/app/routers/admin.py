@@ -1,13 +1,21 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from app.db import get_db
-from app.deps import require_roles
+from app.deps import API_KEY_SCOPES, invalidate_api_key, invalidate_principal, require_roles, revoke_tokens
 from app.i18n import t
-from app.models.core import TenantSettings, User
+from app.models.core import ApiKey, TenantSettings, User
+from app.models.ops import SlowRequest
 from app.schemas.common import Msg
-from app.security import hash_password
+from app.security import HashPoolBusy, api_key_digest, generate_api_key, pooled_hash_password
+from app.profiling import ProfilingRoute, list_profiles, profile_file
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=ProfilingRoute)
+
+USER_ROLES = ("admin", "manager", "sales")
 
 @router.get("/settings")
 def get_settings(user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
@@ -29,6 +37,12 @@ def update_settings(payload: dict, user=Depends(require_roles("admin")), db: Ses
     db.commit()
     return {"ok": True}
 
+def _hash_or_503(request: Request, password: str) -> str:
+    try:
+        return pooled_hash_password(password)
+    except HashPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=t(request, "auth.busy"), headers={"Retry-After": "1"})
+
 @router.get("/users")
 def list_users(user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
     rows = db.query(User).filter(User.tenant_id == user.tenant_id).all()
@@ -39,9 +53,9 @@ def create_user(payload: dict, request: Request, user=Depends(require_roles("adm
     email = payload.get("email")
     password = payload.get("password")
     role = payload.get("role", "sales")
-    if not email or not password:
+    if not email or not password or role not in USER_ROLES:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=t(request, "common.validation_failed"))
-    u = User(tenant_id=user.tenant_id, email=email, password_hash=hash_password(password), role=role, is_active=True)
+    u = User(tenant_id=user.tenant_id, email=email, password_hash=_hash_or_503(request, password), role=role, is_active=True)
     db.add(u); db.commit(); db.refresh(u)
     return {"id": u.id}
 
@@ -51,5 +65,185 @@ def deactivate(user_id: str, user=Depends(require_roles("admin")), db: Session =
     if not u:
         raise HTTPException(status_code=404, detail="not found")
     u.is_active = False
+    revoke_tokens(u)
+    db.commit()
+    invalidate_principal(u.id)
+    return {"ok": True}
+
+@router.patch("/users/{user_id}")
+def update_user(user_id: str, payload: dict, request: Request, user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    u = db.query(User).filter(User.tenant_id == user.tenant_id, User.id == user_id).first()
+    if not u:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    if ("email" in payload and not payload["email"]) or ("role" in payload and payload["role"] not in USER_ROLES):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=t(request, "common.validation_failed"))
+    for k in ["email", "role", "is_active"]:
+        if k in payload:
+            setattr(u, k, payload[k])
+    if payload.get("password"):
+        u.password_hash = _hash_or_503(request, payload["password"])
+    if payload.get("password") or payload.get("is_active") is False:
+        revoke_tokens(u)
     db.commit()
+    invalidate_principal(u.id)
+    return {"id": u.id, "email": u.email, "role": u.role, "is_active": u.is_active}
+
+# --- klucze API (klienci maszynowi, app/deps.py) ---
+
+def _api_key_out(k: ApiKey) -> dict:
+    return {
+        "id": k.id, "name": k.name, "prefix": k.prefix, "role": k.role, "scopes": k.scopes,
+        "created_at": k.created_at, "revoked_at": k.revoked_at,
+    }
+
+@router.get("/api-keys")
+def list_api_keys(user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    rows = db.query(ApiKey).filter(ApiKey.tenant_id == user.tenant_id).order_by(ApiKey.created_at.desc()).all()
+    return [_api_key_out(r) for r in rows]
+
+@router.post("/api-keys")
+def create_api_key(payload: dict, request: Request, user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    name = payload.get("name")
+    role = payload.get("role", "sales")
+    scopes = payload.get("scopes") or []
+    if not name or role not in USER_ROLES or not isinstance(scopes, list) or any(s not in API_KEY_SCOPES for s in scopes):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=t(request, "common.validation_failed"))
+    key, prefix = generate_api_key()
+    k = ApiKey(tenant_id=user.tenant_id, name=name, prefix=prefix, key_hash=api_key_digest(key), role=role, scopes=sorted(set(scopes)), created_by_user_id=user.id)
+    db.add(k); db.commit(); db.refresh(k)
+    # pelny klucz tylko w tej odpowiedzi
+    return _api_key_out(k) | {"key": key}
+
+@router.delete("/api-keys/{key_id}")
+def revoke_api_key(key_id: str, request: Request, user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    k = db.query(ApiKey).filter(ApiKey.tenant_id == user.tenant_id, ApiKey.id == key_id).first()
+    if not k:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    if k.revoked_at is None:
+        k.revoked_at = datetime.now(timezone.utc)
+        db.commit()
+    invalidate_api_key(k.prefix)
     return {"ok": True}
+
+# --- slow request log (app/slowlog.py) ---
+
+_SHARED_ROUTE_PREFIX = "/timekeeping/"
+
+def _slow_requests_query(db: Session, user, route: str | None, since: datetime | None, min_ms: float | None, include_sampled: bool):
+    # admin widzi wpisy swojego tenanta oraz modulu timekeeping - jego trasy sa bez logowania i bez
+    # tenanta (tenant_id NULL), a to wlasnie wolne raporty zakresowe; inne anonimowe wpisy (np. login) nie
+    q = db.query(SlowRequest).filter(or_(
+        SlowRequest.tenant_id == user.tenant_id,
+        and_(SlowRequest.tenant_id.is_(None), SlowRequest.route.startswith(_SHARED_ROUTE_PREFIX)),
+    ))
+    if route:
+        q = q.filter(SlowRequest.route.contains(route))
+    if since:
+        q = q.filter(SlowRequest.created_at >= since)
+    if min_ms is not None:
+        q = q.filter(SlowRequest.duration_ms >= min_ms)
+    if not include_sampled:
+        q = q.filter(SlowRequest.sampled.is_(False))
+    return q
+
+def _slow_request_out(r: SlowRequest, with_statements: bool = False) -> dict:
+    out = {
+        "id": r.id, "created_at": r.created_at, "tenant_id": r.tenant_id, "user_id": r.user_id,
+        "method": r.method, "route": r.route, "path": r.path, "params": r.params, "status": r.status,
+        "duration_ms": r.duration_ms, "db_ms": r.db_ms, "query_count": r.query_count, "sampled": r.sampled,
+    }
+    if with_statements:
+        out["statements"] = r.statements or []
+    return out
+
+def _range_bucket(params: dict | None) -> str:
+    """Dlugosc zakresu dat z parametrow raportu (date_from/date_to) - ktore zakresy sa wolne."""
+    query = (params or {}).get("query") or {}
+    if "date" in query:
+        return "1d"
+    try:
+        days = (date.fromisoformat(query["date_to"]) - date.fromisoformat(query["date_from"])).days + 1
+    except (KeyError, TypeError, ValueError):
+        return "-"
+    for limit, label in ((1, "1d"), (7, "<=7d"), (31, "<=31d"), (92, "<=92d"), (366, "<=366d")):
+        if days <= limit:
+            return label
+    return ">366d"
+
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1)))))]
+
+@router.get("/slow-requests")
+def list_slow_requests(route: str | None = None, since: datetime | None = None, min_ms: float | None = None,
+                       include_sampled: bool = False, limit: int = 50,
+                       user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    q = _slow_requests_query(db, user, route, since, min_ms, include_sampled)
+    rows = q.order_by(SlowRequest.id.desc()).limit(max(1, min(limit, 500))).all()
+    return [_slow_request_out(r) for r in rows]
+
+@router.get("/slow-requests/summary")
+def slow_requests_summary(request: Request, group_by: str = "route", since: datetime | None = None, route: str | None = None,
+                          include_sampled: bool = False,
+                          user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    if group_by not in ("route", "tenant", "range", "caller"):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=t(request, "common.validation_failed"))
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(days=7)
+    rows = _slow_requests_query(db, user, route, since, None, include_sampled).all()
+
+    groups = defaultdict(lambda: {"durations": [], "db_ms": 0.0, "queries": 0})
+    for r in rows:
+        if group_by == "caller":
+            # czas SQL per miejsce wywolania w kodzie - ktore zapytania ciagna wolne requesty
+            for st in r.statements or []:
+                g = groups[st.get("caller") or "-"]
+                g["durations"].append(st.get("ms") or 0.0)
+                g["db_ms"] += st.get("ms") or 0.0
+                g["queries"] += 1
+            continue
+        key = {"route": lambda: f"{r.method} {r.route}", "tenant": lambda: r.tenant_id or "-", "range": lambda: f"{r.route} {_range_bucket(r.params)}"}[group_by]()
+        g = groups[key]
+        g["durations"].append(r.duration_ms)
+        g["db_ms"] += r.db_ms or 0.0
+        g["queries"] += r.query_count or 0
+
+    out = []
+    for key, g in groups.items():
+        n = len(g["durations"])
+        out.append({
+            "key": key,
+            "count": n,
+            "avg_ms": round(sum(g["durations"]) / n, 1),
+            "p95_ms": round(_pct(g["durations"], 95), 1),
+            "max_ms": round(max(g["durations"]), 1),
+            "avg_db_ms": round(g["db_ms"] / n, 1),
+            "avg_queries": round(g["queries"] / n, 1),
+        })
+    out.sort(key=lambda x: -x["avg_ms"] * x["count"])
+    return {"group_by": group_by, "since": since, "groups": out}
+
+@router.get("/slow-requests/{entry_id}")
+def get_slow_request(entry_id: int, request: Request, user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    r = _slow_requests_query(db, user, None, None, None, True).filter(SlowRequest.id == entry_id).first()
+    if not r:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    return _slow_request_out(r, with_statements=True)
+
+# --- on-demand profiles (app/profiling.py) ---
+
+@router.get("/profiles")
+def get_profiles(limit: int = 50, user=Depends(require_roles("admin"))):
+    return list_profiles(user.tenant_id)[: max(1, min(limit, 500))]
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, request: Request, format: str = "txt", user=Depends(require_roles("admin"))):
+    if format not in ("txt", "prof", "json"):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=t(request, "common.validation_failed"))
+    path = profile_file(profile_id, format, user.tenant_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    media = {"txt": "text/plain; charset=utf-8", "prof": "application/octet-stream", "json": "application/json"}[format]
+    return FileResponse(path, media_type=media, filename=path.name)
@@ -1,25 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.db import get_db
+from app.deps import Principal, get_current_user, invalidate_principal, revoke_tokens
 from app.i18n import t
-from app.security import verify_password, create_access_token, create_refresh_token, decode_token
+from app.security import HashPoolBusy, async_verify_password, login_throttle, pooled_hash_password, pooled_verify_password, create_access_token, create_refresh_token, decode_token
 from app.models.core import User
-from app.schemas.auth import LoginIn, TokenOut, MeOut
+from app.schemas.auth import LoginIn, PasswordChangeIn, TokenOut, MeOut
+from app.profiling import ProfilingRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=ProfilingRoute)
 
 REFRESH_COOKIE_NAME = "refresh_token"
 
+def _user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
 @router.post("/login", response_model=TokenOut)
-def login(payload: LoginIn, request: Request, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginIn, request: Request, response: Response, db: Session = Depends(get_db)):
+    # async: fala logowan czeka na pule hashujaca w petli zdarzen, nie w watkach threadpoola
+    # throttling przed hashowaniem - zablokowane konto nie zajmuje puli
+    retry_after = login_throttle.retry_after(payload.email)
+    if retry_after:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=t(request, "auth.too_many_attempts"), headers={"Retry-After": str(retry_after)})
+    user = await run_in_threadpool(_user_by_email, db, payload.email)
+    try:
+        valid = bool(user) and await async_verify_password(payload.password, user.password_hash)
+    except HashPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=t(request, "auth.busy"), headers={"Retry-After": "1"})
+    if not valid:
+        login_throttle.failure(payload.email)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.invalid_credentials"))
+    login_throttle.success(payload.email)
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.inactive_user"))
 
-    access = create_access_token(subject=user.id, tenant_id=user.tenant_id, role=user.role)
-    refresh = create_refresh_token(subject=user.id, tenant_id=user.tenant_id, role=user.role)
+    return _issue_tokens(response, user)
+
+def _issue_tokens(response: Response, user: User) -> TokenOut:
+    access = create_access_token(subject=user.id, tenant_id=user.tenant_id, role=user.role, version=user.token_version)
+    refresh = create_refresh_token(subject=user.id, tenant_id=user.tenant_id, role=user.role, version=user.token_version)
     # HTTP-only cookie for refresh token
     response.set_cookie(
         key=REFRESH_COOKIE_NAME,
@@ -32,21 +52,55 @@ def login(payload: LoginIn, request: Request, response: Response, db: Session =
     )
     return TokenOut(access_token=access)
 
-@router.post("/refresh", response_model=TokenOut)
-def refresh(request: Request, response: Response):
+def _refresh_user(request: Request, db: Session) -> User | None:
+    """Uzytkownik z waznego refresh tokena w cookie (aktywny, z aktualnym token_version)."""
     token = request.cookies.get(REFRESH_COOKIE_NAME)
     if not token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
+        return None
     try:
         payload = decode_token(token)
     except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
+        return None
     if payload.get("type") != "refresh":
+        return None
+    user = db.query(User).filter(User.id == payload.get("sub"), User.tenant_id == payload.get("tenant_id")).first()
+    if not user or not user.is_active or user.token_version != payload.get("ver", 0):
+        return None
+    return user
+
+@router.post("/refresh", response_model=TokenOut)
+def refresh(request: Request, db: Session = Depends(get_db)):
+    user = _refresh_user(request, db)
+    if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
-    access = create_access_token(subject=payload["sub"], tenant_id=payload["tenant_id"], role=payload["role"])
+    access = create_access_token(subject=user.id, tenant_id=user.tenant_id, role=user.role, version=user.token_version)
     return TokenOut(access_token=access)
 
 @router.post("/logout")
-def logout(response: Response):
+def logout(request: Request, response: Response, db: Session = Depends(get_db)):
+    # wylogowanie konczy wszystkie sesje uzytkownika (access tokeny tez - claim "ver")
+    user = _refresh_user(request, db)
+    if user is not None:
+        revoke_tokens(user)
+        db.commit()
+        invalidate_principal(user.id)
     response.delete_cookie(REFRESH_COOKIE_NAME, path="/")
     return {"ok": True}
+
+@router.post("/password", response_model=TokenOut)
+def change_password(payload: PasswordChangeIn, request: Request, response: Response, current: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.id == current.id, User.tenant_id == current.tenant_id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=t(request, "auth.unauthorized"))
+    try:
+        if not pooled_verify_password(payload.current_password, user.password_hash):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=t(request, "auth.wrong_password"))
+        user.password_hash = pooled_hash_password(payload.new_password)
+    except HashPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=t(request, "auth.busy"), headers={"Retry-After": "1"})
+    revoke_tokens(user)
+    db.commit()
+    db.refresh(user)
+    invalidate_principal(user.id)
+    # pozostale urzadzenia wylogowane, biezace dostaje nowe tokeny
+    return _issue_tokens(response, user)
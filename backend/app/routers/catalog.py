@@ -0,0 +1,115 @@
+import os
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import get_db
+from app.deps import get_current_user, require_roles
+from app.i18n import t
+from app.models.catalog import CatalogImport, CatalogItem
+from app.schemas.catalog import CatalogImportOut, CatalogItemOut
+from app.services.catalog_import import submit_import
+from app.services.catalog_search import search_catalog
+from app.profiling import ProfilingRoute
+
+router = APIRouter(prefix="/catalog", tags=["catalog"], route_class=ProfilingRoute)
+
+IMPORT_SUFFIXES = (".csv", ".txt", ".xlsx", ".xlsm")
+
+def _item_out(r: CatalogItem) -> CatalogItemOut:
+    return CatalogItemOut(**{k: getattr(r, k) for k in CatalogItemOut.model_fields.keys()})
+
+def _import_out(r: CatalogImport) -> CatalogImportOut:
+    return CatalogImportOut(**{k: getattr(r, k) for k in CatalogImportOut.model_fields.keys()})
+
+@router.get("/items", response_model=list[CatalogItemOut])
+def list_items(
+    supplier: str | None = None,
+    sku: str | None = None,
+    category: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    q = db.query(CatalogItem).filter(CatalogItem.tenant_id == user.tenant_id)
+    if supplier:
+        q = q.filter(CatalogItem.supplier == supplier)
+    if sku:
+        q = q.filter(CatalogItem.sku == sku)
+    if category:
+        q = q.filter(CatalogItem.category == category)
+    rows = q.order_by(CatalogItem.supplier, CatalogItem.sku).offset(offset).limit(limit).all()
+    return [_item_out(r) for r in rows]
+
+@router.get("/search", response_model=list[CatalogItemOut])
+def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    supplier: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Podpowiedzi przy wpisywaniu: SKU/nazwa/model, prefiksy slow i literowki (app/services/catalog_search.py)."""
+    return [_item_out(r) for r in search_catalog(db, user.tenant_id, q, limit=limit, supplier=supplier)]
+
+@router.get("/items/{item_id}", response_model=CatalogItemOut)
+def get_item(item_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    r = db.query(CatalogItem).filter(CatalogItem.tenant_id == user.tenant_id, CatalogItem.id == item_id).first()
+    if not r:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    return _item_out(r)
+
+@router.post("/imports", response_model=CatalogImportOut, status_code=status.HTTP_202_ACCEPTED)
+def create_import(
+    request: Request,
+    file: UploadFile = File(...),
+    supplier: str = Form(..., min_length=1, max_length=100),
+    user=Depends(require_roles("admin", "manager")),
+    db: Session = Depends(get_db),
+):
+    """Przyjmuje cennik XLSX/CSV i zwraca 202 od razu; przetwarzanie w puli importow, status: GET /catalog/imports/{id}."""
+    filename = os.path.basename(file.filename or "")[:255]
+    suffix = os.path.splitext(filename)[1].lower()
+    if suffix not in IMPORT_SUFFIXES or not supplier.strip():
+        raise HTTPException(status_code=422, detail=t(request, "common.validation_failed"))
+
+    job = CatalogImport(tenant_id=user.tenant_id, supplier=supplier.strip(), filename=filename, created_by_user_id=user.id)
+    db.add(job); db.flush()
+
+    # kopia uploadu (spooled temp file) kawalkami na dysk - pula importow czyta ja po zakonczeniu requestu
+    os.makedirs(settings.CATALOG_IMPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.CATALOG_IMPORT_DIR, job.id + suffix)
+    limit = settings.CATALOG_IMPORT_MAX_MB * 1024 * 1024
+    size = 0
+    with open(path, "wb") as out:
+        while chunk := file.file.read(1 << 20):
+            size += len(chunk)
+            if size > limit:
+                break
+            out.write(chunk)
+    if size > limit or size == 0:
+        os.remove(path)
+        db.rollback()
+        raise HTTPException(status_code=413 if size else 422, detail=t(request, "catalog.file_too_large" if size else "common.validation_failed"))
+
+    db.commit(); db.refresh(job)
+    submit_import(job.id, path)
+    return _import_out(job)
+
+@router.get("/imports", response_model=list[CatalogImportOut])
+def list_imports(limit: int = Query(50, ge=1, le=500), user=Depends(get_current_user), db: Session = Depends(get_db)):
+    rows = (
+        db.query(CatalogImport)
+        .filter(CatalogImport.tenant_id == user.tenant_id)
+        .order_by(CatalogImport.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [_import_out(r) for r in rows]
+
+@router.get("/imports/{import_id}", response_model=CatalogImportOut)
+def get_import(import_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    r = db.query(CatalogImport).filter(CatalogImport.tenant_id == user.tenant_id, CatalogImport.id == import_id).first()
+    if not r:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    return _import_out(r)
@@ -5,13 +5,14 @@ from app.deps import get_current_user
 from app.i18n import t
 from app.models.crm import Client, Site
 from app.schemas.crm import ClientIn, ClientOut, SiteIn, SiteOut
+from app.profiling import ProfilingRoute
 
-router = APIRouter(prefix="/crm", tags=["crm"])
+router = APIRouter(prefix="/crm", tags=["crm"], route_class=ProfilingRoute)
 
 @router.get("/clients", response_model=list[ClientOut])
 def list_clients(user=Depends(get_current_user), db: Session = Depends(get_db)):
     rows = db.query(Client).filter(Client.tenant_id == user.tenant_id).order_by(Client.created_at.desc()).all()
-    return [ClientOut(**{k:getattr(r,k) for k in ClientOut.model_fields.keys()}) | {"id": r.id} for r in rows]
+    return [ClientOut(**{k:getattr(r,k) for k in ClientOut.model_fields.keys()}) for r in rows]
 
 @router.post("/clients", response_model=ClientOut)
 def create_client(payload: ClientIn, user=Depends(get_current_user), db: Session = Depends(get_db)):
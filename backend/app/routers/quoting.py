@@ -1,24 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 from app.db import get_db
-from app.deps import get_current_user
+from app.deps import get_current_user, require_roles
 from app.i18n import t
-from app.models.quoting import Deal, Quote, QuoteParam, QuoteLine, QuoteOverhead
+from app.models.quoting import BomRule, Deal, Quote, QuoteLine, QuoteTotals
 from app.models.core import TenantSettings
 from app.schemas.quoting import (
-    DealIn, DealOut, QuoteCreate, QuoteOut, QuoteParamIn,
-    QuoteLineIn, QuoteLineOut, QuoteOverheadIn, QuoteTotalsOut, ValidationIssue
+    BomRuleIn, BomRuleOut, DealIn, DealOut, GenerateLinesOut, QuoteCloneIn, QuoteCreate, QuoteOut, QuoteParamIn,
+    QuoteLineIn, QuoteLineOut, QuoteOverheadIn, QuoteTotalsOut, RepriceIn, RepriceOut, ValidationIssue
 )
-from app.services.pricing import recalc_line_prices, recalc_quote_totals
+from app.services.pricing import apply_totals_delta, line_amounts, recalc_line_prices, recalc_quote_totals
+from app.services.repricing import reprice_lines
 from app.services.validation import validate_quote
-from app.services.rules import generate_lines_from_rules
+from app.services.quote_clone import clone_quote, next_pricing_version
+from app.services.quote_inputs import changed_keys, save_overheads, save_params
+from app.services.quote_numbers import next_quote_seq
+from app.services.rules import FormulaError, generate_lines_from_rules, regenerate_for_params, validate_formula
+from app.profiling import ProfilingRoute
 import datetime
 
-router = APIRouter(prefix="/quoting", tags=["quoting"])
+router = APIRouter(prefix="/quoting", tags=["quoting"], route_class=ProfilingRoute)
 
-def _quote_no(prefix: str, seq: int) -> str:
+def _quote_no(db: Session, tenant_id: str, prefix: str) -> str:
     year = datetime.date.today().year
-    return f"{prefix}-{year}-{seq:04d}"
+    return f"{prefix}-{year}-{next_quote_seq(db, tenant_id, year):04d}"
+
+def _template_no(db: Session, tenant_id: str) -> str:
+    # szablony maja wlasny licznik (rok 0), zeby nie robic dziur w numeracji ofert
+    return f"TPL-{next_quote_seq(db, tenant_id, 0):04d}"
+
+def _quote_prefix(db: Session, tenant_id: str) -> str:
+    prefix = db.query(TenantSettings.quote_prefix).filter(TenantSettings.tenant_id == tenant_id).scalar()
+    return prefix or "Q"
+
+def _quote_out(q: Quote) -> QuoteOut:
+    return QuoteOut(
+        id=q.id, deal_id=q.deal_id, quote_no=q.quote_no, scenario=q.scenario,
+        currency=q.currency, vat_rate=float(q.vat_rate), pricing_version=int(q.pricing_version),
+        is_template=bool(q.is_template),
+    )
 
 @router.get("/deals", response_model=list[DealOut])
 def list_deals(status: str | None = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
@@ -50,9 +71,8 @@ def create_quote(deal_id: str, payload: QuoteCreate, user=Depends(get_current_us
         settings = TenantSettings(tenant_id=user.tenant_id)
         db.add(settings); db.commit(); db.refresh(settings)
 
-    # simple per-tenant sequence: count quotes
-    seq = db.query(Quote).filter(Quote.tenant_id == user.tenant_id).count() + 1
-    qno = _quote_no(settings.quote_prefix or "Q", seq)
+    # per-tenant, per-year sequence; committed together with the quote
+    qno = _quote_no(db, user.tenant_id, settings.quote_prefix or "Q")
     quote = Quote(
         tenant_id=user.tenant_id,
         deal_id=deal_id,
@@ -62,36 +82,64 @@ def create_quote(deal_id: str, payload: QuoteCreate, user=Depends(get_current_us
         created_by_user_id=user.id,
     )
     db.add(quote); db.commit(); db.refresh(quote)
-    return QuoteOut(
-        id=quote.id, deal_id=quote.deal_id, quote_no=quote.quote_no,
-        scenario=quote.scenario, currency=quote.currency, vat_rate=float(quote.vat_rate),
-        pricing_version=int(quote.pricing_version),
-    )
+    return _quote_out(quote)
 
 @router.get("/quotes/{quote_id}", response_model=QuoteOut)
 def get_quote(quote_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
     q = db.query(Quote).filter(Quote.tenant_id == user.tenant_id, Quote.id == quote_id).first()
     if not q:
         raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
-    return QuoteOut(
-        id=q.id, deal_id=q.deal_id, quote_no=q.quote_no, scenario=q.scenario,
-        currency=q.currency, vat_rate=float(q.vat_rate), pricing_version=int(q.pricing_version),
-    )
+    return _quote_out(q)
+
+@router.post("/quotes/{quote_id}/clone", response_model=QuoteOut)
+def clone(quote_id: str, payload: QuoteCloneIn, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    src = db.query(Quote).filter(Quote.tenant_id == user.tenant_id, Quote.id == quote_id).first()
+    if not src:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    if payload.as_template:
+        qno, version = _template_no(db, user.tenant_id), 1
+    elif src.is_template:
+        # szablon nie ma deala - oferta z szablonu tylko przez .../quotes/from-template
+        raise HTTPException(status_code=409, detail=t(request, "quote.template_needs_deal"))
+    else:
+        qno, version = _quote_no(db, user.tenant_id, _quote_prefix(db, user.tenant_id)), next_pricing_version(db, user.tenant_id, src.deal_id)
+    new_id = clone_quote(db, user.tenant_id, quote_id, quote_no=qno, pricing_version=version, is_template=payload.as_template, user_id=user.id)
+    db.commit()
+    return _quote_out(db.get(Quote, new_id))
+
+@router.get("/templates", response_model=list[QuoteOut])
+def list_templates(user=Depends(get_current_user), db: Session = Depends(get_db)):
+    rows = db.query(Quote).filter(Quote.tenant_id == user.tenant_id, Quote.is_template.is_(True)).order_by(Quote.quote_no).all()
+    return [_quote_out(q) for q in rows]
+
+@router.post("/deals/{deal_id}/quotes/from-template/{template_id}", response_model=QuoteOut)
+def create_quote_from_template(deal_id: str, template_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    deal = db.query(Deal.id).filter(Deal.tenant_id == user.tenant_id, Deal.id == deal_id).first()
+    template = db.query(Quote.id).filter(Quote.tenant_id == user.tenant_id, Quote.id == template_id, Quote.is_template.is_(True)).first()
+    if not deal or not template:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    qno = _quote_no(db, user.tenant_id, _quote_prefix(db, user.tenant_id))
+    version = next_pricing_version(db, user.tenant_id, deal_id)
+    new_id = clone_quote(db, user.tenant_id, template_id, quote_no=qno, pricing_version=version, deal_id=deal_id, user_id=user.id)
+    db.commit()
+    return _quote_out(db.get(Quote, new_id))
 
 @router.put("/quotes/{quote_id}/params")
 def upsert_params(quote_id: str, payload: list[QuoteParamIn], user=Depends(get_current_user), db: Session = Depends(get_db)):
-    # Replace all params for simplicity
-    db.query(QuoteParam).filter(QuoteParam.tenant_id == user.tenant_id, QuoteParam.quote_id == quote_id).delete()
-    for p in payload:
-        db.add(QuoteParam(tenant_id=user.tenant_id, quote_id=quote_id, **p.model_dump()))
+    result = save_params(db, user.tenant_id, quote_id, [p.model_dump() for p in payload])
+    changed = changed_keys(result)
+    # linie z regul zaleznych od zmienionych kluczy (po pierwszym generate-lines)
+    lines = regenerate_for_params(db, user.tenant_id, quote_id, changed) if changed else None
     db.commit()
-    return {"ok": True, "count": len(payload)}
+    return {"ok": True, "count": len(payload), **result, "changed": changed, "lines": lines}
 
-@router.post("/quotes/{quote_id}/generate-lines")
-def generate_lines(quote_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    created = generate_lines_from_rules(db, user.tenant_id, quote_id)
+@router.post("/quotes/{quote_id}/generate-lines", response_model=GenerateLinesOut)
+def generate_lines(quote_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    result = generate_lines_from_rules(db, user.tenant_id, quote_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
     db.commit()
-    return {"ok": True, "created": created}
+    return GenerateLinesOut(**result)
 
 @router.get("/quotes/{quote_id}/lines", response_model=list[QuoteLineOut])
 def list_lines(quote_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
@@ -119,38 +167,80 @@ def list_lines(quote_id: str, user=Depends(get_current_user), db: Session = Depe
 def add_line(quote_id: str, payload: QuoteLineIn, user=Depends(get_current_user), db: Session = Depends(get_db)):
     line = QuoteLine(tenant_id=user.tenant_id, quote_id=quote_id, **payload.model_dump(exclude={"sell_price_net_unit","sell_price_net_total"}))
     recalc_line_prices(line)
-    db.add(line); db.commit(); db.refresh(line)
+    db.add(line)
+    cost, sell = line_amounts(line)
+    apply_totals_delta(db, user.tenant_id, quote_id, cost, sell)
+    db.commit()
     return {"id": line.id}
 
 @router.put("/quotes/{quote_id}/lines/{line_id}")
 def update_line(quote_id: str, line_id: str, payload: QuoteLineIn, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    line = db.query(QuoteLine).filter(QuoteLine.tenant_id == user.tenant_id, QuoteLine.quote_id == quote_id, QuoteLine.id == line_id).first()
-    if not line:
+    # pusty UPDATE ... RETURNING (jak w delete_line) blokuje linie (PG: wiersz, SQLite: zapis) i oddaje
+    # wartosci, ktore faktycznie nadpisujemy - rownolegly PUT tej samej linii czeka na commit,
+    # zamiast liczyc delte sum od tej samej starej wartosci (FOR UPDATE na SQLite nic nie blokuje)
+    where = (QuoteLine.tenant_id == user.tenant_id, QuoteLine.quote_id == quote_id, QuoteLine.id == line_id)
+    before = db.execute(
+        update(QuoteLine)
+        .where(*where)
+        .values(qty=QuoteLine.qty)
+        .returning(QuoteLine.qty, QuoteLine.purchase_price_net, QuoteLine.sell_price_net_total)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if not before:
         raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    cost_before, sell_before = line_amounts(before)
+    line = db.query(QuoteLine).filter(*where).populate_existing().one()
     for k,v in payload.model_dump().items():
         setattr(line, k, v)
     recalc_line_prices(line)
+    cost, sell = line_amounts(line)
+    apply_totals_delta(db, user.tenant_id, quote_id, cost - cost_before, sell - sell_before)
     db.commit()
     return {"ok": True}
 
 @router.delete("/quotes/{quote_id}/lines/{line_id}")
 def delete_line(quote_id: str, line_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    db.query(QuoteLine).filter(QuoteLine.tenant_id == user.tenant_id, QuoteLine.quote_id == quote_id, QuoteLine.id == line_id).delete()
+    removed = db.execute(
+        delete(QuoteLine)
+        .where(QuoteLine.tenant_id == user.tenant_id, QuoteLine.quote_id == quote_id, QuoteLine.id == line_id)
+        .returning(QuoteLine.qty, QuoteLine.purchase_price_net, QuoteLine.sell_price_net_total)
+    ).all()
+    for line in removed:
+        cost, sell = line_amounts(line)
+        apply_totals_delta(db, user.tenant_id, quote_id, -cost, -sell)
     db.commit()
     return {"ok": True}
 
 @router.put("/quotes/{quote_id}/overheads")
 def set_overheads(quote_id: str, payload: list[QuoteOverheadIn], user=Depends(get_current_user), db: Session = Depends(get_db)):
-    db.query(QuoteOverhead).filter(QuoteOverhead.tenant_id == user.tenant_id, QuoteOverhead.quote_id == quote_id).delete()
-    for oh in payload:
-        db.add(QuoteOverhead(tenant_id=user.tenant_id, quote_id=quote_id, **oh.model_dump()))
+    result = save_overheads(db, user.tenant_id, quote_id, [oh.model_dump() for oh in payload])
+    changed = changed_keys(result)
+    if changed:
+        apply_totals_delta(db, user.tenant_id, quote_id, overheads_changed=True)
     db.commit()
-    return {"ok": True, "count": len(payload)}
+    return {"ok": True, "count": len(payload), **result, "changed": changed}
+
+@router.get("/quotes/{quote_id}/totals", response_model=QuoteTotalsOut)
+def get_totals(quote_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    # sumy utrzymywane przyrostowo przy kazdej edycji - odczyt bez przeliczania
+    totals = db.query(QuoteTotals).filter(QuoteTotals.tenant_id == user.tenant_id, QuoteTotals.quote_id == quote_id).first()
+    if not totals:
+        q = db.query(Quote).filter(Quote.tenant_id == user.tenant_id, Quote.id == quote_id).first()
+        if not q:
+            raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+        return QuoteTotalsOut(cost_net=0, sell_net=0, vat_amount=0, sell_gross=0, margin_net=0, margin_pct=0)
+    return QuoteTotalsOut(
+        cost_net=float(totals.cost_net), sell_net=float(totals.sell_net),
+        vat_amount=float(totals.vat_amount), sell_gross=float(totals.sell_gross),
+        margin_net=float(totals.margin_net), margin_pct=float(totals.margin_pct),
+    )
 
 @router.post("/quotes/{quote_id}/recalculate", response_model=QuoteTotalsOut)
-def recalc(quote_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def recalc(quote_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
     q = db.query(Quote).filter(Quote.tenant_id == user.tenant_id, Quote.id == quote_id).first()
-    totals = recalc_quote_totals(db, user.tenant_id, quote_id, float(q.vat_rate))
+    if not q:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    totals = recalc_quote_totals(db, user.tenant_id, quote_id)
     return QuoteTotalsOut(
         cost_net=float(totals.cost_net), sell_net=float(totals.sell_net),
         vat_amount=float(totals.vat_amount), sell_gross=float(totals.sell_gross),
@@ -160,3 +250,62 @@ def recalc(quote_id: str, user=Depends(get_current_user), db: Session = Depends(
 @router.get("/quotes/{quote_id}/validation", response_model=list[ValidationIssue])
 def validation(quote_id: str, request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
     return validate_quote(db, request, user.tenant_id, quote_id)
+
+@router.post("/reprice", response_model=RepriceOut)
+def reprice(payload: RepriceIn, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    result = reprice_lines(db, user.tenant_id, **payload.model_dump())
+    db.commit()
+    return RepriceOut(**result)
+
+# --- reguly BOM (app/services/rules.py) ---
+
+def _rule_params(request: Request, payload: BomRuleIn) -> list[str]:
+    # walidacja przy zapisie - generowanie dostaje juz tylko poprawne formuly
+    try:
+        keys = set(validate_formula(payload.qty_formula))
+        if payload.condition:
+            keys |= validate_formula(payload.condition)
+    except FormulaError as e:
+        raise HTTPException(status_code=422, detail=f"{t(request, 'quote.invalid_formula')}: {e}")
+    return sorted(keys)
+
+def _rule_out(r: BomRule) -> BomRuleOut:
+    d = {k: getattr(r, k) for k in BomRuleIn.model_fields.keys()}
+    d["purchase_price_net"] = float(r.purchase_price_net) if r.purchase_price_net is not None else None
+    d["markup_pct"] = float(r.markup_pct)
+    d["sort_order"] = int(r.sort_order)
+    keys = set(validate_formula(r.qty_formula)) | (validate_formula(r.condition) if r.condition else set())
+    return BomRuleOut(**d, id=r.id, params=sorted(keys))
+
+@router.get("/bom-rules", response_model=list[BomRuleOut])
+def list_bom_rules(scenario: str | None = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    q = db.query(BomRule).filter(BomRule.tenant_id == user.tenant_id)
+    if scenario:
+        q = q.filter(BomRule.scenario == scenario)
+    return [_rule_out(r) for r in q.order_by(BomRule.sort_order.asc(), BomRule.name.asc()).all()]
+
+@router.post("/bom-rules", response_model=BomRuleOut)
+def create_bom_rule(payload: BomRuleIn, request: Request, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    _rule_params(request, payload)
+    r = BomRule(tenant_id=user.tenant_id, **payload.model_dump())
+    db.add(r); db.commit(); db.refresh(r)
+    return _rule_out(r)
+
+@router.put("/bom-rules/{rule_id}", response_model=BomRuleOut)
+def update_bom_rule(rule_id: str, payload: BomRuleIn, request: Request, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    r = db.query(BomRule).filter(BomRule.tenant_id == user.tenant_id, BomRule.id == rule_id).first()
+    if not r:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    _rule_params(request, payload)
+    for k, v in payload.model_dump().items():
+        setattr(r, k, v)
+    db.commit(); db.refresh(r)
+    return _rule_out(r)
+
+@router.delete("/bom-rules/{rule_id}")
+def delete_bom_rule(rule_id: str, request: Request, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    deleted = db.query(BomRule).filter(BomRule.tenant_id == user.tenant_id, BomRule.id == rule_id).delete()
+    if not deleted:
+        raise HTTPException(status_code=404, detail=t(request, "common.not_found"))
+    db.commit()
+    return {"ok": True}
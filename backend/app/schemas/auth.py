@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 class TokenOut(BaseModel):
     access_token: str
@@ -8,6 +8,10 @@ class LoginIn(BaseModel):
     email: EmailStr
     password: str
 
+class PasswordChangeIn(BaseModel):
+    current_password: str
+    new_password: str = Field(min_length=8)
+
 class MeOut(BaseModel):
     id: str
     email: EmailStr
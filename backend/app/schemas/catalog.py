@@ -0,0 +1,28 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+class CatalogItemOut(BaseModel):
+    id: str
+    supplier: str
+    sku: str
+    name: str
+    manufacturer: str | None = None
+    model: str | None = None
+    unit: str
+    category: str | None = None
+    ean: str | None = None
+    purchase_price_net: float
+    currency: str
+    updated_at: datetime | None = None
+
+class CatalogImportOut(BaseModel):
+    id: str
+    supplier: str
+    filename: str
+    status: str  # queued/running/done/failed
+    rows: int
+    upserted: int
+    skipped: int
+    error: str | None = None
+    created_at: datetime | None = None
+    finished_at: datetime | None = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+﻿from pydantic import BaseModel, Field, model_validator
 
 class DealIn(BaseModel):
     site_id: str
@@ -15,12 +15,16 @@ class QuoteCreate(BaseModel):
 
 class QuoteOut(BaseModel):
     id: str
-    deal_id: str
+    deal_id: str | None = None  # None dla szablonow
     quote_no: str
     scenario: str
     currency: str
     vat_rate: float
     pricing_version: int
+    is_template: bool = False
+
+class QuoteCloneIn(BaseModel):
+    as_template: bool = False  # True: zapis kopii jako szablonu zamiast nowej wersji
 
 class QuoteParamIn(BaseModel):
     key: str
@@ -56,6 +60,58 @@ class QuoteTotalsOut(BaseModel):
     margin_net: float
     margin_pct: float
 
+class RepriceIn(BaseModel):
+    # cel: linie otwartych ofert tenanta zawezone co najmniej jednym filtrem (quote_ids/ref_id/line_type)
+    # albo jawnie wszystkie otwarte oferty (all_open_quotes: true)
+    quote_ids: list[str] | None = None
+    ref_id: str | None = None
+    line_type: str | None = None
+    all_open_quotes: bool = False
+    include_closed: bool = False
+    # zmiana: mnoznik ceny zakupu (1.08 = +8%) albo nowa cena, i/lub nowy narzut
+    price_factor: float | None = Field(default=None, gt=0)
+    purchase_price_net: float | None = Field(default=None, ge=0)
+    markup_pct: float | None = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def _one_price_change(self):
+        if self.price_factor is not None and self.purchase_price_net is not None:
+            raise ValueError("price_factor and purchase_price_net are mutually exclusive")
+        # bez filtra jedna pomylka (np. stala cena zakupu) nadpisalaby wszystkie linie tenanta
+        if not (self.quote_ids or self.ref_id or self.line_type or self.all_open_quotes):
+            raise ValueError("at least one of quote_ids, ref_id, line_type or all_open_quotes=true is required")
+        if self.all_open_quotes and self.include_closed:
+            raise ValueError("all_open_quotes cannot be combined with include_closed")
+        return self
+
+class RepriceOut(BaseModel):
+    lines: int
+    quotes: int
+
+class BomRuleIn(BaseModel):
+    scenario: str | None = None  # split/vrf/vent, None = kazdy
+    name: str = Field(min_length=1, max_length=255)
+    line_type: str = "material"
+    ref_id: str | None = None
+    unit: str | None = None
+    qty_formula: str = Field(min_length=1)
+    condition: str | None = None
+    purchase_price_net: float | None = Field(default=None, ge=0)
+    markup_pct: float = 0.2
+    sort_order: int = 0
+    is_active: bool = True
+
+class BomRuleOut(BomRuleIn):
+    id: str
+    params: list[str]  # klucze parametrow uzyte w formulach
+
+class GenerateLinesOut(BaseModel):
+    ok: bool = True
+    created: int
+    updated: int = 0
+    deleted: int
+    errors: list[dict]
+
 class ValidationIssue(BaseModel):
     level: str  # warning/block
     code: str
@@ -0,0 +1,41 @@
+"""Moves old, fully locked timekeeping months to the cold archive (Parquet files).
+
+Usage: python -m app.scripts.archive_timekeeping [--after-months N] [--dir PATH] [--dry-run]
+"""
+
+import argparse
+from pathlib import Path
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import core  # noqa: F401  (User - relacja TkEmployee.user)
+from app.timekeeping.archive import archivable_months, archive_horizon, archive_month
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--after-months", type=int, default=settings.TK_ARCHIVE_AFTER_MONTHS)
+    ap.add_argument("--dir", default=settings.TK_ARCHIVE_DIR)
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+
+    horizon = archive_horizon(after_months=args.after_months)
+    db = SessionLocal()
+    try:
+        print("=== TIMEKEEPING ARCHIVE ===")
+        print("horizon:", horizon.isoformat())
+        for m in archivable_months(db, horizon):
+            label = m["month"].strftime("%Y-%m")
+            if m["not_locked"]:
+                print(f"{label}: skipped, {m['not_locked']}/{m['crew_logs']} crew logs not locked")
+                continue
+            if args.dry_run:
+                print(f"{label}: would archive {m['crew_logs']} crew logs")
+                continue
+            part = archive_month(db, m["month"], base_dir=Path(args.dir))
+            if part:
+                print(f"{label}: {part.crew_logs} crew logs, {part.rows} rows, {part.size_bytes} B -> {part.path}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
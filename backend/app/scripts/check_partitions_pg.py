@@ -0,0 +1,114 @@
+"""Checks monthly partitioning of tk_crew_logs / tk_crew_work_segments on a real PostgreSQL.
+
+Run after `alembic upgrade head`: python -m app.scripts.check_partitions_pg
+
+Everything happens in one transaction that is rolled back at the end, so it is safe on a
+dev/staging copy. Writes a crew log with segments through the ORM (composite PK / FK
+(crew_log_id, work_date)) for a month past the partition horizon, so the rows land in
+DEFAULT, then runs ensure_month_partitions and verifies the rows were moved to the new
+month partitions and still load through the ORM. Exit code 1 = a check failed.
+"""
+
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.models import core  # noqa: F401  (User - relacja TkEmployee.user)
+from app.timekeeping.models import (
+    TkCrewLog,
+    TkCrewLogMember,
+    TkCrewWorkSegment,
+    TkEmployee,
+    TkSegmentType,
+    TkSite,
+    TkVehicle,
+)
+from app.timekeeping.partitions import (
+    MONTHS_AHEAD,
+    add_months,
+    default_partition_name,
+    ensure_month_partitions,
+    month_partition_name,
+)
+
+
+def _partition_of(conn, table: str, row_id: int) -> str:
+    return conn.execute(text(f"SELECT tableoid::regclass::text FROM {table} WHERE id = :id"), {"id": row_id}).scalar()
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print("dialect:", engine.dialect.name, "- nothing to check (PostgreSQL only)")
+        return
+
+    today = date.today()
+    month = add_months(date(today.year, today.month, 1), MONTHS_AHEAD + 2)
+    work_date = month + timedelta(days=9)
+    failures = []
+
+    def check(label, ok):
+        print(("ok  " if ok else "FAIL"), label)
+        if not ok:
+            failures.append(label)
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            db = Session(bind=conn)
+            emp = TkEmployee(full_name="partition check")
+            veh = TkVehicle(plate=f"PCHK-{work_date:%Y%m}")
+            site = TkSite(name="partition check")
+            db.add_all([emp, veh, site])
+            db.flush()
+
+            crew_log = TkCrewLog(work_date=work_date, vehicle_id=veh.id, created_by_employee_id=emp.id)
+            crew_log.members.append(TkCrewLogMember(employee_id=emp.id))
+            start = datetime(work_date.year, work_date.month, work_date.day, 7, tzinfo=timezone.utc)
+            for seg_type, hours in ((TkSegmentType.travel, 1), (TkSegmentType.work, 6)):
+                crew_log.segments.append(
+                    TkCrewWorkSegment(
+                        work_date=work_date, site_id=site.id, segment_type=seg_type,
+                        start_at=start, end_at=start + timedelta(hours=hours), start_lat=52.0, start_lng=21.0,
+                    )
+                )
+                start += timedelta(hours=hours)
+            db.add(crew_log)
+            db.flush()
+            seg_ids = [s.id for s in crew_log.segments]
+
+            check("log lands in DEFAULT", _partition_of(conn, "tk_crew_logs", crew_log.id) == default_partition_name("tk_crew_logs"))
+
+            created = ensure_month_partitions(conn, start=month, months_ahead=MONTHS_AHEAD + 2)
+            print("created:", ", ".join(created) if created else "-")
+            check(
+                "log moved to month partition",
+                _partition_of(conn, "tk_crew_logs", crew_log.id) == month_partition_name("tk_crew_logs", month),
+            )
+            check(
+                "segments moved to month partition",
+                all(
+                    _partition_of(conn, "tk_crew_work_segments", sid) == month_partition_name("tk_crew_work_segments", month)
+                    for sid in seg_ids
+                ),
+            )
+
+            db.expunge_all()
+            loaded = db.execute(
+                select(TkCrewLog).where(TkCrewLog.id == crew_log.id, TkCrewLog.work_date == work_date)
+            ).scalar_one()
+            check("ORM loads segments", sorted(s.id for s in loaded.segments) == sorted(seg_ids))
+            check("ORM loads members", [m.employee_id for m in loaded.members] == [emp.id])
+        finally:
+            trans.rollback()
+
+    print("=== PARTITIONS CHECK ===")
+    print("failed:", len(failures))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
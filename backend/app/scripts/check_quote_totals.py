@@ -0,0 +1,105 @@
+"""Compares stored quote_totals with a full recompute from quote_lines / quote_overheads.
+
+Run periodically from cron: python -m app.scripts.check_quote_totals [--tenant ID] [--fix]
+
+Totals are maintained incrementally on every line/overhead edit (app/services/pricing.py
+apply_totals_delta); this catches drift from bulk SQL, manual fixes or races on the first
+edit of a quote. --fix recomputes the mismatched quotes. Exit code 1 = mismatches left.
+"""
+
+import argparse
+import sys
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.db import SessionLocal, engine
+from app.models.quoting import Quote, QuoteLine, QuoteOverhead, QuoteTotals
+from app.services.pricing import refresh_quote_totals, totals_expressions
+
+COLUMNS = ["cost_net_lines", "sell_net_lines", "overhead_pct", "cost_net", "sell_net", "vat_amount", "sell_gross", "margin_net", "margin_pct"]
+
+
+def _tolerance() -> Decimal:
+    # PostgreSQL: Numeric, porownanie dokladne; SQLite trzyma REAL
+    return Decimal("0") if engine.dialect.name == "postgresql" else Decimal("0.0001")
+
+
+def expected_query(tenant_id: str | None = None):
+    lines = (
+        select(
+            QuoteLine.quote_id,
+            func.sum(QuoteLine.qty * QuoteLine.purchase_price_net).label("cost_lines"),
+            func.sum(QuoteLine.sell_price_net_total).label("sell_lines"),
+        )
+        .group_by(QuoteLine.quote_id)
+        .subquery()
+    )
+    overheads = select(QuoteOverhead.quote_id, func.sum(QuoteOverhead.pct).label("pct")).group_by(QuoteOverhead.quote_id).subquery()
+    cost = func.coalesce(lines.c.cost_lines, 0)
+    sell = func.coalesce(lines.c.sell_lines, 0)
+    pct = func.coalesce(overheads.c.pct, 0)
+    expected = {"cost_net_lines": cost, "sell_net_lines": sell, "overhead_pct": pct, **totals_expressions(cost, sell, pct, Quote.vat_rate)}
+
+    q = (
+        select(
+            QuoteTotals.quote_id,
+            QuoteTotals.tenant_id,
+            *[getattr(QuoteTotals, c) for c in COLUMNS],
+            *[expected[c].label(f"expected_{c}") for c in COLUMNS],
+        )
+        .join(Quote, Quote.id == QuoteTotals.quote_id)
+        .outerjoin(lines, lines.c.quote_id == QuoteTotals.quote_id)
+        .outerjoin(overheads, overheads.c.quote_id == QuoteTotals.quote_id)
+        .order_by(QuoteTotals.quote_id)
+    )
+    if tenant_id:
+        q = q.where(QuoteTotals.tenant_id == tenant_id)
+    return q
+
+
+def diff_row(row, tolerance: Decimal) -> dict:
+    out = {}
+    for c in COLUMNS:
+        stored = Decimal(str(getattr(row, c) or 0))
+        expected = Decimal(str(getattr(row, f"expected_{c}") or 0))
+        if abs(stored - expected) > tolerance:
+            out[c] = (stored, expected)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check incrementally maintained quote totals against a full recompute")
+    ap.add_argument("--tenant", default=None)
+    ap.add_argument("--fix", action="store_true", help="recompute mismatched quotes")
+    args = ap.parse_args()
+
+    tolerance = _tolerance()
+    db = SessionLocal()
+    try:
+        checked = 0
+        mismatched = []
+        for row in db.execute(expected_query(args.tenant)):
+            checked += 1
+            diff = diff_row(row, tolerance)
+            if diff:
+                mismatched.append((row.quote_id, row.tenant_id, diff))
+
+        print("=== QUOTE TOTALS CHECK ===")
+        print("checked:", checked)
+        print("mismatched:", len(mismatched))
+        for quote_id, tenant_id, diff in mismatched:
+            print(f"  {quote_id} " + ", ".join(f"{c}: stored {s} expected {e}" for c, (s, e) in diff.items()))
+            if args.fix:
+                refresh_quote_totals(db, tenant_id, quote_id)
+        if args.fix and mismatched:
+            db.commit()
+            print("fixed:", len(mismatched))
+    finally:
+        db.close()
+    if mismatched and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
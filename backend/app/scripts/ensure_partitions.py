@@ -0,0 +1,19 @@
+"""Creates missing monthly partitions for timekeeping tables (PostgreSQL only).
+
+Run daily from cron: python -m app.scripts.ensure_partitions [months_ahead]
+"""
+
+import sys
+
+from app.db import engine
+from app.timekeeping.partitions import MONTHS_AHEAD, ensure_month_partitions_for_engine
+
+def main():
+    months_ahead = int(sys.argv[1]) if len(sys.argv) > 1 else MONTHS_AHEAD
+    created = ensure_month_partitions_for_engine(engine, months_ahead=months_ahead)
+    print("=== PARTITIONS ===")
+    print("dialect:", engine.dialect.name)
+    print("created:", ", ".join(created) if created else "-")
+
+if __name__ == "__main__":
+    main()
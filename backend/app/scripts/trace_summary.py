@@ -0,0 +1,91 @@
+"""Summarises trace JSON lines (TRACE_EXPORT=file) per route and stage.
+
+    python -m app.scripts.trace_summary traces.jsonl [--route reports/payroll]
+
+Stage comes from the span name suffix: *.query* -> query, *.aggregate -> aggregate,
+validate, *.render / xlsx.save / pdf.build -> render, stream. "other" is handler time not
+covered by any stage span (e.g. building openpyxl sheets inline in the endpoint).
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+STAGES = ["query", "aggregate", "validate", "render", "stream", "other"]
+
+
+def stage_of(name: str) -> str | None:
+    suffix = name.rsplit(".", 1)[-1]
+    if suffix.startswith("query"):
+        return "query"
+    if suffix == "aggregate":
+        return "aggregate"
+    if name == "validate":
+        return "validate"
+    if name == "stream":
+        return "stream"
+    if suffix in ("render", "save", "build"):
+        return "render"
+    return None
+
+
+def summarise(spans: list[dict]) -> dict:
+    by_trace = defaultdict(list)
+    for s in spans:
+        by_trace[s["trace_id"]].append(s)
+
+    routes = defaultdict(lambda: {"count": 0, "total_ms": [], **{st: 0.0 for st in STAGES}})
+    for trace in by_trace.values():
+        root = next((s for s in trace if s["parent_id"] is None), None)
+        if root is None:
+            continue
+        r = routes[f"{root['name'].split(' ', 1)[0]} {root['attrs'].get('route') or root['name'].split(' ', 1)[-1]}"]
+        r["count"] += 1
+        r["total_ms"].append(root["duration_ms"])
+
+        children = defaultdict(list)
+        for s in trace:
+            children[s["parent_id"]].append(s)
+
+        def _walk(span_id):
+            # suma etapow w poddrzewie (bez zagniezdzonych etapow w etapie)
+            covered = 0.0
+            for child in children.get(span_id, []):
+                st = stage_of(child["name"])
+                if st:
+                    r[st] += child["duration_ms"]
+                    covered += child["duration_ms"]
+                else:
+                    covered += _walk(child["span_id"])
+            return covered
+
+        for handler in (s for s in trace if s["name"] == "handler"):
+            r["other"] += max(0.0, handler["duration_ms"] - _walk(handler["span_id"]))
+        for s in trace:
+            if s["name"] in ("validate", "stream") and s["parent_id"] is not None:
+                r[s["name"]] += s["duration_ms"]
+    return routes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-route stage breakdown of trace JSON lines")
+    ap.add_argument("path")
+    ap.add_argument("--route", default="", help="substring filter")
+    args = ap.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+
+    routes = summarise(spans)
+    print("=== TRACE SUMMARY (mean ms per request) ===")
+    print(f"{'route':50s} {'n':>5s} {'total':>9s} " + " ".join(f"{st:>9s}" for st in STAGES))
+    for name, r in sorted(routes.items(), key=lambda kv: -sum(kv[1]["total_ms"])):
+        if args.route and args.route not in name:
+            continue
+        n = r["count"]
+        mean_total = sum(r["total_ms"]) / n
+        print(f"{name[:50]:50s} {n:>5d} {mean_total:>9.1f} " + " ".join(f"{r[st] / n:>9.1f}" for st in STAGES))
+
+
+if __name__ == "__main__":
+    main()
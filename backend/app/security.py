@@ -1,3 +1,12 @@
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 from passlib.context import CryptContext
@@ -13,15 +22,208 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
-def create_access_token(subject: str, tenant_id: str, role: str, expires_minutes: int | None = None) -> str:
+# --- hashowanie w puli procesow ---
+# pbkdf2 trzyma CPU (i GIL) przez dziesiatki ms; fala logowan o 7:00 na watkach requestow
+# zaglodzilaby pozostale endpointy workera. Endpointy wolaja pooled_*: praca idzie do osobnych
+# procesow, a liczba zadan w toku jest ograniczona - nadmiar czeka max HASH_QUEUE_TIMEOUT i dostaje 503.
+# Login (najczestszy) jest async: czeka na asyncio.Semaphore i wrap_future, bez blokowania watku;
+# endpointy sync (zmiana hasla, zakladanie uzytkownikow) maja osobny limit HASH_MAX_IN_FLIGHT.
+
+class HashPoolBusy(RuntimeError):
+    pass
+
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = threading.Lock()
+_hash_slots: threading.BoundedSemaphore | None = None
+
+def _timed(fn, *args):
+    # w procesie puli: wynik + moment startu (kolejka = start - wyslanie)
+    started = time.time()
+    return fn(*args), started
+
+def _get_hash_pool() -> ProcessPoolExecutor | None:
+    global _hash_pool, _hash_slots
+    if settings.HASH_POOL_WORKERS <= 0:
+        return None
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                # spawn: bez forka procesu z otwartymi polaczeniami do bazy i watkami uvicorna
+                _hash_pool = ProcessPoolExecutor(max_workers=settings.HASH_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+                _hash_slots = threading.BoundedSemaphore(settings.HASH_MAX_IN_FLIGHT)
+    return _hash_pool
+
+def _run_hashing(op: str, fn, *args):
+    from app import metrics
+
+    pool = _get_hash_pool()
+    submitted = time.time()
+    if pool is None:
+        result, started = _timed(fn, *args)
+    else:
+        if not _hash_slots.acquire(timeout=settings.HASH_QUEUE_TIMEOUT):
+            metrics.password_hash_rejected.inc(op=op)
+            raise HashPoolBusy(op)
+        try:
+            result, started = pool.submit(_timed, fn, *args).result()
+        finally:
+            _hash_slots.release()
+    metrics.password_hash_queue.observe(max(0.0, started - submitted), op=op)
+    metrics.password_hash_duration.observe(max(0.0, time.time() - started), op=op)
+    return result
+
+_async_slots: asyncio.Semaphore | None = None
+
+async def _run_hashing_async(op: str, fn, *args):
+    """Jak _run_hashing dla endpointow async: czekanie na slot i na wynik nie zajmuje watku threadpoola."""
+    from starlette.concurrency import run_in_threadpool
+    from app import metrics
+
+    global _async_slots
+    pool = _get_hash_pool()
+    submitted = time.time()
+    if pool is None:
+        result, started = await run_in_threadpool(_timed, fn, *args)
+    else:
+        if _async_slots is None:
+            _async_slots = asyncio.Semaphore(settings.HASH_MAX_IN_FLIGHT)
+        try:
+            await asyncio.wait_for(_async_slots.acquire(), timeout=settings.HASH_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.password_hash_rejected.inc(op=op)
+            raise HashPoolBusy(op) from None
+        try:
+            result, started = await asyncio.wrap_future(pool.submit(_timed, fn, *args))
+        finally:
+            _async_slots.release()
+    metrics.password_hash_queue.observe(max(0.0, started - submitted), op=op)
+    metrics.password_hash_duration.observe(max(0.0, time.time() - started), op=op)
+    return result
+
+async def async_verify_password(password: str, password_hash: str) -> bool:
+    return await _run_hashing_async("verify", verify_password, password, password_hash)
+
+def pooled_hash_password(password: str) -> str:
+    return _run_hashing("hash", hash_password, password)
+
+def pooled_verify_password(password: str, password_hash: str) -> bool:
+    return _run_hashing("verify", verify_password, password, password_hash)
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+# --- throttling prob logowania per konto ---
+
+class LoginThrottle:
+    """Nieudane proby per konto (email) w oknie czasowym; po LOGIN_MAX_FAILURES konto czeka.
+
+    Sprawdzane przed weryfikacja hasla, wiec credential stuffing nie zuzywa puli hashujacej.
+    Licznik per proces (przy kilku replikach limit efektywnie mnozy sie przez ich liczbe).
+    """
+
+    def __init__(self):
+        self._failures: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, key: str, now: float) -> deque:
+        q = self._failures.get(key)
+        if q is None:
+            return deque()
+        while q and q[0] <= now - settings.LOGIN_FAILURE_WINDOW:
+            q.popleft()
+        if not q:
+            self._failures.pop(key, None)
+        return q
+
+    def retry_after(self, email: str) -> int:
+        """0 = mozna probowac, inaczej liczba sekund do odblokowania."""
+        key = (email or "").strip().lower()
+        now = time.monotonic()
+        with self._lock:
+            q = self._recent(key, now)
+            if len(q) < settings.LOGIN_MAX_FAILURES:
+                return 0
+            return max(1, int(q[0] + settings.LOGIN_FAILURE_WINDOW - now) + 1)
+
+    def failure(self, email: str) -> None:
+        key = (email or "").strip().lower()
+        with self._lock:
+            if len(self._failures) >= 100_000:
+                self._failures.pop(next(iter(self._failures)), None)
+            self._failures.setdefault(key, deque()).append(time.monotonic())
+
+    def success(self, email: str) -> None:
+        with self._lock:
+            self._failures.pop((email or "").strip().lower(), None)
+
+login_throttle = LoginThrottle()
+
+def create_access_token(subject: str, tenant_id: str, role: str, expires_minutes: int | None = None, version: int = 0) -> str:
     exp = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"sub": subject, "tenant_id": tenant_id, "role": role, "type": "access", "exp": exp}
+    to_encode = {"sub": subject, "tenant_id": tenant_id, "role": role, "ver": version, "type": "access", "exp": exp}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(subject: str, tenant_id: str, role: str, expires_days: int | None = None) -> str:
+def create_refresh_token(subject: str, tenant_id: str, role: str, expires_days: int | None = None, version: int = 0) -> str:
     exp = datetime.now(timezone.utc) + timedelta(days=expires_days or settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"sub": subject, "tenant_id": tenant_id, "role": role, "type": "refresh", "exp": exp}
+    to_encode = {"sub": subject, "tenant_id": tenant_id, "role": role, "ver": version, "type": "refresh", "exp": exp}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
 
-def decode_token(token: str) -> dict:
+# --- cache zweryfikowanych tokenow ---
+# Aplikacja mobilna odpytuje API co kilka sekund tym samym tokenem; weryfikacja HMAC i parsowanie
+# claimow za kazdym razem to czysty narzut. LRU: sha256(token) -> (exp, claims), wazne do exp.
+# Uniewaznianie nie dotyczy cache - odwolanie tokenow to claim "ver" porownywany z users.token_version.
+
+_decoded: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+_decoded_lock = threading.Lock()
+
+def _verify_token(token: str) -> dict:
     return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+
+def decode_token(token: str) -> dict:
+    if settings.TOKEN_CACHE_SIZE <= 0:
+        return _verify_token(token)
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    now = time.time()
+    with _decoded_lock:
+        hit = _decoded.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _decoded.move_to_end(key)
+                return dict(hit[1])
+            del _decoded[key]
+    claims = _verify_token(token)  # wyjatek (zly podpis / wygasly) nie trafia do cache
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        with _decoded_lock:
+            _decoded[key] = (float(exp), claims)
+            _decoded.move_to_end(key)
+            while len(_decoded) > settings.TOKEN_CACHE_SIZE:
+                _decoded.popitem(last=False)
+    return dict(claims)
+
+# --- klucze API (klienci maszynowi) ---
+# "hqp_<prefix>_<sekret>": prefix to indeksowany lookup, w bazie tylko HMAC-SHA256 klucza z SECRET_KEY.
+# Sekret ma 256 bitow losowosci, wiec zamiast pbkdf2 wystarcza jeden HMAC - weryfikacja kosztuje
+# mikrosekundy i nie idzie do puli hashujacej. Zmiana SECRET_KEY uniewaznia wszystkie klucze.
+
+API_KEY_PREFIX = "hqp_"
+
+def generate_api_key() -> tuple[str, str]:
+    """(pelny klucz, prefix)."""
+    prefix = secrets.token_hex(6)
+    return f"{API_KEY_PREFIX}{prefix}_{secrets.token_urlsafe(32)}", prefix
+
+def api_key_prefix(key: str) -> str | None:
+    if not key.startswith(API_KEY_PREFIX):
+        return None
+    prefix, sep, secret = key[len(API_KEY_PREFIX):].partition("_")
+    if not sep or not secret or len(prefix) != 12:
+        return None
+    return prefix
+
+def api_key_digest(key: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), key.encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1,489 @@
+"""Syntetyczne dane do benchmarkow: flota, kilka lat crew logow z segmentami, nieobecnosci i oferty.
+
+    python -m app.seeds.seed_bench --vehicles 200 --employees 600 --years 5 --quotes 20000
+
+Wiersze nie ida przez ORM ani _ensure_row: id sa liczone z gory, a paczki po --batch
+wierszy laduja sie przez COPY (PostgreSQL) albo executemany (SQLite i reszta).
+Logi starsze niz --lock-months sa `locked` i dostaja snapshoty (jak lock-range w api.py),
+wiec raporty na takiej bazie chodza tymi samymi sciezkami co na produkcji.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+from types import SimpleNamespace
+
+from sqlalchemy import func, select, text
+
+from app.db import engine
+from app.models.core import Tenant, TenantSettings
+from app.models.crm import Client, Site
+from app.models.quoting import Deal, Quote, QuoteLine, QuoteOverhead, QuoteParam, QuoteTotals
+from app.timekeeping.models import (
+    TkAbsence,
+    TkAbsenceType,
+    TkCrewLog,
+    TkCrewLogMember,
+    TkCrewLogSnapshot,
+    TkCrewLogSnapshotMember,
+    TkCrewLogStatus,
+    TkCrewWorkSegment,
+    TkEmployee,
+    TkSegmentType,
+    TkSite,
+    TkVehicle,
+)
+from app.timekeeping.partitions import add_months, ensure_month_partitions
+from app.timekeeping.snapshots import compute_crew_log_totals
+
+# kolejnosc flushowania = kolejnosc FK
+_TABLES = [
+    TkVehicle.__table__,
+    TkEmployee.__table__,
+    TkSite.__table__,
+    TkAbsence.__table__,
+    TkCrewLog.__table__,
+    TkCrewLogMember.__table__,
+    TkCrewWorkSegment.__table__,
+    TkCrewLogSnapshot.__table__,
+    TkCrewLogSnapshotMember.__table__,
+    Client.__table__,
+    Site.__table__,
+    Deal.__table__,
+    Quote.__table__,
+    QuoteParam.__table__,
+    QuoteLine.__table__,
+    QuoteOverhead.__table__,
+    QuoteTotals.__table__,
+]
+
+_FIRST_NAMES = ["Jan", "Piotr", "Krzysztof", "Andrzej", "Tomasz", "Pawel", "Marcin", "Michal", "Lukasz", "Grzegorz", "Adam", "Marek", "Kamil", "Rafal", "Jakub"]
+_LAST_NAMES = ["Nowak", "Kowalski", "Wisniewski", "Wojcik", "Kowalczyk", "Kaminski", "Lewandowski", "Zielinski", "Szymanski", "Wozniak", "Dabrowski", "Kozlowski", "Mazur", "Krawczyk"]
+_CITIES = [("Katowice", 50.2649, 19.0238), ("Gliwice", 50.2945, 18.6714), ("Krakow", 50.0647, 19.9450), ("Bielsko-Biala", 49.8224, 19.0584), ("Tychy", 50.1218, 18.9980), ("Sosnowiec", 50.2863, 19.1041)]
+_MAKES = ["Ford Transit", "Renault Master", "VW Crafter", "Fiat Ducato", "Mercedes Sprinter", "Iveco Daily"]
+_LINES = [
+    ("equipment", "Jednostka wewnetrzna split 3.5 kW", "szt", 1800, 3200),
+    ("equipment", "Jednostka zewnetrzna VRF 28 kW", "szt", 21000, 36000),
+    ("equipment", "Centrala wentylacyjna 2000 m3/h", "szt", 14000, 26000),
+    ("material", "Rura miedziana 1/4\"", "m", 9, 16),
+    ("material", "Rura miedziana 3/8\"", "m", 13, 22),
+    ("material", "Izolacja kauczukowa", "m", 4, 9),
+    ("material", "Kanal wentylacyjny 200 mm", "m", 25, 60),
+    ("material", "Skroplinowy przewod PVC", "m", 3, 7),
+    ("labor", "Montaz jednostki", "h", 90, 140),
+    ("labor", "Uruchomienie i pomiary", "h", 110, 160),
+    ("service", "Przeglad serwisowy", "szt", 250, 450),
+    ("other", "Transport i rozladunek", "szt", 200, 900),
+]
+_PARAM_KEYS = ["units_count", "pipe_length_m", "floor_area_m2", "rooms", "ceiling_height_m"]
+_SCENARIOS = ["split", "vrf", "vent"]
+_DEAL_STATUSES = ["new", "estimating", "sent", "won", "lost"]
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _copy_value(v):
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, (list, dict)):
+        return json.dumps(v)
+    return v
+
+
+class BulkLoader:
+    """Bufory wierszy per tabela; flush w kolejnosci FK, COPY na PG, executemany na pozostalych."""
+
+    def __init__(self, conn, batch: int):
+        self.conn = conn
+        self.batch = batch
+        self.pg = conn.dialect.name == "postgresql"
+        self.buffers = {t.name: [] for t in _TABLES}
+        self.tables = {t.name: t for t in _TABLES}
+        self.counts = {t.name: 0 for t in _TABLES}
+        self.pending = 0
+
+    def add(self, table, row: dict) -> None:
+        self.buffers[table.name].append(row)
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        for t in _TABLES:
+            rows = self.buffers[t.name]
+            if not rows:
+                continue
+            if self.pg:
+                self._copy(t, rows)
+            else:
+                self.conn.execute(t.insert(), rows)
+            self.counts[t.name] += len(rows)
+            self.buffers[t.name] = []
+        self.pending = 0
+
+    def _copy(self, table, rows) -> None:
+        cols = list(rows[0].keys())
+        raw = self.conn.connection.driver_connection
+        with raw.cursor() as cur:
+            with cur.copy(f"COPY {table.name} ({', '.join(cols)}) FROM STDIN") as cp:
+                for r in rows:
+                    cp.write_row([_copy_value(r[c]) for c in cols])
+
+    def fix_sequences(self) -> None:
+        if not self.pg:
+            return
+        for t in _TABLES:
+            if "id" in t.c and t.c.id.type.python_type is int and self.counts[t.name]:
+                self.conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{t.name}', 'id'), (SELECT MAX(id) FROM {t.name}))"
+                ))
+
+
+def _next_id(conn, table) -> int:
+    return int(conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()) + 1
+
+
+def _workdays(d_from: date, d_to: date):
+    d = d_from
+    while d <= d_to:
+        yield d
+        d += timedelta(days=1)
+
+
+def _fleet(loader, rnd, args, tag):
+    conn = loader.conn
+    vid, eid, sid = _next_id(conn, TkVehicle.__table__), _next_id(conn, TkEmployee.__table__), _next_id(conn, TkSite.__table__)
+    now = _now()
+
+    vehicles = []
+    for i in range(args.vehicles):
+        loader.add(TkVehicle.__table__, {
+            "id": vid + i, "plate": f"{tag}-{i:05d}", "make_model": rnd.choice(_MAKES),
+            "navisoft_device_id": None, "is_active": True, "created_at": now,
+        })
+        vehicles.append(vid + i)
+
+    employees = []
+    for i in range(args.employees):
+        full_name = f"{rnd.choice(_FIRST_NAMES)} {rnd.choice(_LAST_NAMES)} {tag}{i:04d}"
+        loader.add(TkEmployee.__table__, {
+            "id": eid + i, "full_name": full_name, "user_id": None, "is_active": True, "created_at": now,
+        })
+        employees.append((eid + i, full_name))
+
+    sites = {}
+    for i in range(args.sites):
+        city, lat, lng = rnd.choice(_CITIES)
+        name = f"{tag} {city} obiekt {i:04d}"
+        loader.add(TkSite.__table__, {
+            "id": sid + i, "name": name, "lat": lat + rnd.uniform(-0.08, 0.08), "lng": lng + rnd.uniform(-0.12, 0.12),
+            "radius_m": rnd.choice([100, 150, 200, 300]), "is_ad_hoc": rnd.random() < 0.2,
+            "created_by_employee_id": None, "created_at": now,
+        })
+        sites[sid + i] = name
+
+    return vehicles, employees, sites
+
+
+def _absences(loader, rnd, employees, d_from, d_to):
+    """Urlopy (1-2 bloki/rok) i L4; zwraca {employee_id: set(dat)}."""
+    table = TkAbsence.__table__
+    aid = _next_id(loader.conn, table)
+    away = {}
+    now = _now()
+    days = (d_to - d_from).days
+    years = max(1, days // 365)
+    for emp_id, _ in employees:
+        blocks = [(TkAbsenceType.urlop, rnd.randint(5, 12)) for _ in range(years * rnd.randint(1, 2))]
+        blocks += [(TkAbsenceType.l4, rnd.randint(2, 10)) for _ in range(years) if rnd.random() < 0.35]
+        dates = set()
+        for kind, length in blocks:
+            start = d_from + timedelta(days=rnd.randint(0, max(0, days - length)))
+            end = start + timedelta(days=length - 1)
+            loader.add(table, {
+                "id": aid, "employee_id": emp_id, "date_from": start, "date_to": end, "type": kind,
+                "notes": None, "created_by_user_id": None, "created_at": now,
+            })
+            aid += 1
+            dates.update(start + timedelta(days=k) for k in range(length))
+        away[emp_id] = dates
+    return away
+
+
+def _day_segments(rnd, work_date, site_pool):
+    """Dzien ekipy: dojazd -> praca na 1-3 budowach, start ~7:00, koniec najpozniej ~18:00."""
+    t = datetime.combine(work_date, dtime(7, 0)) + timedelta(minutes=rnd.randint(-20, 45))
+    day_end = datetime.combine(work_date, dtime(18, 0))
+    out = []
+    for site_id in rnd.sample(site_pool, k=min(len(site_pool), rnd.choice([1, 1, 2, 2, 3]))):
+        travel = rnd.randint(10, 70)
+        work = rnd.randint(60, 330)
+        if t + timedelta(minutes=travel + 30) > day_end:
+            break
+        out.append((TkSegmentType.travel, site_id, t, t + timedelta(minutes=travel), round(travel * rnd.uniform(0.5, 1.1), 1)))
+        t += timedelta(minutes=travel)
+        end = min(t + timedelta(minutes=work), day_end)
+        out.append((TkSegmentType.work, site_id, t, end, 0.0))
+        t = end + timedelta(minutes=rnd.choice([0, 0, 5, 15]))
+    return out
+
+
+def _status_for(work_date, today, lock_before):
+    if work_date < lock_before:
+        return TkCrewLogStatus.locked
+    age = (today - work_date).days
+    if age > 7:
+        return TkCrewLogStatus.approved
+    if age > 1:
+        return TkCrewLogStatus.submitted
+    return TkCrewLogStatus.draft
+
+
+def _crew_logs(loader, rnd, args, vehicles, employees, sites, away, d_from, d_to):
+    conn = loader.conn
+    names = dict(employees)
+    log_id = _next_id(conn, TkCrewLog.__table__)
+    member_id = _next_id(conn, TkCrewLogMember.__table__)
+    seg_id = _next_id(conn, TkCrewWorkSegment.__table__)
+    snap_member_id = _next_id(conn, TkCrewLogSnapshotMember.__table__)
+    today = d_to  # "dzis" zbioru danych - statusy licza sie od --end, nie od daty uruchomienia
+    lock_before = add_months(date(today.year, today.month, 1), -args.lock_months)
+    site_ids = list(sites)
+    emp_ids = [e for e, _ in employees]
+    plates = {v: f"{args.tag}-{i:05d}" for i, v in enumerate(vehicles)}
+    now = _now()
+
+    # stale ekipy i "rejon" budow per pojazd
+    crews = {v: emp_ids[(i * 3) % len(emp_ids):(i * 3) % len(emp_ids) + rnd.randint(2, 4)] or emp_ids[:2] for i, v in enumerate(vehicles)}
+    regions = {v: rnd.sample(site_ids, k=min(len(site_ids), 12)) for v in vehicles}
+
+    for work_date in _workdays(d_from, d_to):
+        weekday = work_date.weekday()
+        p_work = 0.92 if weekday < 5 else (0.12 if weekday == 5 else 0.0)
+        status = _status_for(work_date, today, lock_before)
+        for v in vehicles:
+            if rnd.random() >= p_work:
+                continue
+            crew = [e for e in crews[v] if work_date not in away.get(e, ())]
+            if rnd.random() < 0.05:
+                crew.append(rnd.choice(emp_ids))
+            crew = list(dict.fromkeys(crew))
+            if not crew:
+                continue
+
+            loader.add(TkCrewLog.__table__, {
+                "id": log_id, "work_date": work_date, "vehicle_id": v, "created_by_employee_id": crew[0],
+                "status": status, "notes": None, "created_at": now, "updated_at": None,
+            })
+            for e in crew:
+                loader.add(TkCrewLogMember.__table__, {
+                    "id": member_id, "crew_log_id": log_id, "employee_id": e,
+                    "override_start_at": None, "override_end_at": None, "created_at": now,
+                })
+                member_id += 1
+
+            segs = []
+            for seg_type, site_id, start, end, km in _day_segments(rnd, work_date, regions[v]):
+                loader.add(TkCrewWorkSegment.__table__, {
+                    "id": seg_id, "crew_log_id": log_id, "work_date": work_date, "site_id": site_id,
+                    "segment_type": seg_type, "start_at": start, "end_at": end,
+                    "start_lat": 0.0, "start_lng": 0.0, "end_lat": 0.0, "end_lng": 0.0,
+                    "distance_km": km, "created_at": now, "updated_at": None,
+                })
+                segs.append(SimpleNamespace(site_id=site_id, segment_type=seg_type, start_at=start, end_at=end, distance_km=km))
+                seg_id += 1
+
+            if status == TkCrewLogStatus.locked:
+                head = SimpleNamespace(id=log_id, work_date=work_date, vehicle_id=v)
+                rec = compute_crew_log_totals(head, segs, [(e, names.get(e)) for e in crew], sites, plates[v])
+                loader.add(TkCrewLogSnapshot.__table__, {
+                    "crew_log_id": log_id, "work_date": work_date, "vehicle_id": v, "vehicle_plate": plates[v],
+                    "site_id": rec["site_id"], "site_name": rec["site_name"],
+                    "work_minutes": rec["work_minutes"], "travel_minutes": rec["travel_minutes"],
+                    "work_minutes_raw": rec["work_minutes_raw"], "travel_minutes_raw": rec["travel_minutes_raw"],
+                    "km": rec["km"], "segments_count": rec["segments_count"],
+                    "employee_names": rec["employee_names"], "sites": rec["sites"], "locked_at": now,
+                })
+                for e, name in rec["members"]:
+                    loader.add(TkCrewLogSnapshotMember.__table__, {
+                        "id": snap_member_id, "crew_log_id": log_id, "employee_id": e,
+                        "employee_name": name, "work_date": work_date,
+                    })
+                    snap_member_id += 1
+
+            log_id += 1
+
+
+def _tenant(conn, tag):
+    row = conn.execute(select(Tenant.id).order_by(Tenant.created_at.asc()).limit(1)).first()
+    if row:
+        return row[0]
+    tenant_id = str(uuid.uuid4())
+    conn.execute(Tenant.__table__.insert(), [{"id": tenant_id, "name": f"{tag} Tenant", "nip": None, "created_at": _now()}])
+    conn.execute(TenantSettings.__table__.insert(), [{
+        "tenant_id": tenant_id, "min_margin_pct": 0.15, "block_below_min_margin": False,
+        "default_vat_rate": 0.23, "quote_prefix": "Q",
+    }])
+    return tenant_id
+
+
+def _q4(x) -> Decimal:
+    return Decimal(str(x)).quantize(Decimal("0.0001"))
+
+
+def _quotes(loader, rnd, args, tenant_id, d_from, d_to):
+    """Klienci -> obiekty -> szanse -> oferty z parametrami, pozycjami, narzutami i sumami."""
+    span = max(1, (d_to - d_from).days)
+    seq_by_year = {}
+    vat = Decimal("0.23")
+    made = 0
+    c_idx = 0
+    while made < args.quotes:
+        c_idx += 1
+        client_id = str(uuid.uuid4())
+        created = datetime.combine(d_from + timedelta(days=rnd.randint(0, span)), dtime(9, 0), tzinfo=timezone.utc)
+        loader.add(Client.__table__, {
+            "id": client_id, "tenant_id": tenant_id, "type": rnd.choice(["company", "company", "person"]),
+            "name": f"{args.tag} Klient {c_idx:06d}", "nip": None, "email": None, "phone": None, "notes": None,
+            "created_at": created,
+        })
+        for _ in range(rnd.randint(1, 2)):
+            site_id = str(uuid.uuid4())
+            city = rnd.choice(_CITIES)[0]
+            loader.add(Site.__table__, {
+                "id": site_id, "tenant_id": tenant_id, "client_id": client_id, "name": f"{city} - obiekt",
+                "address_line": None, "city": city, "postal_code": None, "country": "PL", "notes": None,
+                "created_at": created,
+            })
+            deal_id = str(uuid.uuid4())
+            loader.add(Deal.__table__, {
+                "id": deal_id, "tenant_id": tenant_id, "site_id": site_id, "owner_user_id": None,
+                "title": f"Klimatyzacja {city}", "status": rnd.choice(_DEAL_STATUSES), "source": None,
+                "created_at": created, "updated_at": created,
+            })
+            for _ in range(rnd.randint(1, 3)):
+                if made >= args.quotes:
+                    break
+                made += 1
+                quote_id = str(uuid.uuid4())
+                seq_by_year[created.year] = seq_by_year.get(created.year, 0) + 1
+                loader.add(Quote.__table__, {
+                    "id": quote_id, "tenant_id": tenant_id, "deal_id": deal_id,
+                    "quote_no": f"{args.tag}-{created.year}-{seq_by_year[created.year]:05d}",
+                    "scenario": rnd.choice(_SCENARIOS), "currency": "PLN", "vat_rate": vat, "pricing_version": 1,
+                    "notes_internal": None, "notes_customer": None, "created_by_user_id": None,
+                    "created_at": created, "updated_at": created,
+                })
+                for key in _PARAM_KEYS:
+                    loader.add(QuoteParam.__table__, {
+                        "id": str(uuid.uuid4()), "tenant_id": tenant_id, "quote_id": quote_id, "key": key,
+                        "value_num": _q4(rnd.randint(1, 400)), "value_text": None,
+                    })
+
+                cost_net = Decimal("0")
+                sell_lines = Decimal("0")
+                for order, (line_type, name, unit, lo, hi) in enumerate(rnd.sample(_LINES, k=rnd.randint(args.lines_min, min(args.lines_max, len(_LINES))))):
+                    qty = _q4(rnd.randint(1, 40) if unit != "m" else rnd.uniform(5, 250))
+                    price = _q4(rnd.uniform(lo, hi))
+                    markup = _q4(rnd.choice([0.15, 0.2, 0.25, 0.3]))
+                    unit_sell = _q4(price * (1 + markup))
+                    total = _q4(qty * unit_sell)
+                    cost_net += qty * price
+                    sell_lines += total
+                    loader.add(QuoteLine.__table__, {
+                        "id": str(uuid.uuid4()), "tenant_id": tenant_id, "quote_id": quote_id, "line_type": line_type,
+                        "ref_id": None, "name": name, "unit": unit, "qty": qty, "purchase_price_net": price,
+                        "markup_pct": markup, "sell_price_net_unit": unit_sell, "sell_price_net_total": total,
+                        "source": "manual", "sort_order": order,
+                    })
+
+                overhead_pct = Decimal("0")
+                for oh_type in rnd.sample(["indirect", "logistics", "risk"], k=rnd.randint(0, 2)):
+                    pct = _q4(rnd.choice([0.02, 0.03, 0.05]))
+                    overhead_pct += pct
+                    loader.add(QuoteOverhead.__table__, {
+                        "id": str(uuid.uuid4()), "tenant_id": tenant_id, "quote_id": quote_id,
+                        "overhead_type": oh_type, "pct": pct, "note": None,
+                    })
+
+                # jak recalc_quote_totals (zaokraglenia w tej samej kolejnosci)
+                cost_lines = cost_net
+                cost_net = _q4(cost_net)
+                sell_net = _q4(sell_lines * (1 + overhead_pct))
+                vat_amount = _q4(sell_net * vat)
+                margin_net = sell_net - cost_net
+                loader.add(QuoteTotals.__table__, {
+                    "quote_id": quote_id, "tenant_id": tenant_id, "cost_net": cost_net, "sell_net": sell_net,
+                    "cost_net_lines": cost_lines, "sell_net_lines": sell_lines, "overhead_pct": overhead_pct,
+                    "vat_amount": vat_amount, "sell_gross": sell_net + vat_amount,
+                    "margin_net": margin_net,
+                    "margin_pct": (margin_net / sell_net).quantize(Decimal("0.000001")) if sell_net > 0 else Decimal("0"),
+                    "updated_at": created,
+                })
+
+
+def seed_bench(args, bind=None) -> dict:
+    bind = bind or engine
+    rnd = random.Random(args.seed)
+    d_to = args.end or date.today()
+    d_from = d_to - timedelta(days=int(args.years * 365))
+    t0 = time.perf_counter()
+
+    with bind.begin() as conn:
+        exists = conn.execute(select(TkVehicle.id).where(TkVehicle.plate.like(f"{args.tag}-%")).limit(1)).first()
+        if exists:
+            raise SystemExit(f"Dane z tagiem {args.tag!r} juz sa w bazie - uzyj innego --tag.")
+
+        ensure_month_partitions(conn, start=d_from)
+
+        loader = BulkLoader(conn, args.batch)
+        vehicles, employees, sites = _fleet(loader, rnd, args, args.tag)
+        away = _absences(loader, rnd, employees, d_from, d_to)
+        _crew_logs(loader, rnd, args, vehicles, employees, sites, away, d_from, d_to)
+        if args.quotes:
+            _quotes(loader, rnd, args, _tenant(conn, args.tag), d_from, d_to)
+        loader.flush()
+        loader.fix_sequences()
+
+    return {
+        "dialect": bind.dialect.name,
+        "date_from": d_from.isoformat(),
+        "date_to": d_to.isoformat(),
+        "seconds": round(time.perf_counter() - t0, 1),
+        "rows": {k: v for k, v in loader.counts.items() if v},
+    }
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Synthetic benchmark data for HVACQuotePro")
+    ap.add_argument("--vehicles", type=int, default=200)
+    ap.add_argument("--employees", type=int, default=600)
+    ap.add_argument("--sites", type=int, default=800)
+    ap.add_argument("--years", type=float, default=5)
+    ap.add_argument("--end", type=date.fromisoformat, default=None, help="ostatni dzien danych (YYYY-MM-DD), domyslnie dzis")
+    ap.add_argument("--lock-months", type=int, default=2, help="logi sprzed tylu miesiecy sa locked + snapshot")
+    ap.add_argument("--quotes", type=int, default=20000)
+    ap.add_argument("--lines-min", type=int, default=4)
+    ap.add_argument("--lines-max", type=int, default=10)
+    ap.add_argument("--batch", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--tag", default="BENCH", help="prefiks tablic/nazw, pozwala odroznic dane syntetyczne")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    summary = seed_bench(parse_args(argv))
+    print("=== SEED BENCH DONE ===")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Import cennikow dostawcow (XLSX/CSV) do catalog_items.
+
+Plik czytany strumieniowo: CSV wiersz po wierszu, XLSX przez openpyxl w trybie read_only (bez
+ladowania calego skoroszytu do pamieci). Wiersze sa normalizowane i upsertowane paczkami po
+CATALOG_IMPORT_BATCH (INSERT ... ON CONFLICT (tenant_id, supplier, sku) DO UPDATE) w jednej
+transakcji - zapisuje sie caly cennik albo nic. Import idzie do osobnej puli watkow
+(CATALOG_IMPORT_WORKERS), nie do threadpoola requestow, wiec 40k wierszy nie blokuje API.
+"""
+
+import codecs
+import csv
+import logging
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Iterable, Iterator
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.catalog import CatalogImport, CatalogItem
+from app.services.catalog_search import normalize_text, refresh_index, search_text
+
+log = logging.getLogger(__name__)
+
+Q4 = Decimal("0.0001")
+
+# naglowki kolumn (po normalizacji: male litery, bez polskich znakow i interpunkcji)
+HEADER_ALIASES = {
+    "sku": ("sku", "kod", "kod produktu", "indeks", "index", "symbol", "nr katalogowy", "numer katalogowy", "part number", "item code", "code", "article"),
+    "name": ("name", "nazwa", "nazwa produktu", "nazwa towaru", "opis", "description", "product"),
+    "price": ("price", "cena", "cena netto", "cena zakupu", "cena zakupu netto", "cena katalogowa netto", "net price", "purchase price", "price net"),
+    "unit": ("unit", "jm", "j m", "jednostka", "jednostka miary", "uom"),
+    "manufacturer": ("manufacturer", "producent", "marka", "brand"),
+    "model": ("model", "typ", "model type"),
+    "ean": ("ean", "kod ean", "gtin"),
+    "category": ("category", "kategoria", "grupa", "grupa towarowa", "group"),
+    "currency": ("currency", "waluta"),
+}
+REQUIRED_COLUMNS = ("sku", "name", "price")
+# ile pierwszych wierszy przegladamy w poszukiwaniu naglowka (cenniki maja logo/tytul nad tabela)
+HEADER_SCAN_ROWS = 20
+
+class CatalogImportError(ValueError):
+    pass
+
+def _norm_header(value) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", normalize_text(value)))
+
+_ALIASES = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+
+def map_header(row) -> dict[str, int] | None:
+    """{pole: indeks kolumny} gdy wiersz wyglada na naglowek (sa wszystkie REQUIRED_COLUMNS)."""
+    columns = {}
+    for i, cell in enumerate(row):
+        field = _ALIASES.get(_norm_header(cell))
+        if field and field not in columns:
+            columns[field] = i
+    return columns if all(c in columns for c in REQUIRED_COLUMNS) else None
+
+def parse_price(value) -> Decimal | None:
+    """Cena z komorki: liczba albo tekst typu "1 234,56 zl" / "1,234.56"; None gdy nie da sie odczytac."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        s = str(value)
+    else:
+        s = re.sub(r"[^0-9,.\-]", "", str(value))
+        if "," in s and "." in s:
+            # separator dziesietny = ostatni z nich, drugi to separator tysiecy
+            if s.rfind(",") > s.rfind("."):
+                s = s.replace(".", "").replace(",", ".")
+            else:
+                s = s.replace(",", "")
+        else:
+            s = s.replace(",", ".")
+    try:
+        price = Decimal(s).quantize(Q4, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price >= 0 and price.is_finite() else None
+
+def _text(value, limit: int) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # XLSX trzyma numeryczne kody (SKU, EAN) jako float
+        value = int(value)
+    s = " ".join(str(value).split())
+    return s[:limit] or None
+
+def normalize_row(row, columns: dict[str, int]) -> dict | None:
+    """Wiersz cennika -> wartosci catalog_items; None gdy brakuje SKU/nazwy albo ceny."""
+    def cell(field):
+        i = columns.get(field)
+        return row[i] if i is not None and i < len(row) else None
+
+    sku = _text(cell("sku"), 100)
+    name = _text(cell("name"), 255)
+    price = parse_price(cell("price"))
+    if not sku or not name or price is None:
+        return None
+    ean = re.sub(r"\D", "", _text(cell("ean"), 20) or "")
+    manufacturer = _text(cell("manufacturer"), 100)
+    model = _text(cell("model"), 100)
+    return {
+        "sku": sku,
+        "name": name,
+        "manufacturer": manufacturer,
+        "model": model,
+        "search_text": search_text(sku, name, model, manufacturer),
+        "purchase_price_net": price,
+        "unit": _text(cell("unit"), 20) or "szt",
+        "category": _text(cell("category"), 100),
+        "ean": ean or None,
+        "currency": (_text(cell("currency"), 10) or "PLN").upper(),
+    }
+
+# --- czytanie plikow ---
+
+def detect_format(path: str, filename: str = "") -> str:
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    # XLSX to ZIP - po zawartosci, bo rozszerzenia od dostawcow bywaja przypadkowe
+    if magic.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        raise CatalogImportError("invalid xlsx file")
+    return "csv"
+
+def _csv_encoding(path: str) -> str:
+    # UTF-8 (z BOM albo bez), inaczej eksport z polskiego Excela/ERP: cp1250
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    with open(path, "rb") as f:
+        try:
+            while chunk := f.read(1 << 20):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return "cp1250"
+    return "utf-8-sig"
+
+class _Semicolon(csv.excel):
+    # domyslny separator polskiego Excela
+    delimiter = ";"
+
+def iter_csv_rows(path: str) -> Iterator[list]:
+    encoding = _csv_encoding(path)
+    with open(path, newline="", encoding=encoding) as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t|")
+        except csv.Error:
+            dialect = _Semicolon
+        yield from csv.reader(f, dialect)
+
+def iter_xlsx_rows(path: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    # read_only: wiersze czytane strumieniowo z XML arkusza; data_only: wartosci zamiast formul
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+def iter_items(rows: Iterable, stats: dict) -> Iterator[dict]:
+    """Znormalizowane pozycje z wierszy pliku; liczniki rows/skipped w `stats`."""
+    columns = None
+    for n, row in enumerate(rows):
+        if columns is None:
+            columns = map_header(row)
+            if columns is None and n >= HEADER_SCAN_ROWS:
+                break
+            continue
+        if not any(v not in (None, "") for v in row):
+            continue
+        stats["rows"] += 1
+        item = normalize_row(row, columns)
+        if item is None:
+            stats["skipped"] += 1
+            continue
+        yield item
+    if columns is None:
+        raise CatalogImportError("header row not found, required columns: " + ", ".join(REQUIRED_COLUMNS))
+
+# --- zapis ---
+
+def _insert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def _upsert_batch(db: Session, tenant_id: str, supplier: str, batch: dict[str, dict]) -> int:
+    now = datetime.now(timezone.utc)
+    table = CatalogItem.__table__
+    stmt = _insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.tenant_id, table.c.supplier, table.c.sku],
+        set_={c: stmt.excluded[c] for c in ("name", "manufacturer", "model", "search_text", "unit", "category", "ean", "purchase_price_net", "currency", "updated_at")},
+    )
+    rows = [
+        {"id": str(uuid.uuid4()), "tenant_id": tenant_id, "supplier": supplier, "created_at": now, "updated_at": now, **item}
+        for item in batch.values()
+    ]
+    # executemany - SQLAlchemy sklada to w wielowierszowe INSERT (insertmanyvalues)
+    db.execute(stmt, rows)
+    return len(rows)
+
+def import_price_list(db: Session, tenant_id: str, supplier: str, rows: Iterable, batch_size: int | None = None) -> dict:
+    """Upsert pozycji cennika paczkami, bez commit. Zwraca {"rows", "upserted", "skipped"}.
+
+    Powtorzone SKU w pliku: wygrywa ostatnie wystapienie.
+    """
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH
+    stats = {"rows": 0, "upserted": 0, "skipped": 0}
+    batch: dict[str, dict] = {}
+    for item in iter_items(rows, stats):
+        # ten sam SKU dwa razy w jednym INSERT ... ON CONFLICT to blad na PostgreSQL
+        batch[item["sku"]] = item
+        if len(batch) >= batch_size:
+            stats["upserted"] += _upsert_batch(db, tenant_id, supplier, batch)
+            batch = {}
+    if batch:
+        stats["upserted"] += _upsert_batch(db, tenant_id, supplier, batch)
+    return stats
+
+def run_import(import_id: str, path: str) -> None:
+    """Przetwarza zapisany plik importu (w puli importow); status i liczniki w catalog_imports."""
+    db = SessionLocal()
+    try:
+        job = db.get(CatalogImport, import_id)
+        if job is None:
+            return
+        job.status = "running"
+        db.commit()
+        try:
+            fmt = detect_format(path, job.filename)
+            rows = iter_xlsx_rows(path) if fmt == "xlsx" else iter_csv_rows(path)
+            stats = import_price_list(db, job.tenant_id, job.supplier, rows)
+        except Exception as e:
+            db.rollback()
+            if isinstance(e, CatalogImportError):
+                error = str(e)
+            else:
+                log.exception("catalog import %s failed", import_id)
+                error = f"{type(e).__name__}: {e}"
+            job = db.get(CatalogImport, import_id)
+            job.status = "failed"
+            job.error = error[:2000]
+        else:
+            job.status = "done"
+            job.rows, job.upserted, job.skipped = stats["rows"], stats["upserted"], stats["skipped"]
+        job.finished_at = datetime.now(timezone.utc)
+        # pozycje i status w jednym commit
+        db.commit()
+        if job.status == "done":
+            refresh_index(db, job.tenant_id)
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# --- pula importow ---
+
+_import_pool: ThreadPoolExecutor | None = None
+_import_pool_lock = threading.Lock()
+
+def submit_import(import_id: str, path: str) -> None:
+    global _import_pool
+    if _import_pool is None:
+        with _import_pool_lock:
+            if _import_pool is None:
+                _import_pool = ThreadPoolExecutor(max_workers=settings.CATALOG_IMPORT_WORKERS, thread_name_prefix="catalog-import")
+    _import_pool.submit(run_import, import_id, path)
+
+def shutdown_import_pool() -> None:
+    global _import_pool
+    with _import_pool_lock:
+        if _import_pool is not None:
+            _import_pool.shutdown(wait=False, cancel_futures=True)
+            _import_pool = None
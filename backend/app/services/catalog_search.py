@@ -0,0 +1,284 @@
+"""Wyszukiwanie w katalogu (podpowiedzi przy dodawaniu linii oferty).
+
+Dopasowanie po catalog_items.search_text (sku + nazwa + model + producent, male litery bez
+polskich znakow): kazde slowo zapytania musi wystapic w tekscie (od 3 znakow jako podciag, krotsze
+jako poczatek slowa), a gdy takich pozycji jest za malo - dopasowanie rozmyte po trigramach
+(literowki). Kolejnosc: najpierw SKU zaczynajace sie od zapytania, potem podobienstwo.
+
+PostgreSQL: pg_trgm, indeks GIN (search_text gin_trgm_ops) obsluguje LIKE '%...%' i operator %>.
+Inne bazy (SQLite w dev): indeks trigramowy w pamieci procesu per tenant, przebudowywany po
+imporcie w tym procesie, a w pozostalych po zmianie (liczba pozycji, max updated_at) - sprawdzanej
+najwyzej co CATALOG_SEARCH_INDEX_TTL sekund.
+"""
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.catalog import CatalogItem
+
+# PG: domyslny pg_trgm.word_similarity_threshold; tu ten sam prog dla indeksu w pamieci
+FUZZY_THRESHOLD = 0.6
+
+def normalize_text(value) -> str:
+    s = unicodedata.normalize("NFKD", str(value or "")).replace("ł", "l").replace("Ł", "L")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    # "3,5 kW" i "3.5 kW" to ta sama moc; kropka, ukosnik i myslnik nie dziela kodow ("MSZ-LN25", "1/2")
+    s = re.sub(r"(?<=\d),(?=\d)", ".", s)
+    return " ".join(re.findall(r"[a-z0-9]+(?:[./-][a-z0-9]+)*", s))
+
+def search_text(sku: str, name: str, model: str | None = None, manufacturer: str | None = None) -> str:
+    return normalize_text(" ".join(v for v in (sku, name, model, manufacturer) if v))[:700]
+
+def _trigrams(word: str, padded: bool = True) -> set[str]:
+    # jak pg_trgm: slowo z dwiema spacjami z przodu i jedna z tylu
+    w = f"  {word} " if padded else word
+    return {w[i:i + 3] for i in range(len(w) - 2)}
+
+def _text_trigrams(text: str) -> set[str]:
+    out = set()
+    for word in text.split():
+        out |= _trigrams(word)
+    return out
+
+# --- PostgreSQL ---
+
+def _token_condition(column, token: str):
+    if len(token) >= 3:
+        return column.contains(token, autoescape=True)
+    # krotkie slowo = poczatek slowa (pojedyncza litera jako podciag trafia w pol katalogu)
+    return or_(column.startswith(token, autoescape=True), column.contains(" " + token, autoescape=True))
+
+def _search_pg(db: Session, tenant_id: str, query: str, limit: int, supplier: str | None) -> list[CatalogItem]:
+    text = CatalogItem.search_text
+    tokens = query.split()
+    matched = and_(*[_token_condition(text, tok) for tok in tokens])
+    conditions = [CatalogItem.tenant_id == tenant_id, or_(matched, text.op("%>")(query))]
+    if supplier:
+        conditions.append(CatalogItem.supplier == supplier)
+    stmt = (
+        select(CatalogItem)
+        .where(*conditions)
+        .order_by(
+            case((func.lower(CatalogItem.sku).startswith(query, autoescape=True), 0), else_=1),
+            func.word_similarity(query, text).desc(),
+            CatalogItem.name,
+        )
+        .limit(limit)
+    )
+    return list(db.scalars(stmt))
+
+# --- indeks w pamieci ---
+
+class TrigramIndex:
+    """Indeks trigramowy pozycji jednego tenanta: trigram -> numery pozycji (array, ~4 B na wpis).
+
+    Pozycje numerowane po (dlugosc tekstu, tekst) - krotsze, bardziej ogolne nazwy pierwsze, wiec
+    kolejnosc numerow jest od razu kolejnoscia wynikow w ramach jednej grupy dopasowania.
+    Literowki szukane w slowniku slow (slowo -> pozycje), nie po pozycjach - slow jest duzo mniej.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: (len(r[3]), r[3]))
+        self.ids: list[str] = [r[0] for r in rows]
+        self.texts: list[str] = [" " + r[3] + " " for r in rows]
+        self.suppliers: list[str] = [r[2] for r in rows]
+        # SKU posortowane - prefiks przez bisect
+        self.skus: list[tuple[str, int]] = sorted((normalize_text(r[1]), n) for n, r in enumerate(rows))
+        postings: dict[str, array] = {}
+        words: dict[str, array] = {}
+        for n, r in enumerate(rows):
+            for tri in _text_trigrams(r[3]):
+                p = postings.get(tri)
+                if p is None:
+                    p = postings[tri] = array("i")
+                p.append(n)
+            for word in set(r[3].split()):
+                p = words.get(word)
+                if p is None:
+                    p = words[word] = array("i")
+                p.append(n)
+        self.postings = postings
+        self.vocab: list[str] = list(words)
+        self.word_items: list[array] = list(words.values())
+        word_grams: dict[str, array] = {}
+        for w, word in enumerate(self.vocab):
+            for tri in _trigrams(word):
+                p = word_grams.get(tri)
+                if p is None:
+                    p = word_grams[tri] = array("i")
+                p.append(w)
+        self.word_grams = word_grams
+
+    def _grams(self, token: str) -> set[str]:
+        if len(token) >= 3:
+            return _trigrams(token, padded=False)
+        # krotkie slowo = poczatek slowa: "  a" / " ab"
+        return {("  " + token)[-3:]}
+
+    def _scan(self, tokens: list[str]):
+        """(n, od poczatku slowa?) dla pozycji zawierajacych wszystkie slowa, rosnaco po n.
+
+        Przeglada tylko najrzadszy trigram zapytania (listy sa posortowane, bo budowane po n),
+        reszte sprawdza wprost na tekscie - taniej niz przecinanie duzych list w Pythonie.
+        """
+        grams = set().union(*(self._grams(t) for t in tokens))
+        rarest = min((self.postings.get(g, ()) for g in grams), key=len)
+        texts = self.texts
+        long_tokens = [t for t in tokens if len(t) >= 3]
+        prefixes = [" " + t for t in tokens]
+        for n in rarest:
+            text = texts[n]
+            if all(t in text for t in long_tokens) and all(p in text for p in prefixes if len(p) <= 3):
+                yield n, all(p in text for p in prefixes)
+
+    def _sku_prefix(self, query: str):
+        i = bisect.bisect_left(self.skus, (query, -1))
+        while i < len(self.skus) and self.skus[i][0].startswith(query):
+            yield self.skus[i][1]
+            i += 1
+
+    def _similar_words(self, token: str) -> dict[int, float]:
+        """Slowa ze slownika z udzialem trigramow tokenu >= FUZZY_THRESHOLD: {nr slowa: podobienstwo}."""
+        grams = sorted(_trigrams(token), key=lambda g: len(self.word_grams.get(g, ())))
+        need = max(1, int(FUZZY_THRESHOLD * len(grams) + 0.999))
+        # slowo z >= need trafieniami musi byc w ktorejs z (len - need + 1) najrzadszych list
+        hits = Counter()
+        for g in grams[:len(grams) - need + 1]:
+            hits.update(self.word_grams.get(g, ()))
+        vocab = self.vocab
+        for g in grams[len(grams) - need + 1:]:
+            for w in hits:
+                if g in f"  {vocab[w]} ":
+                    hits[w] += 1
+        return {w: c / len(grams) for w, c in hits.items() if c >= need}
+
+    def _fuzzy(self, tokens: list[str], limit: int, allowed) -> list[int]:
+        """Pozycje, w ktorych kazde slowo zapytania (od 3 znakow) ma podobne slowo; po podobienstwie."""
+        long_tokens = [t for t in tokens if len(t) >= 3]
+        if not long_tokens:
+            return []
+        prefixes = [" " + t for t in tokens if len(t) < 3]
+        per_token = []
+        for t in long_tokens:
+            words = self._similar_words(t)
+            if not words:
+                return []
+            per_token.append(words)
+        # pozycje bierzemy ze slow tokenu z najmniejsza liczba pozycji, reszte sprawdzamy na tekscie
+        first = min(per_token, key=lambda ws: sum(len(self.word_items[w]) for w in ws))
+        others = [[f" {self.vocab[w]} " for w in ws] for ws in per_token if ws is not first]
+        texts = self.texts
+        out: list[int] = []
+        for w in sorted(first, key=lambda w: (-first[w], len(self.vocab[w]))):
+            for n in self.word_items[w]:
+                text = texts[n]
+                if (allowed(n) and all(p in text for p in prefixes)
+                        and all(any(o in text for o in alts) for alts in others)):
+                    out.append(n)
+                    if len(out) >= limit:
+                        return out
+        return out
+
+    def search(self, query: str, limit: int, supplier: str | None = None) -> list[str]:
+        """Id pozycji: SKU z prefiksem zapytania, slowa od poczatku, podciagi, na koncu literowki."""
+        tokens = query.split()
+        if not tokens:
+            return []
+        allowed = (lambda n: self.suppliers[n] == supplier) if supplier else (lambda n: True)
+        out: list[int] = []
+        seen: set[int] = set()
+
+        def take(ns) -> bool:
+            for n in ns:
+                if n not in seen and allowed(n):
+                    seen.add(n)
+                    out.append(n)
+                    if len(out) >= limit:
+                        return True
+            return False
+
+        if take(self._sku_prefix(query)):
+            return [self.ids[n] for n in out]
+        # najpierw slowa od poczatku; podciagi czekaja (max limit), skan konczy sie po `limit` trafieniach
+        substring: list[int] = []
+        for n, word_prefix in self._scan(tokens):
+            if word_prefix:
+                if take((n,)):
+                    return [self.ids[n] for n in out]
+            elif len(substring) < limit:
+                substring.append(n)
+        if take(substring):
+            return [self.ids[n] for n in out]
+        take(self._fuzzy(tokens, limit + len(seen), allowed))
+        return [self.ids[n] for n in out]
+
+# tenant_id -> (sprawdzono, sygnatura, indeks)
+_indexes: dict[str, tuple[float, tuple, TrigramIndex]] = {}
+# budowa indeksu pod lockiem tenanta: inni tenanci nie czekaja, ten sam tenant nie buduje dwa razy;
+# _indexes_lock chroni tylko slownik lockow
+_tenant_locks: dict[str, threading.Lock] = {}
+_indexes_lock = threading.Lock()
+
+def _tenant_lock(tenant_id: str) -> threading.Lock:
+    with _indexes_lock:
+        lock = _tenant_locks.get(tenant_id)
+        if lock is None:
+            lock = _tenant_locks[tenant_id] = threading.Lock()
+        return lock
+
+def _signature(db: Session, tenant_id: str) -> tuple:
+    row = db.execute(
+        select(func.count(), func.max(CatalogItem.updated_at)).where(CatalogItem.tenant_id == tenant_id)
+    ).one()
+    return tuple(row)
+
+def _build(db: Session, tenant_id: str, signature: tuple) -> TrigramIndex:
+    rows = db.execute(
+        select(CatalogItem.id, CatalogItem.sku, CatalogItem.supplier, CatalogItem.search_text)
+        .where(CatalogItem.tenant_id == tenant_id)
+    )
+    index = TrigramIndex(rows)
+    _indexes[tenant_id] = (time.monotonic(), signature, index)
+    return index
+
+def tenant_index(db: Session, tenant_id: str) -> TrigramIndex:
+    cached = _indexes.get(tenant_id)
+    if cached and time.monotonic() - cached[0] < settings.CATALOG_SEARCH_INDEX_TTL:
+        return cached[2]
+    with _tenant_lock(tenant_id):
+        cached = _indexes.get(tenant_id)
+        signature = _signature(db, tenant_id)
+        if cached and cached[1] == signature:
+            _indexes[tenant_id] = (time.monotonic(), signature, cached[2])
+            return cached[2]
+        return _build(db, tenant_id, signature)
+
+def refresh_index(db: Session, tenant_id: str) -> None:
+    """Po imporcie: przebudowa od razu (w watku importu), zeby pierwsze wyszukiwanie nie czekalo."""
+    if db.get_bind().dialect.name == "postgresql":
+        return
+    with _tenant_lock(tenant_id):
+        _build(db, tenant_id, _signature(db, tenant_id))
+
+# --- API ---
+
+def search_catalog(db: Session, tenant_id: str, query: str, limit: int = 20, supplier: str | None = None) -> list[CatalogItem]:
+    query = normalize_text(query)
+    if not query:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_pg(db, tenant_id, query, limit, supplier)
+    ids = tenant_index(db, tenant_id).search(query, limit, supplier)
+    if not ids:
+        return []
+    by_id = {r.id: r for r in db.scalars(select(CatalogItem).where(CatalogItem.id.in_(ids)))}
+    return [by_id[i] for i in ids if i in by_id]
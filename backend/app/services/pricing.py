@@ -1,42 +1,154 @@
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from sqlalchemy import case, func, literal, literal_column, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from app.models.quoting import QuoteLine, QuoteOverhead, QuoteTotals
+from app.models.quoting import Quote, QuoteLine, QuoteOverhead, QuoteTotals
 
-def recalc_quote_totals(db: Session, tenant_id: str, quote_id: str, vat_rate: float) -> QuoteTotals:
-    lines = db.query(QuoteLine).filter(QuoteLine.tenant_id == tenant_id, QuoteLine.quote_id == quote_id).all()
-    overheads = db.query(QuoteOverhead).filter(QuoteOverhead.tenant_id == tenant_id, QuoteOverhead.quote_id == quote_id).all()
+Q4 = Decimal("0.0001")
 
-    cost_net = sum(float(l.qty) * float(l.purchase_price_net) for l in lines)
-    sell_net_before = sum(float(l.sell_price_net_total) for l in lines)
+def _upsert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
 
-    overhead_amount = 0.0
-    for oh in overheads:
-        overhead_amount += sell_net_before * float(oh.pct)
+def _dec(value, places: Decimal = Q4) -> Decimal:
+    return Decimal(str(value)).quantize(places, rounding=ROUND_HALF_UP)
 
-    sell_net = sell_net_before + overhead_amount
-    vat_amount = sell_net * float(vat_rate)
-    sell_gross = sell_net + vat_amount
+def totals_expressions(cost_lines, sell_lines, overhead_pct, vat) -> dict:
+    """Sumy oferty z surowych sum linii i narzutow (wyrazenia SQL, Numeric).
 
-    margin_net = sell_net - cost_net
-    margin_pct = (margin_net / sell_net) if sell_net > 0 else 0.0
+    Kwoty zaokraglane do 4 miejsc, margin_pct do 6; brutto = netto + VAT po zaokragleniu,
+    zeby sumy na ofercie sie zgadzaly. Narzuty procentowo od sprzedazy linii.
+    """
+    cost_net = func.round(cost_lines, 4)
+    sell_net = func.round(sell_lines * (1 + overhead_pct), 4)
+    vat_amount = func.round(sell_net * vat, 4)
+    margin = sell_net - cost_net
+    return {
+        "cost_net": cost_net,
+        "sell_net": sell_net,
+        "vat_amount": vat_amount,
+        "sell_gross": sell_net + vat_amount,
+        "margin_net": margin,
+        # "1.0 *": SQLite trzyma calkowite kwoty jako INTEGER i dzielilby calkowicie
+        "margin_pct": case((sell_net > 0, func.round(literal_column("1.0") * margin / sell_net, 6)), else_=0),
+    }
 
-    totals = db.query(QuoteTotals).filter(QuoteTotals.quote_id == quote_id, QuoteTotals.tenant_id == tenant_id).first()
-    if not totals:
-        totals = QuoteTotals(quote_id=quote_id, tenant_id=tenant_id)
-        db.add(totals)
+def _quote_vat(quote_id: str):
+    return select(Quote.vat_rate).where(Quote.id == quote_id).scalar_subquery()
 
-    totals.cost_net = cost_net
-    totals.sell_net = sell_net
-    totals.vat_amount = vat_amount
-    totals.sell_gross = sell_gross
-    totals.margin_net = margin_net
-    totals.margin_pct = margin_pct
+def _upsert_totals(db: Session, tenant_id: str, quote_ids) -> list[Row]:
+    """INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE ... RETURNING dla wielu ofert naraz."""
+    lines = (
+        select(
+            QuoteLine.quote_id,
+            func.sum(QuoteLine.qty * QuoteLine.purchase_price_net).label("cost_lines"),
+            func.sum(QuoteLine.sell_price_net_total).label("sell_lines"),
+        )
+        .where(QuoteLine.tenant_id == tenant_id, QuoteLine.quote_id.in_(quote_ids))
+        .group_by(QuoteLine.quote_id)
+        .subquery()
+    )
+    overheads = (
+        select(QuoteOverhead.quote_id, func.sum(QuoteOverhead.pct).label("pct"))
+        .where(QuoteOverhead.tenant_id == tenant_id, QuoteOverhead.quote_id.in_(quote_ids))
+        .group_by(QuoteOverhead.quote_id)
+        .subquery()
+    )
+    cost = func.coalesce(lines.c.cost_lines, 0)
+    sell = func.coalesce(lines.c.sell_lines, 0)
+    pct = func.coalesce(overheads.c.pct, 0)
+    values = {
+        "quote_id": Quote.id,
+        "tenant_id": Quote.tenant_id,
+        "cost_net_lines": cost,
+        "sell_net_lines": sell,
+        "overhead_pct": pct,
+        **totals_expressions(cost, sell, pct, Quote.vat_rate),
+        "updated_at": literal(datetime.now(timezone.utc), QuoteTotals.updated_at.type),
+    }
+    source = (
+        select(*values.values())
+        .outerjoin(lines, lines.c.quote_id == Quote.id)
+        .outerjoin(overheads, overheads.c.quote_id == Quote.id)
+        .where(Quote.tenant_id == tenant_id, Quote.id.in_(quote_ids))
+    )
 
+    table = QuoteTotals.__table__
+    stmt = _upsert(db)(table).from_select(list(values), source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.quote_id],
+        set_={c: stmt.excluded[c] for c in values if c != "quote_id"},
+    ).returning(*table.c)
+    return db.execute(stmt).all()
+
+def recalc_quote_totals(db: Session, tenant_id: str, quote_id: str) -> Row:
+    """Pelne przeliczenie sum jednym INSERT ... SELECT ... ON CONFLICT DO UPDATE ... RETURNING.
+
+    Agregacja w bazie na Numeric (bez ladowania linii jako obiektow ORM i bez floatow).
+    Na PostgreSQL arytmetyka jest dokladna; SQLite (dev) trzyma Numeric jako REAL.
+    """
+    totals = refresh_quote_totals(db, tenant_id, quote_id)
     db.commit()
-    db.refresh(totals)
     return totals
 
+def refresh_quote_totals(db: Session, tenant_id: str, quote_id: str) -> Row | None:
+    """Pelne przeliczenie w biezacej transakcji (bez commit); None gdy oferty nie ma."""
+    db.flush()
+    rows = _upsert_totals(db, tenant_id, [quote_id])
+    return rows[0] if rows else None
+
+def refresh_totals_many(db: Session, tenant_id: str, quote_ids, chunk: int = 500) -> int:
+    """Jak refresh_quote_totals dla wielu ofert (paczki po `chunk` id), bez commit."""
+    db.flush()
+    ids = list(quote_ids)
+    refreshed = 0
+    for i in range(0, len(ids), chunk):
+        refreshed += len(_upsert_totals(db, tenant_id, ids[i:i + chunk]))
+    return refreshed
+
+def line_amounts(line: QuoteLine) -> tuple[Decimal, Decimal]:
+    """Wklad linii w surowe sumy: (koszt qty * cena zakupu, sprzedaz netto)."""
+    return Decimal(str(line.qty)) * Decimal(str(line.purchase_price_net)), Decimal(str(line.sell_price_net_total))
+
+def apply_totals_delta(db: Session, tenant_id: str, quote_id: str, cost_delta: Decimal = Decimal("0"), sell_delta: Decimal = Decimal("0"), overheads_changed: bool = False) -> None:
+    """Przyrostowa aktualizacja quote_totals w transakcji edycji (bez commit) - O(1) zamiast O(linii).
+
+    Jeden UPDATE: surowe sumy += delta, pochodne liczone z nowych wartosci. Gdy wiersza sum
+    jeszcze nie ma, robi pelne przeliczenie (raz). Zgodnosc z pelnym przeliczeniem sprawdza
+    python -m app.scripts.check_quote_totals.
+    """
+    db.flush()
+    table = QuoteTotals.__table__
+    cost = table.c.cost_net_lines + cost_delta
+    sell = table.c.sell_net_lines + sell_delta
+    pct = table.c.overhead_pct
+    if overheads_changed:
+        # kilka wierszy narzutow - suma wprost z zapisanych wartosci
+        pct = (
+            select(func.coalesce(func.sum(QuoteOverhead.pct), 0))
+            .where(QuoteOverhead.tenant_id == tenant_id, QuoteOverhead.quote_id == quote_id)
+            .scalar_subquery()
+        )
+    stmt = (
+        update(table)
+        .where(table.c.quote_id == quote_id, table.c.tenant_id == tenant_id)
+        .values(
+            cost_net_lines=cost,
+            sell_net_lines=sell,
+            overhead_pct=pct,
+            updated_at=datetime.now(timezone.utc),
+            **totals_expressions(cost, sell, pct, _quote_vat(quote_id)),
+        )
+    )
+    if db.execute(stmt).rowcount == 0:
+        refresh_quote_totals(db, tenant_id, quote_id)
+
 def recalc_line_prices(line: QuoteLine) -> None:
-    unit = float(line.purchase_price_net) * (1.0 + float(line.markup_pct))
-    total = float(line.qty) * unit
+    # Decimal z zaokragleniem do skali kolumn - to, co zapisane, jest dokladnie tym, co idzie do delt sum
+    line.qty = _dec(line.qty)
+    line.purchase_price_net = _dec(line.purchase_price_net)
+    line.markup_pct = _dec(line.markup_pct)
+    unit = _dec(line.purchase_price_net * (1 + line.markup_pct))
     line.sell_price_net_unit = unit
-    line.sell_price_net_total = total
+    line.sell_price_net_total = _dec(line.qty * unit)
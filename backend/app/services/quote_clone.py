@@ -0,0 +1,97 @@
+"""Kopiowanie ofert w bazie: nowa wersja oferty, zapis jako szablon, oferta z szablonu.
+
+Oferta i jej quote_params, quote_lines, quote_overheads, quote_totals kopiowane przez
+INSERT ... SELECT (po jednym na tabele) - wiersze nie przechodza przez Pythona ani API, wiec
+czas nie zalezy od tego, czy oferta ma 10 czy 1000 linii. Nowe id generuje baza
+(PostgreSQL: gen_random_uuid(), SQLite: uuid4 z randomblob).
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import String, cast, func, insert, literal, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.models.quoting import Quote, QuoteLine, QuoteOverhead, QuoteParam, QuoteTotals
+
+# uuid4 jako tekst w SQLite (brak funkcji uuid): wersja 4 i wariant 8/9/a/b jak w uuid.uuid4()
+_SQLITE_UUID4 = (
+    "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+)
+
+
+def _new_id(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.gen_random_uuid(), String(36))
+    return literal_column(_SQLITE_UUID4)
+
+
+def _copy_children(db: Session, model, tenant_id: str, source_id: str, quote_id: str) -> int:
+    table = model.__table__
+    values = {
+        c.name: _new_id(db) if c.name == "id" else literal(quote_id, c.type) if c.name == "quote_id" else c
+        for c in table.c
+    }
+    source = select(*values.values()).where(table.c.tenant_id == tenant_id, table.c.quote_id == source_id)
+    return db.execute(insert(table).from_select(list(values), source)).rowcount
+
+
+def clone_quote(
+    db: Session,
+    tenant_id: str,
+    source_id: str,
+    *,
+    quote_no: str,
+    pricing_version: int,
+    is_template: bool = False,
+    deal_id: str | None = None,
+    user_id: str | None = None,
+) -> str | None:
+    """Kopia oferty `source_id` z nowym numerem/wersja (domyslnie w tym samym deal), bez commit.
+
+    Szablon (is_template=True) nie nalezy do zadnego deala (deal_id NULL). Zwraca id nowej oferty
+    albo None, gdy zrodla nie ma w tenancie.
+    """
+    table = Quote.__table__
+    quote_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    overrides = {
+        "id": quote_id,
+        "quote_no": quote_no,
+        "pricing_version": pricing_version,
+        "is_template": is_template,
+        "created_by_user_id": user_id,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if is_template:
+        overrides["deal_id"] = None
+    elif deal_id:
+        overrides["deal_id"] = deal_id
+    values = {c.name: literal(overrides[c.name], c.type) if c.name in overrides else c for c in table.c}
+    source = select(*values.values()).where(table.c.tenant_id == tenant_id, table.c.id == source_id)
+    if not db.execute(insert(table).from_select(list(values), source)).rowcount:
+        return None
+
+    for model in (QuoteParam, QuoteLine, QuoteOverhead):
+        _copy_children(db, model, tenant_id, source_id, quote_id)
+    # sumy kopii = sumy zrodla (te same linie i narzuty) - kopia zamiast przeliczania
+    totals = QuoteTotals.__table__
+    values = {c.name: literal(quote_id, c.type) if c.name == "quote_id" else c for c in totals.c}
+    db.execute(
+        insert(totals).from_select(
+            list(values), select(*values.values()).where(totals.c.tenant_id == tenant_id, totals.c.quote_id == source_id)
+        )
+    )
+    return quote_id
+
+
+def next_pricing_version(db: Session, tenant_id: str, deal_id: str) -> int:
+    """Wersja dla nowej kopii: najwyzsza wersja ofert (nie szablonow) w deal + 1."""
+    current = db.execute(
+        select(func.max(Quote.pricing_version))
+        .where(Quote.tenant_id == tenant_id, Quote.deal_id == deal_id, Quote.is_template.is_(False))
+    ).scalar()
+    return int(current or 0) + 1
@@ -0,0 +1,76 @@
+"""Zapis parametrow i narzutow oferty przez roznice zamiast "usun wszystko i dodaj".
+
+Przychodzace wiersze porownywane z zapisanymi po kluczu (quote_params.key,
+quote_overheads.overhead_type): nowe i zmienione ida jednym INSERT ... ON CONFLICT (quote_id, klucz)
+DO UPDATE, usuniete klucze jednym DELETE; niezmienione nie sa dotykane (brak zapisow do indeksow i
+WAL przy zapisie bez zmian). Wynik mowi, co sie zmienilo - przeliczenia dalej moga pominac no-op.
+"""
+
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import Numeric, delete, select
+from sqlalchemy.orm import Session
+
+from app.models.quoting import QuoteOverhead, QuoteParam
+from app.services.pricing import _dec, _upsert
+
+
+def _norm(value, column):
+    # porownanie w skali kolumny: 7.5 z JSON == Decimal("7.5000") z bazy
+    if value is None or not isinstance(column.type, Numeric):
+        return value
+    return _dec(value, Decimal(1).scaleb(-column.type.scale))
+
+
+def _sync(db: Session, model, key: str, tenant_id: str, quote_id: str, rows: list[dict]) -> dict:
+    table = model.__table__
+    values = [c for c in rows[0] if c != key] if rows else []
+    incoming = {r[key]: {c: _norm(r[c], table.c[c]) for c in values} for r in rows}  # powtorzony klucz: wygrywa ostatni
+    stored = {
+        row[0]: dict(zip(values, row[1:]))
+        for row in db.execute(
+            select(table.c[key], *[table.c[c] for c in values])
+            .where(table.c.tenant_id == tenant_id, table.c.quote_id == quote_id)
+        )
+    }
+
+    inserted = sorted(k for k in incoming if k not in stored)
+    updated = sorted(k for k in incoming if k in stored and incoming[k] != stored[k])
+    deleted = sorted(k for k in stored if k not in incoming)
+
+    if inserted or updated:
+        stmt = _upsert(db)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.quote_id, table.c[key]],
+            set_={c: stmt.excluded[c] for c in values},
+            # nie nadpisuj cudzego wiersza, gdyby quote_id nalezal do innego tenanta
+            where=table.c.tenant_id == tenant_id,
+        )
+        db.execute(stmt, [
+            {"id": str(uuid.uuid4()), "tenant_id": tenant_id, "quote_id": quote_id, key: k, **incoming[k]}
+            for k in inserted + updated
+        ])
+    if deleted:
+        db.execute(
+            delete(table)
+            .where(table.c.tenant_id == tenant_id, table.c.quote_id == quote_id, table.c[key].in_(deleted))
+        )
+    return {"inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+def save_params(db: Session, tenant_id: str, quote_id: str, params: list[dict]) -> dict:
+    """Ustawia parametry oferty na `params` (key, value_num, value_text), bez commit.
+
+    Zwraca {"inserted", "updated", "deleted"} - listy kluczy.
+    """
+    return _sync(db, QuoteParam, "key", tenant_id, quote_id, params)
+
+
+def save_overheads(db: Session, tenant_id: str, quote_id: str, overheads: list[dict]) -> dict:
+    """Ustawia narzuty oferty na `overheads` (overhead_type, pct, note), bez commit; wynik jak save_params."""
+    return _sync(db, QuoteOverhead, "overhead_type", tenant_id, quote_id, overheads)
+
+
+def changed_keys(result: dict) -> list[str]:
+    return sorted({*result["inserted"], *result["updated"], *result["deleted"]})
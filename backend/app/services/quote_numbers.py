@@ -0,0 +1,24 @@
+"""Numeracja ofert: licznik per tenant i rok w quote_sequences.
+
+Kolejny numer to jeden INSERT ... ON CONFLICT (tenant_id, year) DO UPDATE SET last_value =
+last_value + 1 RETURNING last_value - O(1) niezaleznie od liczby ofert tenanta. Konflikt blokuje
+wiersz licznika do konca transakcji, wiec dwa rownolegle create_quote czekaja na siebie zamiast
+dostac ten sam numer; rollback tworzenia oferty cofa tez licznik (bez dziur). Unikalny
+(tenant_id, quote_no) na quotes pilnuje reszty.
+"""
+
+from sqlalchemy.orm import Session
+
+from app.models.quoting import QuoteSequence
+from app.services.pricing import _upsert
+
+
+def next_quote_seq(db: Session, tenant_id: str, year: int) -> int:
+    """Nastepny numer oferty tenanta w roku `year` (w transakcji wolajacego, bez commit)."""
+    table = QuoteSequence.__table__
+    stmt = _upsert(db)(table).values(tenant_id=tenant_id, year=year, last_value=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.tenant_id, table.c.year],
+        set_={"last_value": table.c.last_value + 1},
+    ).returning(table.c.last_value)
+    return db.execute(stmt).scalar_one()
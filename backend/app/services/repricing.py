@@ -0,0 +1,80 @@
+"""Hurtowe przeliczanie cen linii ofert (podwyzka cennika dostawcy, nowy narzut).
+
+Jeden UPDATE ... RETURNING na wszystkie pasujace linie (bez ladowania obiektow ORM i bez
+recalc_line_prices per linia), potem jedno przeliczenie quote_totals dla dotknietych ofert -
+wszystko w jednej transakcji wolajacego. Zaokraglenia jak recalc_line_prices: ceny do 4 miejsc,
+total = qty * zaokraglona cena jednostkowa.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import Numeric, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.quoting import Deal, Quote, QuoteLine
+from app.services.pricing import refresh_totals_many
+
+# oferty "otwarte" = deal jeszcze nie wygrany/przegrany
+OPEN_DEAL_STATUSES = ("new", "estimating", "sent")
+
+
+def reprice_lines(
+    db: Session,
+    tenant_id: str,
+    *,
+    quote_ids: list[str] | None = None,
+    ref_id: str | None = None,
+    line_type: str | None = None,
+    all_open_quotes: bool = False,
+    include_closed: bool = False,
+    price_factor: Decimal | None = None,
+    purchase_price_net: Decimal | None = None,
+    markup_pct: Decimal | None = None,
+) -> dict:
+    """Zmienia cene zakupu (mnoznik albo nowa wartosc) i/lub narzut pasujacych linii i przelicza ceny sprzedazy.
+
+    Bez zmian (wszystkie None) tylko przelicza ceny sprzedazy z biezacych wartosci. Wymaga co najmniej
+    jednego filtra (quote_ids/ref_id/line_type) albo jawnego all_open_quotes=True (wszystkie otwarte
+    oferty tenanta, bez include_closed) - ValueError bez niego. Nie robi commit.
+    """
+    if not (quote_ids or ref_id or line_type or all_open_quotes):
+        raise ValueError("reprice_lines needs quote_ids, ref_id, line_type or all_open_quotes")
+    if all_open_quotes and include_closed:
+        raise ValueError("all_open_quotes cannot be combined with include_closed")
+    price = QuoteLine.purchase_price_net
+    if purchase_price_net is not None:
+        price = literal(Decimal(str(purchase_price_net)), QuoteLine.purchase_price_net.type)
+    elif price_factor is not None:
+        price = func.round(QuoteLine.purchase_price_net * literal(Decimal(str(price_factor)), Numeric(12, 6)), 4)
+    markup = QuoteLine.markup_pct if markup_pct is None else literal(Decimal(str(markup_pct)), QuoteLine.markup_pct.type)
+    unit = func.round(price * (1 + markup), 4)
+
+    conditions = [QuoteLine.tenant_id == tenant_id]
+    if quote_ids:
+        conditions.append(QuoteLine.quote_id.in_(quote_ids))
+    if ref_id:
+        conditions.append(QuoteLine.ref_id == ref_id)
+    if line_type:
+        conditions.append(QuoteLine.line_type == line_type)
+    # szablony nie sa ofertami klienta - ich ceny zmienia sie tylko przez edycje szablonu
+    quotes = select(Quote.id).where(Quote.tenant_id == tenant_id, Quote.is_template.is_(False))
+    if not include_closed:
+        quotes = quotes.join(Deal, Deal.id == Quote.deal_id).where(Deal.status.in_(OPEN_DEAL_STATUSES))
+    conditions.append(QuoteLine.quote_id.in_(quotes))
+
+    stmt = (
+        update(QuoteLine)
+        .where(*conditions)
+        .values(
+            purchase_price_net=price,
+            markup_pct=markup,
+            sell_price_net_unit=unit,
+            sell_price_net_total=func.round(QuoteLine.qty * unit, 4),
+        )
+        .returning(QuoteLine.quote_id)
+        .execution_options(synchronize_session=False)
+    )
+    touched = [row.quote_id for row in db.execute(stmt)]
+    quotes = set(touched)
+    refresh_totals_many(db, tenant_id, quotes)
+    return {"lines": len(touched), "quotes": len(quotes)}
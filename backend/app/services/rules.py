@@ -1,22 +1,357 @@
-"""Rule engine stub for BOM generation.
+"""Rule engine for BOM generation.
 
-In MVP we keep it simple:
-- quote_params are stored
-- this function can translate them into quote_lines based on tenant-configured rules
-- For now, we only provide a placeholder that can be extended.
-
-Recommended next:
-- create table bom_rules as described in earlier spec
-- implement safe evaluator for qty formulas
+Tenant-configured bom_rules turn quote_params into quote_lines (source="rule"):
+- qty_formula / condition are expressions over param keys, e.g. "ceil(indoor_units * 1.5) + 2",
+  "system == 'vrf' and floors > 1"
+- the expression language is a whitelisted subset of Python (numbers, strings, arithmetic,
+  comparisons, and/or/not, "x if c else y", functions from FUNCTIONS); formulas are validated on
+  save and compiled once into cached Python callables (compile_formula, LRU by formula text)
+- a param value is value_num, or value_text when value_num is empty; a missing param is 0
+- generation evaluates all rules of the tenant (and quote scenario) in one pass and diffs the
+  result against the stored source="rule" lines (matched by rule_id): one bulk INSERT, one UPDATE
+  and one DELETE for what actually changed, totals adjusted by delta
+- after the first generate-lines, saving params re-runs only the rules whose formulas reference a
+  changed key (rule_dependencies: param key -> rule ids, from the compiled formulas)
 """
 
+import ast
+import math
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Callable
+
+from sqlalchemy import bindparam, delete, insert, or_, select, update
 from sqlalchemy.orm import Session
-from app.models.quoting import QuoteParam, QuoteLine
-from app.services.pricing import recalc_line_prices
-
-def generate_lines_from_rules(db: Session, tenant_id: str, quote_id: str) -> int:
-    # Placeholder: do nothing by default.
-    # Return number of lines created.
-    # You can implement rules based on params here.
-    _ = db.query(QuoteParam).filter(QuoteParam.tenant_id == tenant_id, QuoteParam.quote_id == quote_id).all()
-    return 0
+
+from app.models.catalog import CatalogItem
+from app.models.quoting import BomRule, Quote, QuoteParam, QuoteLine
+from app.services.pricing import _dec, apply_totals_delta
+
+class FormulaError(ValueError):
+    pass
+
+FUNCTIONS: dict[str, Callable] = {
+    "ceil": math.ceil,
+    "floor": math.floor,
+    "round": round,
+    "min": min,
+    "max": max,
+    "abs": abs,
+}
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_CMP_OPS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+MAX_FORMULA_LENGTH = 2000
+MAX_POWER = 8
+MAX_POWER_BITS = 4096
+# kolumny linii wyliczane z reguly (porownywane przy uzgadnianiu)
+LINE_FIELDS = (
+    "line_type", "ref_id", "name", "unit", "qty", "purchase_price_net", "markup_pct",
+    "sell_price_net_unit", "sell_price_net_total", "sort_order",
+)
+
+class _Compiler(ast.NodeTransformer):
+    """Sprawdza drzewo wyrazenia (tylko dozwolone wezly) i zamienia nazwy parametrow na _p["klucz"]."""
+
+    def __init__(self):
+        self.params: set[str] = set()
+
+    def generic_visit(self, node):
+        if not isinstance(node, (
+            ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+            ast.Constant, ast.Name, ast.Load, ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd,
+            *_BIN_OPS, *_CMP_OPS,
+        )):
+            raise FormulaError(f"not allowed: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float, str)) or isinstance(node.value, complex):
+            raise FormulaError(f"not allowed constant: {node.value!r}")
+        return node
+
+    def visit_BinOp(self, node):
+        # potega tylko ze stalym, malym wykladnikiem - bez 9**9**9 zjadajacego CPU
+        if isinstance(node.op, ast.Pow) and not (
+            isinstance(node.right, ast.Constant) and isinstance(node.right.value, (int, float))
+            and abs(node.right.value) <= MAX_POWER
+        ):
+            raise FormulaError(f"exponent must be a constant <= {MAX_POWER}")
+        if isinstance(node.op, ast.Pow) and isinstance(node.left, ast.BinOp) and isinstance(node.left.op, ast.Pow):
+            raise FormulaError("nested powers are not allowed")
+        node = self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            # ((9**8)**8)**8...: staly wykladnik nie wystarcza - podstawa sprawdzana w _pow
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id="_pow", ctx=ast.Load()), args=[node.left, node.right], keywords=[]), node
+            )
+        node.left, node.right = _numeric(node.left), _numeric(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        node = self.generic_visit(node)
+        if not isinstance(node.op, ast.Not):
+            node.operand = _numeric(node.operand)
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise FormulaError("only functions: " + ", ".join(FUNCTIONS))
+        node.args = [self.visit(a) for a in node.args]
+        return node
+
+    def visit_Name(self, node):
+        if node.id in FUNCTIONS:
+            raise FormulaError(f"{node.id} is a function")
+        self.params.add(node.id)
+        return ast.copy_location(ast.Subscript(value=ast.Name(id="_p", ctx=ast.Load()), slice=ast.Constant(node.id), ctx=ast.Load()), node)
+
+def _num(value):
+    # tekst tylko do porownan: "x" * 10**9 z parametru tekstowego zjadlby pamiec
+    if isinstance(value, str):
+        raise TypeError("text value in arithmetic")
+    return value
+
+def _pow(base, exp):
+    base = _num(base)
+    # int: wynik ma ok. bit_length * exp bitow; float: przepelnienie i tak konczy sie OverflowError
+    if isinstance(base, int) and base.bit_length() * abs(exp) > MAX_POWER_BITS:
+        raise OverflowError("power result too large")
+    return base ** exp
+
+def _numeric(node):
+    if isinstance(node, ast.Constant) and not isinstance(node.value, str):
+        return node
+    return ast.Call(func=ast.Name(id="_num", ctx=ast.Load()), args=[node], keywords=[])
+
+@dataclass(frozen=True)
+class CompiledFormula:
+    source: str
+    params: frozenset[str]  # klucze parametrow, od ktorych zalezy wynik
+    fn: Callable[[dict], object]
+
+    def __call__(self, params: dict):
+        return self.fn(params)
+
+@lru_cache(maxsize=4096)
+def compile_formula(source: str) -> CompiledFormula:
+    """Waliduje i kompiluje wyrazenie do funkcji fn(params); FormulaError przy niedozwolonej skladni."""
+    if len(source) > MAX_FORMULA_LENGTH:
+        raise FormulaError("formula too long")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"syntax error: {e.msg}") from None
+    compiler = _Compiler()
+    tree = ast.fix_missing_locations(compiler.visit(tree))
+    # "lambda _p: <wyrazenie>" kompilowane raz - wywolanie to zwykle wywolanie funkcji, bez eval
+    fn_tree = ast.Expression(body=ast.Lambda(
+        args=ast.arguments(posonlyargs=[], args=[ast.arg(arg="_p")], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=tree.body,
+    ))
+    code = compile(ast.fix_missing_locations(fn_tree), "<formula>", "eval")
+    fn = eval(code, {"__builtins__": {}, "_num": _num, "_pow": _pow, **FUNCTIONS})
+    return CompiledFormula(source=source, params=frozenset(compiler.params), fn=fn)
+
+class _Params(dict):
+    # brakujacy parametr = 0 (formuly typu "ceil(extra_m or 0)" niepotrzebne)
+    def __missing__(self, key):
+        return 0
+
+def load_params(db: Session, tenant_id: str, quote_id: str) -> dict:
+    rows = db.execute(
+        select(QuoteParam.key, QuoteParam.value_num, QuoteParam.value_text)
+        .where(QuoteParam.tenant_id == tenant_id, QuoteParam.quote_id == quote_id)
+    )
+    # float: formuly mieszaja parametry ze stalymi typu 1.5, Decimal * float to TypeError
+    return _Params({k: float(num) if num is not None else (text or "") for k, num, text in rows})
+
+def _rule_rows(db: Session, tenant_id: str, scenario: str | None):
+    return db.execute(
+        select(
+            BomRule.id, BomRule.name, BomRule.line_type, BomRule.ref_id, BomRule.unit,
+            BomRule.qty_formula, BomRule.condition, BomRule.purchase_price_net, BomRule.markup_pct, BomRule.sort_order,
+        )
+        .where(
+            BomRule.tenant_id == tenant_id,
+            BomRule.is_active.is_(True),
+            or_(BomRule.scenario.is_(None), BomRule.scenario == scenario),
+        )
+        .order_by(BomRule.sort_order, BomRule.name)
+    ).all()
+
+def evaluate_rules(db: Session, tenant_id: str, rules, params: dict) -> tuple[list[dict], list[dict]]:
+    """Wartosci linii dla regul z niezerowa iloscia + bledy [{rule_id, error}] (bez zapisu).
+
+    `rules` to wiersze _rule_rows (krotki w kolejnosci kolumn tego zapytania).
+    """
+    hits, errors = [], []
+    # rozpakowanie krotki zamiast Row.atrybut - przy setkach regul to wiekszosc czasu petli
+    for rule in rules:
+        rule_id, _, _, _, _, qty_formula, condition, *_ = rule
+        try:
+            if condition and not compile_formula(condition).fn(params):
+                continue
+            qty = compile_formula(qty_formula).fn(params)
+            if isinstance(qty, str) or qty is None:
+                raise FormulaError("qty must be a number")
+            qty = _dec(qty)
+        except (FormulaError, ArithmeticError, TypeError, ValueError) as e:
+            errors.append({"rule_id": rule_id, "error": f"{type(e).__name__}: {e}"})
+            continue
+        if qty > 0:
+            hits.append((rule, qty))
+
+    # ceny i jednostki z katalogu jednym zapytaniem dla wszystkich regul bez wlasnej ceny
+    refs = {rule[3] for rule, _ in hits if rule[3]}
+    catalog = {}
+    if refs:
+        catalog = {
+            item_id: (price, unit) for item_id, price, unit in db.execute(
+                select(CatalogItem.id, CatalogItem.purchase_price_net, CatalogItem.unit)
+                .where(CatalogItem.tenant_id == tenant_id, CatalogItem.id.in_(refs))
+            )
+        }
+
+    out = []
+    for rule, qty in hits:
+        rule_id, name, line_type, ref_id, unit, _, _, price, markup, sort_order = rule
+        item_price, item_unit = catalog.get(ref_id, (0, "szt"))
+        # jak recalc_line_prices: Decimal z zaokragleniem do skali kolumn
+        price, markup = _dec(item_price if price is None else price), _dec(markup)
+        unit_price = _dec(price * (1 + markup))
+        out.append({
+            "rule_id": rule_id,
+            "line_type": line_type,
+            "ref_id": ref_id,
+            "name": name,
+            "unit": unit or item_unit,
+            "qty": qty,
+            "purchase_price_net": price,
+            "markup_pct": markup,
+            "sell_price_net_unit": unit_price,
+            "sell_price_net_total": _dec(qty * unit_price),
+            "sort_order": sort_order,
+        })
+    return out, errors
+
+def rule_dependencies(rules) -> dict[str, set[str]]:
+    """Graf zaleznosci: klucz parametru -> id regul, ktorych warunek albo ilosc od niego zalezy."""
+    graph: dict[str, set[str]] = {}
+    for rule in rules:
+        rule_id, _, _, _, _, qty_formula, condition, *_ = rule
+        try:
+            keys = compile_formula(qty_formula).params
+            if condition:
+                keys = keys | compile_formula(condition).params
+        except FormulaError:
+            # zapisane formuly sa walidowane; zepsuta i tak konczy sie bledem przy kazdym liczeniu
+            continue
+        for key in keys:
+            graph.setdefault(key, set()).add(rule_id)
+    return graph
+
+def _amounts(qty, price, total) -> tuple[Decimal, Decimal]:
+    return _dec(qty) * _dec(price), _dec(total)
+
+def sync_rule_lines(db: Session, tenant_id: str, quote_id: str, rules, params: dict, rule_ids: set[str] | None = None) -> dict:
+    """Uzgadnia linie z regul z wynikiem evaluate_rules, bez commit.
+
+    Porownuje z zapisanymi liniami (po rule_id) i zapisuje tylko roznice: jeden INSERT nowych,
+    jeden UPDATE (executemany) zmienionych, jeden DELETE zbednych; sumy oferty przez delte.
+    `rule_ids` zaweza uzgadnianie do tych regul (linie pozostalych zostaja bez zmian), None = wszystkie
+    - wtedy znikaja tez linie z regul usunietych/wylaczonych i linie bez rule_id.
+    Zwraca {"created", "updated", "deleted", "errors"}.
+    """
+    if rule_ids is not None:
+        rules = [r for r in rules if r[0] in rule_ids]
+    lines, errors = evaluate_rules(db, tenant_id, rules, params)
+    wanted = {l["rule_id"]: l for l in lines}
+
+    table = QuoteLine.__table__
+    conditions = [table.c.tenant_id == tenant_id, table.c.quote_id == quote_id, table.c.source == "rule"]
+    if rule_ids is not None:
+        if not rule_ids:
+            return {"created": 0, "updated": 0, "deleted": 0, "errors": errors}
+        conditions.append(table.c.rule_id.in_(rule_ids))
+    stored = db.execute(select(table.c.id, table.c.rule_id, *[table.c[f] for f in LINE_FIELDS]).where(*conditions))
+
+    updates, deleted_ids, seen = [], [], set()
+    cost_delta = sell_delta = Decimal(0)
+    for row in stored:
+        line_id, rule_id, *values = row
+        old = dict(zip(LINE_FIELDS, values))
+        line = wanted.get(rule_id)
+        old_cost, old_sell = _amounts(old["qty"], old["purchase_price_net"], old["sell_price_net_total"])
+        if line is None or rule_id in seen:
+            deleted_ids.append(line_id)
+            cost_delta, sell_delta = cost_delta - old_cost, sell_delta - old_sell
+            continue
+        seen.add(rule_id)
+        if any(line[f] != old[f] for f in LINE_FIELDS):
+            updates.append({"_id": line_id, **{f: line[f] for f in LINE_FIELDS}})
+            cost, sell = _amounts(line["qty"], line["purchase_price_net"], line["sell_price_net_total"])
+            cost_delta, sell_delta = cost_delta + cost - old_cost, sell_delta + sell - old_sell
+    inserts = [
+        {"id": str(uuid.uuid4()), "tenant_id": tenant_id, "quote_id": quote_id, "source": "rule", **line}
+        for rule_id, line in wanted.items() if rule_id not in seen
+    ]
+    for line in inserts:
+        cost, sell = _amounts(line["qty"], line["purchase_price_net"], line["sell_price_net_total"])
+        cost_delta, sell_delta = cost_delta + cost, sell_delta + sell
+
+    if deleted_ids:
+        db.execute(delete(table).where(table.c.id.in_(deleted_ids)))
+    if updates:
+        db.execute(update(table).where(table.c.id == bindparam("_id")), updates)
+    if inserts:
+        # executemany na tabeli (Core) -> wielowierszowe INSERT (insertmanyvalues), bez obiektow ORM
+        db.execute(insert(table), inserts)
+    if inserts or updates or deleted_ids:
+        apply_totals_delta(db, tenant_id, quote_id, cost_delta, sell_delta)
+    return {"created": len(inserts), "updated": len(updates), "deleted": len(deleted_ids), "errors": errors}
+
+def generate_lines_from_rules(db: Session, tenant_id: str, quote_id: str) -> dict:
+    """Uzgadnia wszystkie linie z regul z biezacymi parametrami i wlacza przeliczanie przy zmianie parametrow.
+
+    Bez commit; zwraca {"created", "updated", "deleted", "errors"}, sumy oferty sa juz zaktualizowane.
+    None gdy oferty nie ma (albo nalezy do innego tenanta) - wtedy reguly nie sa liczone.
+    """
+    quote = db.execute(select(Quote.scenario).where(Quote.tenant_id == tenant_id, Quote.id == quote_id)).first()
+    if quote is None:
+        return None
+    result = sync_rule_lines(db, tenant_id, quote_id, _rule_rows(db, tenant_id, quote.scenario), load_params(db, tenant_id, quote_id))
+    db.execute(
+        update(Quote)
+        .where(Quote.tenant_id == tenant_id, Quote.id == quote_id)
+        .values(bom_generated_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    return result
+
+def regenerate_for_params(db: Session, tenant_id: str, quote_id: str, changed) -> dict:
+    """Po zapisie parametrow: przelicza tylko reguly zalezne od kluczy `changed`, bez commit.
+
+    Dziala dla ofert po generate-lines (bom_generated_at); zwraca {"rules": liczba przeliczonych
+    regul, "created", "updated", "deleted", "errors"}.
+    """
+    result = {"rules": 0, "created": 0, "updated": 0, "deleted": 0, "errors": []}
+    quote = db.execute(
+        select(Quote.scenario, Quote.bom_generated_at).where(Quote.tenant_id == tenant_id, Quote.id == quote_id)
+    ).first()
+    if not changed or quote is None or quote.bom_generated_at is None:
+        return result
+    rules = _rule_rows(db, tenant_id, quote.scenario)
+    graph = rule_dependencies(rules)
+    rule_ids = set().union(*(graph.get(k, ()) for k in changed))
+    result["rules"] = len(rule_ids)
+    if rule_ids:
+        result.update(sync_rule_lines(db, tenant_id, quote_id, rules, load_params(db, tenant_id, quote_id), rule_ids))
+    return result
+
+def validate_formula(source: str) -> frozenset[str]:
+    """Klucze parametrow uzyte w formule; FormulaError gdy formula jest niepoprawna."""
+    return compile_formula(source).params
@@ -0,0 +1,81 @@
+"""Dziennik wolnych requestow (ops_slow_requests) - ring buffer w bazie.
+
+Zapisywany jest kazdy request wolniejszy niz SLOW_REQUEST_MS oraz probka szybkich
+(SLOW_REQUEST_SAMPLE_RATE), razem z parametrami, tenantem i zapytaniami SQL (czas + miejsce
+wywolania, max SLOW_REQUEST_MAX_STATEMENTS). Tabela trzyma ostatnie SLOW_REQUEST_MAX_ROWS wpisow.
+Przegladanie: GET /admin/slow-requests, agregaty: GET /admin/slow-requests/summary.
+"""
+import logging
+import random
+from urllib.parse import parse_qsl
+
+from sqlalchemy import delete
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.ops import SlowRequest
+
+log = logging.getLogger("app.slowlog")
+
+_REDACT = ("password", "token", "secret", "key")
+
+
+def should_record(duration_ms: float) -> tuple[bool, bool]:
+    """(zapisac?, probka?)"""
+    if not settings.SLOW_REQUEST_LOG:
+        return False, False
+    if duration_ms >= settings.SLOW_REQUEST_MS:
+        return True, False
+    if settings.SLOW_REQUEST_SAMPLE_RATE > 0 and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE:
+        return True, True
+    return False, False
+
+
+def request_params(scope) -> dict:
+    query = {}
+    for k, v in parse_qsl((scope.get("query_string") or b"").decode("latin-1"), keep_blank_values=True):
+        if any(x in k.lower() for x in _REDACT):
+            v = "***"
+        if k in query:
+            query[k] = (query[k] if isinstance(query[k], list) else [query[k]]) + [v]
+        else:
+            query[k] = v
+    out = {"query": query}
+    path_params = scope.get("path_params")
+    if path_params:
+        out["path"] = {k: str(v) for k, v in path_params.items()}
+    return out
+
+
+def record(scope, status_code: int, duration_ms: float, stats, sampled: bool) -> None:
+    """Zapis w osobnej sesji (wolane z threadpoola po wyslaniu odpowiedzi); bledy tylko do logu."""
+    state = scope.get("state") or {}
+    route = getattr(scope.get("route"), "path", None) or "unmatched"
+    row = SlowRequest(
+        tenant_id=state.get("tenant_id"),
+        user_id=state.get("user_id"),
+        method=scope.get("method", "")[:10],
+        route=route[:255],
+        path=(scope.get("path") or "")[:500],
+        params=request_params(scope),
+        status=status_code,
+        duration_ms=round(duration_ms, 3),
+        db_ms=round(stats.time_ms, 3) if stats is not None else 0.0,
+        query_count=stats.count if stats is not None else 0,
+        sampled=sampled,
+        statements=list(stats.statements) if stats is not None else None,
+    )
+    db = SessionLocal()
+    try:
+        db.add(row)
+        db.flush()
+        # ring buffer: id rosnie monotonicznie, wiec wszystko ponizej id - MAX jest najstarsze
+        cutoff = row.id - settings.SLOW_REQUEST_MAX_ROWS
+        if cutoff > 0:
+            db.execute(delete(SlowRequest).where(SlowRequest.id <= cutoff))
+        db.commit()
+    except Exception:
+        db.rollback()
+        log.warning("slow request log write failed", exc_info=True)
+    finally:
+        db.close()
@@ -49,20 +49,35 @@ class EmployeeReportOut(BaseModel):
     total_travel_hours: float = 0.0
     total_km: float = 0.0
     days: List[EmployeeDayOut] = []
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, noload
 
 from app.db import SessionLocal
+from app.deps import require_roles
 from app.timekeeping.models import (
     TkCrewLog,
     TkCrewLogMember,
+    TkCrewLogSnapshot,
+    TkCrewLogStatus,
     TkCrewWorkSegment,
     TkEmployee,
     TkVehicle,
     TkSite,
     TkSegmentType,
 )
+from app.timekeeping.archive import archive_horizon, archive_month, is_month_archived, load_archived_records
+from app.timekeeping.time_utils import ceil_minutes_to_quarters
+from app.tracing import TracedRoute, span, traced
+from app.timekeeping.snapshots import (
+    compute_crew_log_records,
+    drop_snapshots,
+    load_locked_records,
+    seg_type_name,
+    snapshot_crew_logs,
+    snapshot_record,
+)
 
-router = APIRouter(prefix="/timekeeping", tags=["timekeeping"])
+# TracedRoute: spany handler/validate przy TRACE_EXPORT (app/tracing.py)
+router = APIRouter(prefix="/timekeeping", tags=["timekeeping"], route_class=TracedRoute)
 
 
 def get_db():
@@ -214,6 +229,7 @@ class CrewLogOut(BaseModel):
     work_date: date
     vehicle_id: int
     created_by_employee_id: Optional[int] = None
+    status: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -230,6 +246,8 @@ def create_crew_log(payload: CrewLogCreate, db: Session = Depends(get_db)):
     )
     if existing:
         raise HTTPException(status_code=409, detail=f"Crew log already exists (id={existing.id}).")
+    if is_month_archived(db, payload.work_date):
+        raise HTTPException(status_code=409, detail=f"Month {payload.work_date:%Y-%m} is archived.")
 
     log = TkCrewLog(
         work_date=payload.work_date,
@@ -281,9 +299,7 @@ def list_members(log_id: int, db: Session = Depends(get_db)):
 
 @router.post("/crew-logs/{log_id}/members", response_model=CrewMemberOut)
 def add_member(log_id: int, payload: CrewMemberCreate, db: Session = Depends(get_db)):
-    log = db.query(TkCrewLog).filter(TkCrewLog.id == log_id).first()
-    if not log:
-        raise HTTPException(status_code=404, detail="Crew log not found")
+    _editable_crew_log(db, log_id)
 
     emp = db.query(TkEmployee).filter(TkEmployee.id == payload.employee_id).first()
     if not emp:
@@ -306,6 +322,167 @@ def add_member(log_id: int, payload: CrewMemberCreate, db: Session = Depends(get
     return m
 
 
+# -----------------------
+# Crew Log lifecycle (draft -> submitted -> approved -> locked)
+# -----------------------
+
+_LIFECYCLE = {
+    "submit": ({TkCrewLogStatus.draft}, TkCrewLogStatus.submitted),
+    "approve": ({TkCrewLogStatus.submitted}, TkCrewLogStatus.approved),
+    "lock": ({TkCrewLogStatus.approved}, TkCrewLogStatus.locked),
+    "reopen": ({TkCrewLogStatus.submitted, TkCrewLogStatus.approved, TkCrewLogStatus.locked}, TkCrewLogStatus.draft),
+}
+
+# limit parametrow IN (...) dla SQLite
+_LOCK_BATCH = 500
+
+
+def _ensure_unlocked(log: TkCrewLog) -> None:
+    if log.status == TkCrewLogStatus.locked:
+        raise HTTPException(status_code=409, detail=f"Crew log is locked (id={log.id}). Reopen it first.")
+
+
+def _editable_crew_log(db: Session, log_id: int) -> TkCrewLog:
+    """Log do zmiany czlonkow/segmentow: 404 gdy brak, 409 gdy locked.
+
+    FOR UPDATE (jak w _transition_crew_log) - rownolegly lock czeka na koniec zmiany,
+    wiec snapshot nie powstaje z danych, ktore zaraz sie zmienia.
+    """
+    log = db.query(TkCrewLog).filter(TkCrewLog.id == log_id).with_for_update().first()
+    if not log:
+        raise HTTPException(status_code=404, detail="Crew log not found")
+    _ensure_unlocked(log)
+    return log
+
+
+def _transition_crew_log(db: Session, log_id: int, action: str) -> TkCrewLog:
+    log = db.query(TkCrewLog).filter(TkCrewLog.id == log_id).with_for_update().first()
+    if not log:
+        raise HTTPException(status_code=404, detail="Crew log not found")
+
+    allowed, target = _LIFECYCLE[action]
+    if log.status not in allowed:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot {action} crew log in status '{TkCrewLogStatus(log.status).value}'.",
+        )
+
+    if log.status == TkCrewLogStatus.locked:
+        drop_snapshots(db, [log.id])
+    if target == TkCrewLogStatus.locked:
+        snapshot_crew_logs(db, [log])
+
+    log.status = target
+    db.commit()
+    db.refresh(log)
+    return log
+
+
+@router.post("/crew-logs/{log_id}/submit", response_model=CrewLogOut)
+def submit_crew_log(log_id: int, db: Session = Depends(get_db)):
+    return _transition_crew_log(db, log_id, "submit")
+
+
+@router.post("/crew-logs/{log_id}/approve", response_model=CrewLogOut)
+def approve_crew_log(log_id: int, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    return _transition_crew_log(db, log_id, "approve")
+
+
+@router.post("/crew-logs/{log_id}/lock", response_model=CrewLogOut)
+def lock_crew_log(log_id: int, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    return _transition_crew_log(db, log_id, "lock")
+
+
+@router.post("/crew-logs/{log_id}/reopen", response_model=CrewLogOut)
+def reopen_crew_log(log_id: int, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    return _transition_crew_log(db, log_id, "reopen")
+
+
+class CrewLogRangeIn(BaseModel):
+    date_from: date
+    date_to: date
+    vehicle_id: Optional[int] = None
+
+
+def _crew_logs_in_range(db: Session, payload: CrewLogRangeIn, status: TkCrewLogStatus):
+    if payload.date_to < payload.date_from:
+        raise HTTPException(status_code=422, detail="date_to must be >= date_from")
+    q = (
+        db.query(TkCrewLog)
+        .filter(TkCrewLog.work_date >= payload.date_from)
+        .filter(TkCrewLog.work_date <= payload.date_to)
+        .filter(TkCrewLog.status == status)
+    )
+    if payload.vehicle_id is not None:
+        q = q.filter(TkCrewLog.vehicle_id == payload.vehicle_id)
+    return q
+
+
+def _status_counts(db: Session, payload: CrewLogRangeIn) -> Dict[str, int]:
+    from sqlalchemy import func
+
+    q = (
+        db.query(TkCrewLog.status, func.count(TkCrewLog.id))
+        .filter(TkCrewLog.work_date >= payload.date_from)
+        .filter(TkCrewLog.work_date <= payload.date_to)
+    )
+    if payload.vehicle_id is not None:
+        q = q.filter(TkCrewLog.vehicle_id == payload.vehicle_id)
+    return {TkCrewLogStatus(st).value: int(n) for st, n in q.group_by(TkCrewLog.status).all()}
+
+
+@router.post("/crew-logs/approve-range")
+def approve_crew_logs_range(payload: CrewLogRangeIn, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    approved = (
+        _crew_logs_in_range(db, payload, TkCrewLogStatus.submitted)
+        .update(
+            {TkCrewLog.status: TkCrewLogStatus.approved, TkCrewLog.updated_at: datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return {"ok": True, "approved": int(approved), "by_status": _status_counts(db, payload)}
+
+
+@router.post("/crew-logs/lock-range")
+def lock_crew_logs_range(payload: CrewLogRangeIn, user=Depends(require_roles("admin", "manager")), db: Session = Depends(get_db)):
+    logs = (
+        _crew_logs_in_range(db, payload, TkCrewLogStatus.approved)
+        .order_by(TkCrewLog.id.asc())
+        .with_for_update()
+        .all()
+    )
+    for i in range(0, len(logs), _LOCK_BATCH):
+        batch = logs[i:i + _LOCK_BATCH]
+        snapshot_crew_logs(db, batch)
+        for log in batch:
+            log.status = TkCrewLogStatus.locked
+        db.flush()
+    db.commit()
+    return {"ok": True, "locked": len(logs), "by_status": _status_counts(db, payload)}
+
+
+class ArchiveMonthIn(BaseModel):
+    month: date  # dowolny dzien miesiaca
+
+
+@router.post("/archive-month")
+def archive_crew_logs_month(payload: ArchiveMonthIn, user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    """Reczna archiwizacja jednego miesiaca (jak app.scripts.archive_timekeeping z crona)."""
+    month = date(payload.month.year, payload.month.month, 1)
+    if month >= archive_horizon():
+        raise HTTPException(status_code=409, detail=f"Month {month:%Y-%m} is newer than the archive horizon.")
+    if is_month_archived(db, month):
+        raise HTTPException(status_code=409, detail=f"Month {month:%Y-%m} is archived.")
+    try:
+        part = archive_month(db, month)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if part is None:
+        raise HTTPException(status_code=404, detail=f"No crew logs in {month:%Y-%m}.")
+    return {"ok": True, "month": part.month, "crew_logs": part.crew_logs, "rows": part.rows, "size_bytes": part.size_bytes}
+
+
 # -----------------------
 # Segments
 # -----------------------
@@ -321,9 +498,7 @@ def list_segments(log_id: int, db: Session = Depends(get_db)):
 
 @router.post("/crew-logs/{log_id}/segments", response_model=CrewSegmentOut)
 def add_segment(log_id: int, payload: CrewSegmentCreate, db: Session = Depends(get_db)):
-    log = db.query(TkCrewLog).filter(TkCrewLog.id == log_id).first()
-    if not log:
-        raise HTTPException(status_code=404, detail="Crew log not found")
+    log = _editable_crew_log(db, log_id)
 
     open_seg = (
         db.query(TkCrewWorkSegment)
@@ -373,6 +548,7 @@ def add_segment(log_id: int, payload: CrewSegmentCreate, db: Session = Depends(g
             if gap_min > 0:
                 travel = TkCrewWorkSegment(
                     crew_log_id=log_id,
+                    work_date=log.work_date,
                     site_id=payload.site_id,
                     segment_type=TkSegmentType.travel,
                     start_at=last_end,
@@ -386,6 +562,7 @@ def add_segment(log_id: int, payload: CrewSegmentCreate, db: Session = Depends(g
     
     seg = TkCrewWorkSegment(
         crew_log_id=log_id,
+        work_date=log.work_date,
         site_id=payload.site_id,
         segment_type=getattr(payload, "segment_type", None) or TkSegmentType.work,
         start_at=payload.start_at,
@@ -412,6 +589,7 @@ def start_segment(log_id: int, payload: SegmentStartIn, db: Session = Depends(ge
 
 @router.patch("/crew-logs/{log_id}/segments/{segment_id}/close", response_model=CrewSegmentOut)
 def close_segment(log_id: int, segment_id: int, payload: CrewSegmentClose, db: Session = Depends(get_db)):
+    _editable_crew_log(db, log_id)
     seg = (
         db.query(TkCrewWorkSegment)
         .filter(TkCrewWorkSegment.id == segment_id)
@@ -547,158 +725,97 @@ def report_daily(
     employee_id: Optional[int] = None,
     db: Session = Depends(get_db),
 ):
-    q = (
-        db.query(
-            TkCrewWorkSegment.crew_log_id,
-            TkCrewWorkSegment.site_id,
-            TkCrewWorkSegment.start_at,
-            TkCrewWorkSegment.end_at,
-            TkCrewLog.vehicle_id.label("vehicle_id"),
-        )
-        .join(TkCrewLog, TkCrewLog.id == TkCrewWorkSegment.crew_log_id)
-        .filter(TkCrewLog.work_date == work_date)
-        .filter(TkCrewWorkSegment.end_at.isnot(None))
-    )
-
-    if vehicle_id is not None:
-        q = q.filter(TkCrewLog.vehicle_id == vehicle_id)
-
-    segments = q.all()
-
-    crew_log_ids = sorted({s.crew_log_id for s in segments})
-    site_ids = sorted({s.site_id for s in segments})
-
-    sites_by_id = {}
-    if site_ids:
-        for s in db.query(TkSite).filter(TkSite.id.in_(site_ids)).all():
-            sites_by_id[s.id] = s.name
-
-    crewlog_vehicle = {}
-    if crew_log_ids:
-        for cl in db.query(TkCrewLog).filter(TkCrewLog.id.in_(crew_log_ids)).all():
-            crewlog_vehicle[cl.id] = cl.vehicle_id
-
-    members_by_log = defaultdict(list)
-    if crew_log_ids:
-        members = (
-            db.query(TkCrewLogMember)
-            .filter(TkCrewLogMember.crew_log_id.in_(crew_log_ids))
-            .all()
+    with span("daily.query", date=str(work_date)) as sp:
+        # zablokowane logi: sumy ze snapshotow albo z archiwum; pozostale liczone z segmentow (jak report_day)
+        frozen = _frozen_records(db, work_date, work_date, vehicle_id=vehicle_id)
+        q = (
+            db.query(TkCrewLog)
+            .filter(TkCrewLog.work_date == work_date)
+            .filter(TkCrewLog.status != TkCrewLogStatus.locked)
+            .options(noload(TkCrewLog.members), noload(TkCrewLog.segments))
         )
-        for m in members:
-            members_by_log[m.crew_log_id].append(m.employee_id)
-
-    employees_by_id = {}
-    if crew_log_ids:
-        emp_ids = sorted({eid for ids in members_by_log.values() for eid in ids})
-        if emp_ids:
-            for e in db.query(TkEmployee).filter(TkEmployee.id.in_(emp_ids)).all():
-                employees_by_id[e.id] = e.full_name
-
-    site_totals: Dict[int, Dict[str, int]] = defaultdict(lambda: {"minutes": 0, "segments": 0, "work_minutes": 0, "travel_minutes": 0})
-    crewlog_totals: Dict[int, Dict[str, int]] = defaultdict(lambda: {"minutes": 0, "segments": 0, "work_minutes": 0, "travel_minutes": 0})
-    employee_totals: Dict[int, Dict[str, int]] = defaultdict(lambda: {"minutes": 0, "segments": 0, "work_minutes": 0, "travel_minutes": 0})
-
-    total_minutes = 0
-
-    for s in segments:
-        start_at = s.start_at
-        end_at = s.end_at
-        if not end_at:
+        if vehicle_id is not None:
+            q = q.filter(TkCrewLog.vehicle_id == vehicle_id)
+        records = frozen + list(compute_crew_log_records(db, q.all()).values())
+        sp.set(crew_logs=len(records), frozen=len(frozen))
+
+    def _bucket():
+        return {"work": 0.0, "travel": 0.0, "segments": 0}
+
+    def _add(b, work, travel, segments):
+        b["work"] += work
+        b["travel"] += travel
+        b["segments"] += segments
+
+    sites_acc: Dict[int, dict] = {}
+    site_names: Dict[int, str] = {}
+    crew_logs_acc: Dict[int, dict] = {}
+    crew_log_vehicle: Dict[int, int] = {}
+    employees_acc: Dict[int, dict] = {}
+    employee_names: Dict[int, str] = {}
+
+    for rec in records:
+        if not rec["segments_count"]:
             continue
+        wr = rec["work_minutes_raw"]
+        tr = rec["travel_minutes_raw"]
+        n = rec["segments_count"]
+        clid = rec["crew_log_id"]
+        _add(crew_logs_acc.setdefault(clid, _bucket()), wr, tr, n)
+        crew_log_vehicle[clid] = rec["vehicle_id"] or 0
+        for st in rec["sites"]:
+            sid = int(st["site_id"])
+            site_names.setdefault(sid, st.get("name") or "")
+            _add(sites_acc.setdefault(sid, _bucket()), st["work_minutes_raw"], st["travel_minutes_raw"], st["segments"])
+        # kazdy czlonek skladu dostaje pelny czas logu (jak _aggregate_range i payroll)
+        for eid, name in rec["members"]:
+            if employee_id is not None and eid != employee_id:
+                continue
+            employee_names.setdefault(eid, name or "")
+            _add(employees_acc.setdefault(eid, _bucket()), wr, tr, n)
 
-        minutes = int(max(0, (end_at - start_at).total_seconds() // 60))
-        total_minutes += minutes
-
-        site_totals[s.site_id]["minutes"] += minutes
-        is_travel = (getattr(seg, "segment_type", None) == TkSegmentType.travel)
-        if is_travel:
-            site_totals[s.site_id]["travel_minutes"] += minutes
-        else:
-            site_totals[s.site_id]["work_minutes"] += minutes
-        site_totals[s.site_id]["segments"] += 1
+    def _round15_minutes(minutes):
+        return ceil_minutes_to_quarters(minutes) * 15
 
-        crewlog_totals[s.crew_log_id]["minutes"] += minutes
+    def _totals(b):
+        # zaokraglenie w gore do kwadransa z surowych minut, jak w /reports/range
+        return {
+            "minutes": _round15_minutes(b["work"] + b["travel"]),
+            "work_minutes": _round15_minutes(b["work"]),
+            "travel_minutes": _round15_minutes(b["travel"]),
+            "segments": b["segments"],
+        }
 
-        if is_travel:
-            crewlog_totals[s.crew_log_id]["travel_minutes"] += minutes
-        else:
-            crewlog_totals[s.crew_log_id]["work_minutes"] += minutes
-        if is_travel:
-            crewlog_totals[s.crew_log_id]["travel_minutes"] += minutes
-        else:
-            crewlog_totals[s.crew_log_id]["work_minutes"] += minutes
-        crewlog_totals[s.crew_log_id]["segments"] += 1
-
-        emp_ids = members_by_log.get(s.crew_log_id, [])
-        if employee_id is not None:
-            emp_ids = [x for x in emp_ids if x == employee_id]
-
-        if emp_ids:
-            per_emp = minutes // len(emp_ids) if len(emp_ids) > 0 else 0
-            for eid in emp_ids:
-                employee_totals[eid]["minutes"] += per_emp
-                is_travel = (getattr(seg, "segment_type", None) == TkSegmentType.travel)
-                if is_travel:
-                    employee_totals[eid]["travel_minutes"] += per_emp
-                else:
-                    employee_totals[eid]["work_minutes"] += per_emp
-                employee_totals[eid]["segments"] += 1
+    def _by_minutes(acc):
+        totals = {k: _totals(b) for k, b in acc.items()}
+        return sorted(totals.items(), key=lambda kv: (-kv[1]["minutes"], kv[0]))
 
     employees_out = [
-        DailyEmployeeTotal(
-            employee_id=eid,
-            full_name=employees_by_id.get(eid, f"Employee {eid}"),
-            minutes=vals["minutes"],
-            work_minutes=vals.get("work_minutes", 0),
-            travel_minutes=vals.get("travel_minutes", 0),
-            segments=vals["segments"],
-        )
-        for eid, vals in sorted(employee_totals.items(), key=lambda kv: (-(kv[1]["minutes"]), kv[0]))
+        DailyEmployeeTotal(employee_id=eid, full_name=employee_names.get(eid) or f"Employee {eid}", **vals)
+        for eid, vals in _by_minutes(employees_acc)
     ]
-
     sites_out = [
-        DailySiteTotal(
-            site_id=sid,
-            name=sites_by_id.get(sid, f"Site {sid}"),
-            minutes=vals["minutes"],
-            work_minutes=vals.get("work_minutes", 0),
-            travel_minutes=vals.get("travel_minutes", 0),
-            segments=vals["segments"],
-        )
-        for sid, vals in sorted(site_totals.items(), key=lambda kv: (-(kv[1]["minutes"]), kv[0]))
+        DailySiteTotal(site_id=sid, name=site_names.get(sid) or f"Site {sid}", **vals)
+        for sid, vals in _by_minutes(sites_acc)
     ]
-
     crew_logs_out = [
-        DailyCrewLogTotal(
-            crew_log_id=clid,
-            vehicle_id=crewlog_vehicle.get(clid, 0),
-            minutes=vals["minutes"],
-            work_minutes=vals.get("work_minutes", 0),
-            travel_minutes=vals.get("travel_minutes", 0),
-            segments=vals["segments"],
-        )
-        for clid, vals in sorted(crewlog_totals.items(), key=lambda kv: (-(kv[1]["minutes"]), kv[0]))
+        DailyCrewLogTotal(crew_log_id=clid, vehicle_id=crew_log_vehicle.get(clid, 0), **vals)
+        for clid, vals in _by_minutes(crew_logs_acc)
     ]
 
-    def _val(x, k):
-        return x.get(k, 0) if isinstance(x, dict) else getattr(x, k, 0)
-
-    minutes_total = sum(_val(x, "minutes") for x in crew_logs_out) if crew_logs_out else 0
-    work_minutes_total = sum(_val(x, "work_minutes") for x in crew_logs_out) if crew_logs_out else 0
-    travel_minutes_total = sum(_val(x, "travel_minutes") for x in crew_logs_out) if crew_logs_out else 0
-
+    raw_work = sum(b["work"] for b in crew_logs_acc.values())
+    raw_travel = sum(b["travel"] for b in crew_logs_acc.values())
     return DailyReportOut(
         work_date=work_date,
-        total_minutes=minutes_total,
-        work_minutes=work_minutes_total,
-        travel_minutes=travel_minutes_total,
+        total_minutes=_round15_minutes(raw_work + raw_travel),
+        work_minutes=_round15_minutes(raw_work),
+        travel_minutes=_round15_minutes(raw_travel),
         employees=employees_out,
         sites=sites_out,
         crew_logs=crew_logs_out,
-        minutes=minutes,
-
     )
+
+
 @router.get("/reports/range", response_model=RangeReportOut)
 def report_range(
 date_from: date,
@@ -753,13 +870,14 @@ import csv
 from fastapi.responses import Response
 
 def _csv_response(filename: str, header: list[str], rows: list[list[object]]) -> Response:
-    buf = StringIO()
-    w = csv.writer(buf, delimiter=";")
-    w.writerow(header)
-    for r in rows:
-        w.writerow(r)
-
-    content = "\ufeff" + buf.getvalue()
+    with span("csv.render", rows=len(rows)):
+        buf = StringIO()
+        w = csv.writer(buf, delimiter=";")
+        w.writerow(header)
+        for r in rows:
+            w.writerow(r)
+
+        content = "\ufeff" + buf.getvalue()
     return Response(
         content=content,
         media_type="text/csv; charset=utf-8",
@@ -789,7 +907,8 @@ def _aggregate_range(db, date_from, date_to, vehicle_id=None, employee_id=None):
     date_from_s = _d(date_from)
     date_to_s = _d(date_to)
 
-    base_where = "l.work_date >= :date_from AND l.work_date <= :date_to AND ws.start_at IS NOT NULL AND ws.end_at IS NOT NULL"
+    # ws.work_date: na PG pozwala przyciac partycje segmentow do miesiecy z zakresu
+    base_where = "l.work_date >= :date_from AND l.work_date <= :date_to AND ws.work_date >= :date_from AND ws.work_date <= :date_to AND ws.start_at IS NOT NULL AND ws.end_at IS NOT NULL AND l.status <> 'locked'"
     params = {"date_from": date_from_s, "date_to": date_to_s}
 
     if vehicle_id is not None:
@@ -803,21 +922,14 @@ def _aggregate_range(db, date_from, date_to, vehicle_id=None, employee_id=None):
         emp_filter_where = " AND lm_f.employee_id = :employee_id"
         params["employee_id"] = int(employee_id)
 
-    minutes_expr = "(julianday(ws.end_at) - julianday(ws.start_at)) * 1440.0"
+    if db.get_bind().dialect.name == "postgresql":
+        minutes_expr = "EXTRACT(EPOCH FROM (ws.end_at - ws.start_at)) / 60.0"
+    else:
+        minutes_expr = "(julianday(ws.end_at) - julianday(ws.start_at)) * 1440.0"
     work_min_expr = f"SUM(CASE WHEN ws.segment_type = 'work' THEN {minutes_expr} ELSE 0.0 END)"
     travel_min_expr = f"SUM(CASE WHEN ws.segment_type = 'travel' THEN {minutes_expr} ELSE 0.0 END)"
     total_min_expr = f"SUM({minutes_expr})"
 
-    total_sql = text(f"""
-SELECT COALESCE({total_min_expr}, 0.0) AS minutes,
-       COALESCE({work_min_expr}, 0.0) AS work_minutes,
-       COALESCE({travel_min_expr}, 0.0) AS travel_minutes
-FROM tk_crew_work_segments ws
-JOIN tk_crew_logs l ON l.id = ws.crew_log_id
-{emp_filter_join}
-WHERE {base_where}{emp_filter_where}
-""")
-
     days_sql = text(f"""
 SELECT l.work_date AS work_date,
        COALESCE({total_min_expr}, 0.0) AS minutes,
@@ -825,7 +937,7 @@ SELECT l.work_date AS work_date,
        COALESCE({travel_min_expr}, 0.0) AS travel_minutes,
        COUNT(ws.id) AS segments
 FROM tk_crew_work_segments ws
-JOIN tk_crew_logs l ON l.id = ws.crew_log_id
+JOIN tk_crew_logs l ON l.id = ws.crew_log_id AND l.work_date = ws.work_date
 {emp_filter_join}
 WHERE {base_where}{emp_filter_where}
 GROUP BY l.work_date
@@ -840,7 +952,7 @@ SELECT ws.site_id AS site_id,
        COALESCE({travel_min_expr}, 0.0) AS travel_minutes,
        COUNT(ws.id) AS segments
 FROM tk_crew_work_segments ws
-JOIN tk_crew_logs l ON l.id = ws.crew_log_id
+JOIN tk_crew_logs l ON l.id = ws.crew_log_id AND l.work_date = ws.work_date
 LEFT JOIN tk_sites s ON s.id = ws.site_id
 {emp_filter_join}
 WHERE {base_where}{emp_filter_where}
@@ -857,7 +969,7 @@ SELECT l.vehicle_id AS vehicle_id,
        COALESCE({travel_min_expr}, 0.0) AS travel_minutes,
        COUNT(ws.id) AS segments
 FROM tk_crew_work_segments ws
-JOIN tk_crew_logs l ON l.id = ws.crew_log_id
+JOIN tk_crew_logs l ON l.id = ws.crew_log_id AND l.work_date = ws.work_date
 LEFT JOIN tk_vehicles v ON v.id = l.vehicle_id
 {emp_filter_join}
 WHERE {base_where}{emp_filter_where}
@@ -873,7 +985,7 @@ SELECT e.id AS employee_id,
        COALESCE({travel_min_expr}, 0.0) AS travel_minutes,
        COUNT(ws.id) AS segments
 FROM tk_crew_work_segments ws
-JOIN tk_crew_logs l ON l.id = ws.crew_log_id
+JOIN tk_crew_logs l ON l.id = ws.crew_log_id AND l.work_date = ws.work_date
 JOIN tk_crew_log_members lm ON lm.crew_log_id = l.id
 JOIN tk_employees e ON e.id = lm.employee_id
 {emp_filter_join}
@@ -882,93 +994,99 @@ GROUP BY e.id, e.full_name
 ORDER BY minutes DESC
 """)
 
-    total_row = db.execute(total_sql, params).mappings().first()
-    raw_total_min = total_row["minutes"] if total_row else 0.0
-    raw_work_min = total_row["work_minutes"] if total_row else 0.0
-    raw_travel_min = total_row["travel_minutes"] if total_row else 0.0
-
-    total_minutes = _round15_minutes(raw_total_min)
-    work_minutes = _round15_minutes(raw_work_min)
-    travel_minutes = _round15_minutes(raw_travel_min)
-
-    total_hours, total_work_hours, total_travel_hours = split_work_travel_hours(raw_work_min, raw_travel_min)
-
-    days_rows = db.execute(days_sql, params).mappings().all()
-    sites_rows = db.execute(sites_sql, params).mappings().all()
-    vehicles_rows = db.execute(vehicles_sql, params).mappings().all()
-    employees_rows = db.execute(employees_sql, params).mappings().all()
-
-    days = []
-    for r in days_rows:
-        rm = float(r["minutes"] or 0.0)
-        rwm = float(r["work_minutes"] or 0.0)
-        rtm = float(r["travel_minutes"] or 0.0)
-        h, wh, th = split_work_travel_hours(rwm, rtm)
-        days.append({
-            "work_date": _d(r["work_date"]),
-            "minutes": _round15_minutes(rm),
-            "work_minutes": _round15_minutes(rwm),
-            "travel_minutes": _round15_minutes(rtm),
-            "hours": h,
-            "work_hours": wh,
-            "travel_hours": th,
-            "segments": int(r["segments"] or 0),
-        })
-
-    sites = []
-    for r in sites_rows:
-        rm = float(r["minutes"] or 0.0)
-        rwm = float(r["work_minutes"] or 0.0)
-        rtm = float(r["travel_minutes"] or 0.0)
-        h, wh, th = split_work_travel_hours(rwm, rtm)
-        sites.append({
-            "site_id": int(r["site_id"]) if r["site_id"] is not None else 0,
-            "name": r["name"] or "",
-            "minutes": _round15_minutes(rm),
-            "work_minutes": _round15_minutes(rwm),
-            "travel_minutes": _round15_minutes(rtm),
-            "hours": h,
-            "work_hours": wh,
-            "travel_hours": th,
-            "segments": int(r["segments"] or 0),
-        })
-
-    vehicles = []
-    for r in vehicles_rows:
-        rm = float(r["minutes"] or 0.0)
-        rwm = float(r["work_minutes"] or 0.0)
-        rtm = float(r["travel_minutes"] or 0.0)
-        h, wh, th = split_work_travel_hours(rwm, rtm)
-        vehicles.append({
-            "vehicle_id": int(r["vehicle_id"]) if r["vehicle_id"] is not None else 0,
-            "plate": r["plate"] or "",
-            "km": float(r["km"] or 0.0),
-            "minutes": _round15_minutes(rm),
-            "work_minutes": _round15_minutes(rwm),
-            "travel_minutes": _round15_minutes(rtm),
-            "hours": h,
-            "work_hours": wh,
-            "travel_hours": th,
-            "segments": int(r["segments"] or 0),
-        })
-
-    employees = []
-    for r in employees_rows:
-        rm = float(r["minutes"] or 0.0)
-        rwm = float(r["work_minutes"] or 0.0)
-        rtm = float(r["travel_minutes"] or 0.0)
-        h, wh, th = split_work_travel_hours(rwm, rtm)
-        employees.append({
-            "employee_id": int(r["employee_id"]),
-            "full_name": r["full_name"] or "",
-            "minutes": _round15_minutes(rm),
-            "work_minutes": _round15_minutes(rwm),
-            "travel_minutes": _round15_minutes(rtm),
-            "hours": h,
-            "work_hours": wh,
-            "travel_hours": th,
-            "segments": int(r["segments"] or 0),
-        })
+    def _bucket(**extra):
+        b = {"minutes": 0.0, "work_minutes": 0.0, "travel_minutes": 0.0, "segments": 0}
+        b.update(extra)
+        return b
+
+    def _add(b, work, travel, segments):
+        rwm = float(work or 0.0)
+        rtm = float(travel or 0.0)
+        b["minutes"] += rwm + rtm
+        b["work_minutes"] += rwm
+        b["travel_minutes"] += rtm
+        b["segments"] += int(segments or 0)
+
+    with span("range.query", date_from=date_from_s, date_to=date_to_s) as sp:
+        days_rows = db.execute(days_sql, params).mappings().all()
+        sites_rows = db.execute(sites_sql, params).mappings().all()
+        vehicles_rows = db.execute(vehicles_sql, params).mappings().all()
+        employees_rows = db.execute(employees_sql, params).mappings().all()
+        frozen = _frozen_records(db, date_from, date_to, vehicle_id=vehicle_id, employee_id=employee_id)
+        sp.set(rows=len(days_rows) + len(sites_rows) + len(vehicles_rows) + len(employees_rows), frozen=len(frozen))
+
+    with span("range.aggregate"):
+        days_acc = {}
+        for r in days_rows:
+            _add(days_acc.setdefault(_d(r["work_date"]), _bucket()), r["work_minutes"], r["travel_minutes"], r["segments"])
+
+        sites_acc = {}
+        for r in sites_rows:
+            sid = int(r["site_id"]) if r["site_id"] is not None else 0
+            _add(sites_acc.setdefault(sid, _bucket(name=r["name"] or "")), r["work_minutes"], r["travel_minutes"], r["segments"])
+
+        vehicles_acc = {}
+        for r in vehicles_rows:
+            vid = int(r["vehicle_id"]) if r["vehicle_id"] is not None else 0
+            b = vehicles_acc.setdefault(vid, _bucket(plate=r["plate"] or "", km=0.0))
+            b["km"] += float(r["km"] or 0.0)
+            _add(b, r["work_minutes"], r["travel_minutes"], r["segments"])
+
+        employees_acc = {}
+        for r in employees_rows:
+            _add(employees_acc.setdefault(int(r["employee_id"]), _bucket(full_name=r["full_name"] or "")), r["work_minutes"], r["travel_minutes"], r["segments"])
+
+        # zablokowane logi: sumy ze snapshotow (SQL powyzej je pomija)
+        for rec in frozen:
+            wr = rec["work_minutes_raw"]
+            tr = rec["travel_minutes_raw"]
+            n = rec["segments_count"]
+            _add(days_acc.setdefault(_d(rec["work_date"]), _bucket()), wr, tr, n)
+            for st in rec["sites"]:
+                _add(sites_acc.setdefault(int(st["site_id"]), _bucket(name=st.get("name") or "")), st["work_minutes_raw"], st["travel_minutes_raw"], st["segments"])
+            b = vehicles_acc.setdefault(int(rec["vehicle_id"] or 0), _bucket(plate=rec["vehicle_plate"] or "", km=0.0))
+            b["km"] += rec["km"]
+            _add(b, wr, tr, n)
+            for eid, name in rec["members"]:
+                _add(employees_acc.setdefault(int(eid), _bucket(full_name=name or "")), wr, tr, n)
+
+        def _out(b, **extra):
+            h, wh, th = split_work_travel_hours(b["work_minutes"], b["travel_minutes"])
+            out = dict(extra)
+            out.update({
+                "minutes": _round15_minutes(b["minutes"]),
+                "work_minutes": _round15_minutes(b["work_minutes"]),
+                "travel_minutes": _round15_minutes(b["travel_minutes"]),
+                "hours": h,
+                "work_hours": wh,
+                "travel_hours": th,
+                "segments": int(b["segments"]),
+            })
+            return out
+
+        raw_total_min = sum(b["minutes"] for b in days_acc.values())
+        raw_work_min = sum(b["work_minutes"] for b in days_acc.values())
+        raw_travel_min = sum(b["travel_minutes"] for b in days_acc.values())
+
+        total_minutes = _round15_minutes(raw_total_min)
+        work_minutes = _round15_minutes(raw_work_min)
+        travel_minutes = _round15_minutes(raw_travel_min)
+
+        total_hours, total_work_hours, total_travel_hours = split_work_travel_hours(raw_work_min, raw_travel_min)
+
+        days = [_out(b, work_date=d) for d, b in sorted(days_acc.items())]
+        sites = [
+            _out(b, site_id=sid, name=b["name"])
+            for sid, b in sorted(sites_acc.items(), key=lambda kv: (-kv[1]["minutes"], kv[0]))
+        ]
+        vehicles = [
+            _out(b, vehicle_id=vid, plate=b["plate"], km=float(b["km"]))
+            for vid, b in sorted(vehicles_acc.items(), key=lambda kv: (-kv[1]["km"], kv[0]))
+        ]
+        employees = [
+            _out(b, employee_id=eid, full_name=b["full_name"])
+            for eid, b in sorted(employees_acc.items(), key=lambda kv: (-kv[1]["minutes"], kv[0]))
+        ]
 
     return {
         "date_from": date_from_s,
@@ -995,6 +1113,13 @@ ORDER BY minutes DESC
 
 # -----------------------
 # Report: Day (per crew log)
+def _frozen_records(db, date_from, date_to, vehicle_id=None, employee_id=None):
+    """Rekordy zablokowanych logow: snapshoty z bazy + miesiace z zimnego archiwum."""
+    return (
+        load_locked_records(db, date_from, date_to, vehicle_id=vehicle_id, employee_id=employee_id)
+        + load_archived_records(db, date_from, date_to, vehicle_id=vehicle_id, employee_id=employee_id)
+    )
+
 # -----------------------
 
 @router.get("/reports/day", response_model=DayReportOut)
@@ -1002,98 +1127,26 @@ def report_day(
     date: date,
     db: Session = Depends(get_db),
 ):
-    logs = (
-        db.query(TkCrewLog)
-        .filter(TkCrewLog.work_date == date)
-        .all()
-    )
-
-    result = []
-
-    for log in logs:
-        segments = (
-            db.query(TkCrewWorkSegment)
-            .filter(TkCrewWorkSegment.crew_log_id == log.id)
-            .filter(TkCrewWorkSegment.end_at.isnot(None))
-            .all()
-        )
-
-        work_minutes = 0
-        travel_minutes = 0
-        km = 0.0
-
-        for seg in segments:
-            if not seg.start_at or not seg.end_at:
-                continue
-
-            minutes = int((seg.end_at - seg.start_at).total_seconds() // 60)
-            if minutes < 0:
-                minutes = 0
-
-            minutes_15 = ((minutes + 14) // 15) * 15
-
-            if str(getattr(seg, "segment_type", None) or "").lower() == "travel":
-                travel_minutes += minutes_15
-                km += float(seg.distance_km or 0.0)
-            else:
-                work_minutes += minutes_15
-
-        members = (
-            db.query(TkCrewLogMember)
-            .filter(TkCrewLogMember.crew_log_id == log.id)
+    with span("day.query", date=str(date)) as sp:
+        # zablokowane logi: gotowe sumy ze snapshotu (albo z archiwum), bez segmentow
+        frozen = [snapshot_record(snap) for snap in db.query(TkCrewLogSnapshot).filter(TkCrewLogSnapshot.work_date == date).all()]
+        frozen += load_archived_records(db, date, date)
+
+        logs = (
+            db.query(TkCrewLog)
+            .filter(TkCrewLog.work_date == date)
+            .filter(TkCrewLog.status != TkCrewLogStatus.locked)
+            .options(noload(TkCrewLog.members), noload(TkCrewLog.segments))
             .all()
         )
+        # jedna paczka zapytan dla wszystkich logow dnia (wczesniej 4-5 zapytan na log)
+        records = compute_crew_log_records(db, logs)
+        sp.set(crew_logs=len(logs), frozen=len(frozen))
 
-        employee_names = []
-        if members:
-            emps = (
-                db.query(TkEmployee)
-                .filter(TkEmployee.id.in_([m.employee_id for m in members]))
-                .all()
-            )
-            employee_names = [e.full_name for e in emps]
-
-        site_id = None
-        site_name = None
-        by_site_minutes = {}
-
-        for seg in segments:
-            sid = getattr(seg, "site_id", None)
-            if sid is None:
-                continue
-            minutes = int((seg.end_at - seg.start_at).total_seconds() // 60) if seg.start_at and seg.end_at else 0
-            if minutes < 0:
-                minutes = 0
-            minutes_15 = ((minutes + 14) // 15) * 15
-            by_site_minutes[int(sid)] = by_site_minutes.get(int(sid), 0) + int(minutes_15)
-
-        if by_site_minutes:
-            site_id = max(by_site_minutes.items(), key=lambda kv: kv[1])[0]
-            site = db.query(TkSite).filter(TkSite.id == site_id).first()
-            if site:
-                site_name = site.name
-
-        vehicle_plate = None
-        if log.vehicle_id:
-            veh = db.query(TkVehicle).filter(TkVehicle.id == log.vehicle_id).first()
-            if veh:
-                vehicle_plate = veh.plate
-
-        result.append({
-            "crew_log_id": log.id,
-            "work_date": log.work_date,
-            "site_id": site_id,
-            "site_name": site_name,
-            "vehicle_id": log.vehicle_id,
-            "vehicle_plate": vehicle_plate,
-            "employees": employee_names,
-            "work_minutes": work_minutes,
-            "work_hours": round(work_minutes / 60, 2),
-            "travel_minutes": travel_minutes,
-            "travel_hours": round(travel_minutes / 60, 2),
-            "km": round(km, 2),
-            "segments_count": len(segments),
-        })
+    with span("day.aggregate"):
+        result = [_day_row_from_record(rec) for rec in frozen]
+        result += [_day_row_from_record(records[log.id]) for log in logs]
+        result.sort(key=lambda r: r["crew_log_id"])
 
     return {
         "date": date,
@@ -1101,6 +1154,24 @@ def report_day(
     }
 
 
+def _day_row_from_record(rec: dict) -> dict:
+    return {
+        "crew_log_id": rec["crew_log_id"],
+        "work_date": rec["work_date"],
+        "site_id": rec["site_id"],
+        "site_name": rec["site_name"],
+        "vehicle_id": rec["vehicle_id"],
+        "vehicle_plate": rec["vehicle_plate"],
+        "employees": rec["employee_names"],
+        "work_minutes": rec["work_minutes"],
+        "work_hours": round(rec["work_minutes"] / 60, 2),
+        "travel_minutes": rec["travel_minutes"],
+        "travel_hours": round(rec["travel_minutes"] / 60, 2),
+        "km": round(rec["km"], 2),
+        "segments_count": rec["segments_count"],
+    }
+
+
 
 
 
@@ -1174,7 +1245,8 @@ def report_day_xlsx(
     from io import BytesIO
     from fastapi.responses import StreamingResponse
     bio = BytesIO()
-    wb.save(bio)
+    with span("xlsx.save"):
+        wb.save(bio)
     bio.seek(0)
 
     filename = f"day_report_{date}.xlsx"
@@ -1327,7 +1399,8 @@ def report_range_xlsx(
         ws_sum.column_dimensions[get_column_letter(col)].width = 18
 
     bio = BytesIO()
-    wb.save(bio)
+    with span("xlsx.save"):
+        wb.save(bio)
     bio.seek(0)
 
     filename = f"range_report_{date_from}_to_{date_to}.xlsx"
@@ -1358,6 +1431,10 @@ def report_employee(
 
     result_days = []
 
+    locked_by_day = defaultdict(list)
+    for rec in _frozen_records(db, date_from, date_to, employee_id=employee_id):
+        locked_by_day[rec["work_date"]].append(rec)
+
     cur = date_from
     total_work = 0
     total_travel = 0
@@ -1370,6 +1447,8 @@ def report_employee(
             .join(TkCrewLogMember, TkCrewLogMember.crew_log_id == TkCrewLog.id)
             .filter(TkCrewLogMember.employee_id == employee_id)
             .filter(TkCrewLog.work_date == cur)
+            .filter(TkCrewWorkSegment.work_date == cur)
+            .filter(TkCrewLog.status != TkCrewLogStatus.locked)
             .filter(TkCrewWorkSegment.end_at.isnot(None))
             .all()
         )
@@ -1378,6 +1457,11 @@ def report_employee(
         travel_min = 0
         km = 0.0
 
+        for rec in locked_by_day.get(cur, []):
+            work_min += rec["work_minutes"]
+            travel_min += rec["travel_minutes"]
+            km += rec["km"]
+
         for seg in segments:
             if not seg.start_at or not seg.end_at:
                 continue
@@ -1387,7 +1471,7 @@ def report_employee(
                 minutes = 0
             minutes_15 = ((minutes + 14) // 15) * 15
 
-            if str(getattr(seg, "segment_type", None) or "").lower() == "travel":
+            if _norm_seg_type(getattr(seg, "segment_type", None)) == "travel":
                 travel_min += minutes_15
                 km += float(seg.distance_km or 0.0)
             else:
@@ -1481,7 +1565,8 @@ def report_employee_xlsx(
         ws.column_dimensions[get_column_letter(col)].width = 18
 
     bio = BytesIO()
-    wb.save(bio)
+    with span("xlsx.save"):
+        wb.save(bio)
     bio.seek(0)
 
     filename = f"employee_{employee_id}_{date_from}_to_{date_to}.xlsx"
@@ -1562,7 +1647,8 @@ def report_day_pdf(date: date, db: Session = Depends(get_db)):
     ]))
 
     elems.append(tbl)
-    doc.build(elems, onFirstPage=_pdf_footer, onLaterPages=_pdf_footer)
+    with span("pdf.build"):
+        doc.build(elems, onFirstPage=_pdf_footer, onLaterPages=_pdf_footer)
 
     bio.seek(0)
     return StreamingResponse(
@@ -1670,7 +1756,8 @@ def report_range_pdf(date_from: date, date_to: date, rate_per_km: float = 0.0, d
 
     elems.append(v_tbl)
 
-    doc.build(elems, onFirstPage=_pdf_footer, onLaterPages=_pdf_footer)
+    with span("pdf.build"):
+        doc.build(elems, onFirstPage=_pdf_footer, onLaterPages=_pdf_footer)
     bio.seek(0)
 
     fn = f"range_{df}_to_{dt}.pdf".replace(":", "-")
@@ -1705,11 +1792,13 @@ def report_payroll_xlsx(date_from: date, date_to: date, db: Session = Depends(ge
     from io import BytesIO
     from fastapi.responses import StreamingResponse
 
-    rows = _fetch_payroll_rows_sql(db, date_from, date_to)
+    rows = _fetch_payroll_rows_sql(db, date_from, date_to) + _fetch_payroll_rows_snapshot(db, date_from, date_to)
+    rows.sort(key=lambda r: (r.work_date, r.employee_name or "", r.start_at is not None, r.start_at))
     wb = _build_payroll_workbook(rows)
 
     bio = BytesIO()
-    wb.save(bio)
+    with span("xlsx.save"):
+        wb.save(bio)
     bio.seek(0)
 
     filename = f"payroll_{date_from.isoformat()}_{date_to.isoformat()}.xlsx"
@@ -1736,16 +1825,76 @@ def _fetch_payroll_rows_sql(db: Session, date_from: date, date_to: date):
             TkVehicle.plate.label("vehicle_plate"),
             TkSite.name.label("site_name"),
         )
-        .join(TkCrewLog, TkCrewLog.id == TkCrewWorkSegment.crew_log_id)
+        .join(TkCrewLog, and_(TkCrewLog.id == TkCrewWorkSegment.crew_log_id, TkCrewLog.work_date == TkCrewWorkSegment.work_date))
         .join(TkCrewLogMember, TkCrewLogMember.crew_log_id == TkCrewLog.id)
         .join(TkEmployee, TkEmployee.id == TkCrewLogMember.employee_id)
         .outerjoin(TkVehicle, TkVehicle.id == TkCrewLog.vehicle_id)
         .outerjoin(TkSite, TkSite.id == TkCrewWorkSegment.site_id)
         .filter(and_(TkCrewLog.work_date >= date_from, TkCrewLog.work_date <= date_to))
+        .filter(and_(TkCrewWorkSegment.work_date >= date_from, TkCrewWorkSegment.work_date <= date_to))
+        .filter(TkCrewLog.status != TkCrewLogStatus.locked)
         .order_by(TkCrewLog.work_date.asc(), TkEmployee.full_name.asc(), TkCrewWorkSegment.start_at.asc())
     )
-    return q.all()
-
+    with span("payroll.query") as sp:
+        rows = q.all()
+        sp.set(rows=len(rows))
+    return rows
+
+@traced("payroll.query_frozen")
+def _fetch_payroll_rows_snapshot(db: Session, date_from: date, date_to: date):
+    from types import SimpleNamespace
+
+    rows = []
+    for rec in _frozen_records(db, date_from, date_to):
+        if rec.get("segments") is not None:
+            # te same wiersze co _fetch_payroll_rows_sql: minuty liczone z czasow segmentu
+            for employee_id, employee_name in rec["members"]:
+                for seg in rec["segments"]:
+                    rows.append(SimpleNamespace(
+                        segment_id=seg["segment_id"],
+                        crew_log_id=rec["crew_log_id"],
+                        start_at=datetime.fromisoformat(seg["start_at"]),
+                        end_at=datetime.fromisoformat(seg["end_at"]),
+                        segment_type=seg["segment_type"],
+                        distance_km=seg["distance_km"],
+                        site_id=seg["site_id"],
+                        work_date=rec["work_date"],
+                        vehicle_id=rec["vehicle_id"],
+                        employee_id=employee_id,
+                        employee_name=employee_name,
+                        vehicle_plate=rec["vehicle_plate"],
+                        site_name=seg["site_name"],
+                    ))
+            continue
+        # snapshot bez segmentow (sprzed d927c1f85fe0): jeden wiersz sumy na typ
+        parts = [
+            ("work", rec["work_minutes"], rec["work_minutes_raw"], 0.0),
+            ("travel", rec["travel_minutes"], rec["travel_minutes_raw"], rec["km"]),
+        ]
+        for employee_id, employee_name in rec["members"]:
+            for seg_type, minutes_rounded, minutes_raw, km in parts:
+                if not minutes_rounded and not km:
+                    continue
+                rows.append(SimpleNamespace(
+                    segment_id=None,
+                    crew_log_id=rec["crew_log_id"],
+                    start_at=None,
+                    end_at=None,
+                    segment_type=seg_type,
+                    distance_km=km,
+                    site_id=rec["site_id"],
+                    work_date=rec["work_date"],
+                    vehicle_id=rec["vehicle_id"],
+                    employee_id=employee_id,
+                    employee_name=employee_name,
+                    vehicle_plate=rec["vehicle_plate"],
+                    site_name=rec["site_name"],
+                    minutes_raw=max(0, int(minutes_raw)),
+                    minutes_rounded=minutes_rounded,
+                ))
+    return rows
+
+@traced("payroll.render")
 def _build_payroll_workbook(rows):
     from openpyxl import Workbook
 
@@ -1843,8 +1992,12 @@ def _build_payroll_workbook(rows):
 
         start_at = getattr(r, "start_at", None)
         end_at = getattr(r, "end_at", None)
+        frozen_minutes = getattr(r, "minutes_rounded", None)
 
-        if not start_at or not end_at:
+        if frozen_minutes is not None:
+            # zablokowany log: suma ze snapshotu, juz zaokraglona per segment
+            minutes_raw = int(getattr(r, "minutes_raw", 0) or 0)
+        elif not start_at or not end_at:
             add_warn("ERROR", "MISSING_TIME", r, seg_type, 0, "start_at and end_at are required for payroll")
             minutes_raw = 0
         else:
@@ -1852,7 +2005,7 @@ def _build_payroll_workbook(rows):
             if end_at < start_at:
                 add_warn("ERROR", "NEGATIVE_DURATION", r, seg_type, minutes_raw, "end_at < start_at (clamped to 0)")
 
-        minutes_rounded = _ceil_to_15(minutes_raw)
+        minutes_rounded = int(frozen_minutes) if frozen_minutes is not None else _ceil_to_15(minutes_raw)
         hours_rounded = minutes_rounded / 60.0
 
         distance_db = float(getattr(r, "distance_km", 0) or 0)
@@ -1936,10 +2089,7 @@ def _build_payroll_workbook(rows):
 
 
 def _norm_seg_type(v):
-    s = str(v or "").strip().lower()
-    if s in ("travel", "drive", "driving", "jazda", "dojazd"):
-        return "travel"
-    return "work"
+    return seg_type_name(v)
 
 def _safe_minutes(start_at, end_at):
     if not start_at or not end_at:
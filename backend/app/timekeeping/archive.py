@@ -0,0 +1,356 @@
+"""Zimne archiwum historii timekeeping (pliki Parquet + manifest w tk_archive_partitions).
+
+Miesiac, w ktorym wszystkie crew logi sa `locked` i ktory jest starszy niz
+TK_ARCHIVE_AFTER_MONTHS, trafia do jednego pliku Parquet (zstd), a jego wiersze
+(logi, czlonkowie, segmenty, snapshoty) znikaja z bazy. Raporty dostaja z archiwum
+te same rekordy co z load_locked_records(), wiec archiwizacja nie zmienia wynikow.
+
+pyarrow (zaleznosc w pyproject) jest importowany leniwie, jak openpyxl/reportlab w api.py -
+potrzebny tylko do archiwizacji i do raportow siegajacych w zarchiwizowane miesiace.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional
+
+from sqlalchemy import case, func, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.timekeeping.models import (
+    TkArchivePartition,
+    TkCrewLog,
+    TkCrewLogMember,
+    TkCrewLogSnapshot,
+    TkCrewLogSnapshotMember,
+    TkCrewLogStatus,
+    TkCrewWorkSegment,
+    TkEmployee,
+    TkSite,
+    TkVehicle,
+)
+from app.timekeeping.partitions import PARTITIONED_TABLES, add_months, month_partition_name
+from app.timekeeping.snapshots import compute_crew_log_totals, seg_type_name
+
+ARCHIVE_FORMAT = "parquet"
+
+# jeden wiersz na segment; log bez segmentow ma jeden wiersz z pustymi polami segmentu
+_COLUMNS = [
+    ("crew_log_id", "int64"),
+    ("work_date", "date32"),
+    ("vehicle_id", "int64"),
+    ("vehicle_plate", "string"),
+    ("created_by_employee_id", "int64"),
+    ("status", "string"),
+    ("notes", "string"),
+    ("member_ids", "list<int64>"),
+    ("member_names", "list<string>"),
+    ("segment_id", "int64"),
+    ("site_id", "int64"),
+    ("site_name", "string"),
+    ("segment_type", "string"),
+    ("start_at", "timestamp"),
+    ("end_at", "timestamp"),
+    ("start_lat", "float64"),
+    ("start_lng", "float64"),
+    ("end_lat", "float64"),
+    ("end_lng", "float64"),
+    ("distance_km", "float64"),
+]
+
+
+def _pa():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+def _schema(pa):
+    types = {
+        "int64": pa.int64(),
+        "date32": pa.date32(),
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "timestamp": pa.timestamp("us"),
+        "list<int64>": pa.list_(pa.int64()),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[t]) for name, t in _COLUMNS])
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def archive_dir() -> Path:
+    return Path(settings.TK_ARCHIVE_DIR)
+
+
+def archive_horizon(today: Optional[date] = None, after_months: Optional[int] = None) -> date:
+    """Pierwszy dzien miesiaca, od ktorego dane zostaja w bazie."""
+    today = today or date.today()
+    months = settings.TK_ARCHIVE_AFTER_MONTHS if after_months is None else after_months
+    return add_months(date(today.year, today.month, 1), -int(months))
+
+
+def archivable_months(db: Session, horizon: date) -> List[dict]:
+    """Miesiace sprzed `horizon` z danymi w bazie: [{"month", "crew_logs", "not_locked"}]."""
+    months = defaultdict(lambda: {"crew_logs": 0, "not_locked": 0})
+    rows = (
+        db.query(
+            TkCrewLog.work_date,
+            func.count(TkCrewLog.id),
+            func.sum(case((TkCrewLog.status != TkCrewLogStatus.locked, 1), else_=0)),
+        )
+        .filter(TkCrewLog.work_date < horizon)
+        .group_by(TkCrewLog.work_date)
+        .all()
+    )
+    for work_date, count, not_locked in rows:
+        m = months[date(work_date.year, work_date.month, 1)]
+        m["crew_logs"] += int(count or 0)
+        m["not_locked"] += int(not_locked or 0)
+    return [{"month": k, **v} for k, v in sorted(months.items())]
+
+
+def _month_rows(db: Session, logs: List[TkCrewLog]) -> List[dict]:
+    log_ids = [l.id for l in logs]
+
+    segs_by_log = defaultdict(list)
+    for seg in (
+        db.query(TkCrewWorkSegment)
+        .filter(TkCrewWorkSegment.crew_log_id.in_(log_ids))
+        .order_by(TkCrewWorkSegment.start_at.asc(), TkCrewWorkSegment.id.asc())
+        .all()
+    ):
+        segs_by_log[seg.crew_log_id].append(seg)
+
+    members_by_log = defaultdict(list)
+    for crew_log_id, employee_id, full_name in (
+        db.query(TkCrewLogMember.crew_log_id, TkCrewLogMember.employee_id, TkEmployee.full_name)
+        .join(TkEmployee, TkEmployee.id == TkCrewLogMember.employee_id)
+        .filter(TkCrewLogMember.crew_log_id.in_(log_ids))
+        .order_by(TkCrewLogMember.id.asc())
+        .all()
+    ):
+        members_by_log[crew_log_id].append((employee_id, full_name))
+
+    site_ids = {s.site_id for segs in segs_by_log.values() for s in segs if s.site_id is not None}
+    sites_by_id = dict(db.query(TkSite.id, TkSite.name).filter(TkSite.id.in_(site_ids)).all()) if site_ids else {}
+    vehicle_ids = {l.vehicle_id for l in logs if l.vehicle_id is not None}
+    plates = dict(db.query(TkVehicle.id, TkVehicle.plate).filter(TkVehicle.id.in_(vehicle_ids)).all()) if vehicle_ids else {}
+
+    rows = []
+    for l in logs:
+        members = members_by_log.get(l.id, [])
+        base = {
+            "crew_log_id": l.id,
+            "work_date": l.work_date,
+            "vehicle_id": l.vehicle_id,
+            "vehicle_plate": plates.get(l.vehicle_id),
+            "created_by_employee_id": l.created_by_employee_id,
+            "status": getattr(l.status, "value", l.status),
+            "notes": l.notes,
+            "member_ids": [int(eid) for eid, _ in members],
+            "member_names": [name for _, name in members],
+        }
+        segs = segs_by_log.get(l.id) or [None]
+        for seg in segs:
+            row = dict(base)
+            row.update({
+                "segment_id": seg.id if seg else None,
+                "site_id": seg.site_id if seg else None,
+                "site_name": sites_by_id.get(seg.site_id) if seg else None,
+                "segment_type": seg_type_name(seg.segment_type) if seg else None,
+                "start_at": _naive_utc(seg.start_at) if seg else None,
+                "end_at": _naive_utc(seg.end_at) if seg else None,
+                "start_lat": seg.start_lat if seg else None,
+                "start_lng": seg.start_lng if seg else None,
+                "end_lat": seg.end_lat if seg else None,
+                "end_lng": seg.end_lng if seg else None,
+                "distance_km": float(seg.distance_km or 0.0) if seg else None,
+            })
+            rows.append(row)
+    return rows
+
+
+def _write_parquet(rows: List[dict], path: Path) -> tuple[int, str]:
+    pa, pq = _pa()
+    schema = _schema(pa)
+    table = pa.Table.from_pylist(rows, schema=schema)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return path.stat().st_size, h.hexdigest()
+
+
+# logi usuwane paczkami: limit parametrow IN (...) w SQLite i krotsze DELETE na PG
+_DELETE_BATCH = 500
+
+
+def _delete_month(db: Session, log_ids: List[int]) -> None:
+    for i in range(0, len(log_ids), _DELETE_BATCH):
+        batch = log_ids[i:i + _DELETE_BATCH]
+        db.query(TkCrewLogSnapshotMember).filter(TkCrewLogSnapshotMember.crew_log_id.in_(batch)).delete(synchronize_session=False)
+        db.query(TkCrewLogSnapshot).filter(TkCrewLogSnapshot.crew_log_id.in_(batch)).delete(synchronize_session=False)
+        db.query(TkCrewWorkSegment).filter(TkCrewWorkSegment.crew_log_id.in_(batch)).delete(synchronize_session=False)
+        db.query(TkCrewLogMember).filter(TkCrewLogMember.crew_log_id.in_(batch)).delete(synchronize_session=False)
+        db.query(TkCrewLog).filter(TkCrewLog.id.in_(batch)).delete(synchronize_session=False)
+
+
+def _drop_month_partitions(db: Session, month: date) -> None:
+    # PG: pusta partycja miesiaca nie jest juz potrzebna (nowe wpisy z tego miesiaca blokuje create_crew_log)
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for parent in reversed(PARTITIONED_TABLES):
+        db.execute(text(f"DROP TABLE IF EXISTS {month_partition_name(parent, month)}"))
+
+
+def archive_month(db: Session, month: date, base_dir: Optional[Path] = None) -> Optional[TkArchivePartition]:
+    """Archiwizuje jeden miesiac (wszystkie logi musza byc locked). Commituje."""
+    month = date(month.year, month.month, 1)
+    if db.query(TkArchivePartition).filter(TkArchivePartition.month == month).first():
+        return None
+
+    logs = (
+        db.query(TkCrewLog)
+        .filter(TkCrewLog.work_date >= month)
+        .filter(TkCrewLog.work_date < add_months(month, 1))
+        .order_by(TkCrewLog.work_date.asc(), TkCrewLog.id.asc())
+        .all()
+    )
+    if not logs:
+        return None
+    not_locked = [l.id for l in logs if l.status != TkCrewLogStatus.locked]
+    if not_locked:
+        raise ValueError(f"Month {month:%Y-%m} has crew logs that are not locked: {not_locked[:20]}")
+
+    rows = _month_rows(db, logs)
+    path = (base_dir or archive_dir()) / "tk_crew" / f"{month:%Y-%m}.{ARCHIVE_FORMAT}"
+    size, digest = _write_parquet(rows, path)
+
+    try:
+        part = TkArchivePartition(
+            month=month,
+            path=str(path),
+            format=ARCHIVE_FORMAT,
+            crew_logs=len(logs),
+            rows=len(rows),
+            size_bytes=size,
+            sha256=digest,
+        )
+        db.add(part)
+        _delete_month(db, [l.id for l in logs])
+        _drop_month_partitions(db, month)
+        db.commit()
+    except Exception:
+        db.rollback()
+        path.unlink(missing_ok=True)
+        raise
+
+    with _archived_lock:
+        _archived_cache.pop(str(path), None)
+    db.refresh(part)
+    return part
+
+
+def is_month_archived(db: Session, d: date) -> bool:
+    month = date(d.year, d.month, 1)
+    return db.query(TkArchivePartition.id).filter(TkArchivePartition.month == month).first() is not None
+
+
+# LRU: path -> {crew_log_id: record}, najwyzej TK_ARCHIVE_CACHE_MONTHS miesiecy.
+# Pliki archiwum sie nie zmieniaja, wiec wpis nie wygasa - wypada tylko najdawniej czytany.
+_archived_cache: OrderedDict[str, dict] = OrderedDict()
+_archived_lock = threading.Lock()
+
+
+def _read_month_records(path: str) -> dict:
+    with _archived_lock:
+        cached = _archived_cache.get(path)
+        if cached is not None:
+            _archived_cache.move_to_end(path)
+            return cached
+
+    _, pq = _pa()
+    table = pq.read_table(path)
+
+    logs = {}
+    segs_by_log = defaultdict(list)
+    sites_by_id = {}
+    for row in table.to_pylist():
+        lid = row["crew_log_id"]
+        if lid not in logs:
+            logs[lid] = row
+        if row["segment_id"] is None:
+            continue
+        if row["site_id"] is not None:
+            sites_by_id[row["site_id"]] = row["site_name"]
+        segs_by_log[lid].append(SimpleNamespace(
+            id=row["segment_id"],
+            site_id=row["site_id"],
+            segment_type=row["segment_type"],
+            start_at=row["start_at"],
+            end_at=row["end_at"],
+            distance_km=row["distance_km"],
+        ))
+
+    out = {}
+    for lid, row in logs.items():
+        head = SimpleNamespace(id=lid, work_date=row["work_date"], vehicle_id=row["vehicle_id"])
+        members = list(zip(row["member_ids"] or [], row["member_names"] or []))
+        out[lid] = compute_crew_log_totals(head, segs_by_log.get(lid, []), members, sites_by_id, row["vehicle_plate"])
+
+    if settings.TK_ARCHIVE_CACHE_MONTHS > 0:
+        with _archived_lock:
+            _archived_cache[path] = out
+            _archived_cache.move_to_end(path)
+            while len(_archived_cache) > settings.TK_ARCHIVE_CACHE_MONTHS:
+                _archived_cache.popitem(last=False)
+    return out
+
+
+def load_archived_records(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    vehicle_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> List[dict]:
+    """Jak snapshots.load_locked_records, ale dla miesiecy z tk_archive_partitions."""
+    parts = (
+        db.query(TkArchivePartition)
+        .filter(TkArchivePartition.month >= date(date_from.year, date_from.month, 1))
+        .filter(TkArchivePartition.month <= date_to)
+        .order_by(TkArchivePartition.month.asc())
+        .all()
+    )
+    out = []
+    for part in parts:
+        for rec in _read_month_records(part.path).values():
+            if rec["work_date"] < date_from or rec["work_date"] > date_to:
+                continue
+            if vehicle_id is not None and rec["vehicle_id"] != vehicle_id:
+                continue
+            if employee_id is not None and all(eid != employee_id for eid, _ in rec["members"]):
+                continue
+            out.append(dict(rec))
+    out.sort(key=lambda r: (r["work_date"], r["crew_log_id"]))
+    return out
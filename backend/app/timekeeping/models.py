@@ -2,8 +2,9 @@
 from enum import Enum
 
 from sqlalchemy import (
-    Column, Integer, String, Boolean, Date, DateTime, Float, Text,
+    Column, Integer, String, Boolean, Date, DateTime, Float, Text, JSON,
     ForeignKey,
+    ForeignKeyConstraint,
     UniqueConstraint,
     Enum as SAEnum
 
@@ -80,13 +81,15 @@ class TkSite(Base):
 
 
 class TkCrewLog(Base):
+    # Na PostgreSQL partycjonowane miesiecznie po work_date, wiec PK to (id, work_date) jak w migracji
+    # 5b8d1e27c4fa; id dalej z sekwencji i unikalne. Zob. app/timekeeping/partitions.py.
     __tablename__ = "tk_crew_logs"
     __table_args__ = (
         UniqueConstraint("work_date", "vehicle_id", name="uq_tk_crew_logs_work_date_vehicle"),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
-    work_date = Column(Date, nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    work_date = Column(Date, primary_key=True, nullable=False, index=True)
     vehicle_id = Column(Integer, ForeignKey("tk_vehicles.id"), nullable=False, index=True)
     created_by_employee_id = Column(Integer, ForeignKey("tk_employees.id"), nullable=False, index=True)
     status = Column(SAEnum(TkCrewLogStatus, name="tk_crew_log_status"), nullable=False, default=TkCrewLogStatus.draft)
@@ -96,7 +99,13 @@ class TkCrewLog(Base):
 
     vehicle = relationship("TkVehicle", lazy="joined", foreign_keys=[vehicle_id])
     created_by = relationship("TkEmployee", lazy="joined", foreign_keys=[created_by_employee_id])
-    members = relationship("TkCrewLogMember", cascade="all, delete-orphan", lazy="selectin")
+    # czlonkowie nie maja FK do partycjonowanej tabeli (tylko crew_log_id), wiec warunek jawnie
+    members = relationship(
+        "TkCrewLogMember",
+        primaryjoin="TkCrewLog.id == foreign(TkCrewLogMember.crew_log_id)",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
     segments = relationship("TkCrewWorkSegment", cascade="all, delete-orphan", lazy="selectin")
 
 
@@ -107,7 +116,7 @@ class TkCrewLogMember(Base):
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    crew_log_id = Column(Integer, ForeignKey("tk_crew_logs.id"), nullable=False, index=True)
+    crew_log_id = Column(Integer, nullable=False, index=True)  # bez FK na PG (zob. migracja 5b8d1e27c4fa)
     employee_id = Column(Integer, ForeignKey("tk_employees.id"), nullable=False, index=True)
     override_start_at = Column(DateTime(timezone=True), nullable=True)
     override_end_at = Column(DateTime(timezone=True), nullable=True)
@@ -117,10 +126,19 @@ class TkCrewLogMember(Base):
 
 
 class TkCrewWorkSegment(Base):
+    # Partycjonowane jak tk_crew_logs; work_date to kopia TkCrewLog.work_date (klucz partycji),
+    # stad PK (id, work_date) i FK (crew_log_id, work_date) -> tk_crew_logs (id, work_date).
     __tablename__ = "tk_crew_work_segments"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["crew_log_id", "work_date"], ["tk_crew_logs.id", "tk_crew_logs.work_date"],
+            name="fk_tk_crew_work_segments_crew_log",
+        ),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    crew_log_id = Column(Integer, ForeignKey("tk_crew_logs.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    crew_log_id = Column(Integer, nullable=False, index=True)
+    work_date = Column(Date, primary_key=True, nullable=False, index=True)
     site_id = Column(Integer, ForeignKey("tk_sites.id"), nullable=False, index=True)
 
     segment_type = Column(SAEnum(TkSegmentType, name="tk_segment_type"), nullable=False, default=TkSegmentType.work)
@@ -133,6 +151,8 @@ class TkCrewWorkSegment(Base):
     end_lat = Column(Float, nullable=True)
     end_lng = Column(Float, nullable=True)
 
+    distance_km = Column(Float, nullable=True, default=0.0)
+
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc), nullable=True)
 
@@ -171,5 +191,65 @@ class TkDailyStatusOverride(Base):
     employee = relationship("TkEmployee", lazy="joined", foreign_keys=[employee_id])
 
 
+class TkCrewLogSnapshot(Base):
+    """Zamrozone sumy crew logu w chwili blokady (status locked).
+
+    Raporty i payroll czytaja zablokowane logi stad zamiast agregowac segmenty.
+    """
+    __tablename__ = "tk_crew_log_snapshots"
+
+    crew_log_id = Column(Integer, primary_key=True)  # bez FK na PG, jak tk_crew_log_members
+    work_date = Column(Date, nullable=False, index=True)
+    vehicle_id = Column(Integer, nullable=True, index=True)
+    vehicle_plate = Column(String(32), nullable=True)
+    site_id = Column(Integer, nullable=True)
+    site_name = Column(String(200), nullable=True)
+
+    # minuty zaokraglane per segment do 15 (jak report_day / payroll)
+    work_minutes = Column(Integer, nullable=False, default=0)
+    travel_minutes = Column(Integer, nullable=False, default=0)
+    # surowe minuty (jak _aggregate_range, zaokraglane dopiero na sumach)
+    work_minutes_raw = Column(Float, nullable=False, default=0.0)
+    travel_minutes_raw = Column(Float, nullable=False, default=0.0)
+    km = Column(Float, nullable=False, default=0.0)
+    segments_count = Column(Integer, nullable=False, default=0)
+
+    employee_names = Column(JSON, nullable=True)
+    sites = Column(JSON, nullable=True)
+    # zamkniete segmenty logu (snapshots.segment_row) - payroll wypisuje je jak dla zywych logow
+    segments = Column(JSON, nullable=True)
+
+    locked_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
 
+    members = relationship("TkCrewLogSnapshotMember", cascade="all, delete-orphan", lazy="selectin")
 
+
+class TkCrewLogSnapshotMember(Base):
+    __tablename__ = "tk_crew_log_snapshot_members"
+    __table_args__ = (
+        UniqueConstraint("crew_log_id", "employee_id", name="uq_tk_crew_log_snapshot_members_log_employee"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    crew_log_id = Column(Integer, ForeignKey("tk_crew_log_snapshots.crew_log_id"), nullable=False, index=True)
+    employee_id = Column(Integer, nullable=False, index=True)
+    employee_name = Column(String(200), nullable=True)
+    work_date = Column(Date, nullable=False, index=True)
+
+
+class TkArchivePartition(Base):
+    """Manifest zarchiwizowanych miesiecy (app/timekeeping/archive.py).
+
+    Logi, czlonkowie, segmenty i snapshoty z `month` sa usuniete z bazy i leza w pliku `path`.
+    """
+    __tablename__ = "tk_archive_partitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(Date, nullable=False, unique=True, index=True)  # pierwszy dzien miesiaca
+    path = Column(String(500), nullable=False)
+    format = Column(String(32), nullable=False, default="parquet")
+    crew_logs = Column(Integer, nullable=False, default=0)
+    rows = Column(Integer, nullable=False, default=0)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    sha256 = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
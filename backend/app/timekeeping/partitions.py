@@ -0,0 +1,164 @@
+"""Miesieczne partycje tk_crew_logs / tk_crew_work_segments (tylko PostgreSQL).
+
+Tabele sa partycjonowane po `work_date` (PARTITION BY RANGE) przez migracje
+5b8d1e27c4fa. Tutaj jest tylko dokladanie kolejnych miesiecy - wolane przy starcie
+aplikacji i z `python -m app.scripts.ensure_partitions` (np. z crona raz na dobe).
+Na SQLite wszystkie funkcje sa no-op.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("tk_crew_logs", "tk_crew_work_segments")
+MONTHS_AHEAD = 3
+
+
+def add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def month_partition_name(parent: str, month_start: date) -> str:
+    return f"{parent}_p{month_start.year:04d}_{month_start.month:02d}"
+
+
+def default_partition_name(parent: str) -> str:
+    return f"{parent}_default"
+
+
+def _is_partitioned(conn, table: str) -> bool:
+    row = conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :t AND c.relnamespace = current_schema()::regnamespace"
+        ),
+        {"t": table},
+    ).first()
+    return row is not None
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t)"), {"t": table}).scalar() is not None
+
+
+def create_default_partition(conn, parent: str) -> None:
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default_partition_name(parent)} PARTITION OF {parent} DEFAULT"))
+
+
+def create_month_partition(conn, parent: str, month_start: date) -> bool:
+    """Zaklada partycje na miesiac `month_start`. Zwraca True, jesli powstala nowa.
+
+    Wiersze z tego miesiaca nie moga lezec w DEFAULT (PG przerwie CREATE bledem) -
+    `ensure_month_partitions` najpierw je stamtad wyprowadza (`move_month_out_of_default`).
+    """
+    name = month_partition_name(parent, month_start)
+    if _table_exists(conn, name):
+        return False
+
+    lo = month_start.isoformat()
+    hi = add_months(month_start, 1).isoformat()
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {parent} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    return True
+
+
+def _has_default_rows(conn, parent: str, lo: str, hi: str) -> bool:
+    default_name = default_partition_name(parent)
+    if not _table_exists(conn, default_name):
+        return False
+    row = conn.execute(
+        text(f"SELECT 1 FROM {default_name} WHERE work_date >= :lo AND work_date < :hi LIMIT 1"),
+        {"lo": lo, "hi": hi},
+    ).first()
+    return row is not None
+
+
+def move_month_out_of_default(conn, parents, month_start: date) -> List[str]:
+    """Zaklada partycje miesiaca dla `parents`, przenoszac jego wiersze z DEFAULT.
+
+    Tak jest, gdy cron nie dolozyl partycji na czas i wpisy trafily do DEFAULT. Segmenty maja
+    FK (crew_log_id, work_date) na logi, wiec obie tabele przenosimy razem w jednej transakcji:
+    wiersze do tabel tymczasowych, DELETE z DEFAULT (segmenty przed logami), CREATE partycji,
+    INSERT z powrotem przez rodzica (logi przed segmentami). `parents` w kolejnosci rodzic -> dziecko.
+    Zwraca nazwy nowych partycji.
+    """
+    lo = month_start.isoformat()
+    hi = add_months(month_start, 1).isoformat()
+    params = {"lo": lo, "hi": hi}
+
+    moved = []
+    for parent in reversed(parents):
+        default_name = default_partition_name(parent)
+        if not _table_exists(conn, default_name):
+            continue
+        tmp = f"_move_{default_name}"
+        conn.execute(text(f"LOCK TABLE {default_name} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(
+            text(
+                f"CREATE TEMP TABLE {tmp} AS "
+                f"SELECT * FROM {default_name} WHERE work_date >= :lo AND work_date < :hi"
+            ),
+            params,
+        )
+        conn.execute(text(f"DELETE FROM {default_name} WHERE work_date >= :lo AND work_date < :hi"), params)
+        moved.append((parent, tmp))
+
+    created = []
+    for parent in parents:
+        if create_month_partition(conn, parent, month_start):
+            created.append(month_partition_name(parent, month_start))
+
+    for parent, tmp in reversed(moved):
+        n = conn.execute(text(f"INSERT INTO {parent} SELECT * FROM {tmp}")).rowcount
+        conn.execute(text(f"DROP TABLE {tmp}"))
+        log.warning("moved %s rows of %s for %s out of %s", n, parent, lo, default_partition_name(parent))
+    return created
+
+
+def ensure_month_partitions(
+    conn,
+    start: Optional[date] = None,
+    months_ahead: int = MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Doklada brakujace partycje od `start` (domyslnie biezacy miesiac) do biezacy + `months_ahead`.
+
+    `conn` to Connection (np. z `engine.begin()` albo `op.get_bind()`). Zwraca nazwy nowych partycji.
+    Wiersze, ktore w miedzyczasie trafily do DEFAULT, sa przenoszone do nowych partycji.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+
+    today = today or date.today()
+    first = date((start or today).year, (start or today).month, 1)
+    last = add_months(date(today.year, today.month, 1), months_ahead)
+
+    parents = [p for p in PARTITIONED_TABLES if _is_partitioned(conn, p)]
+    created = []
+    month = first
+    while month <= last:
+        lo, hi = month.isoformat(), add_months(month, 1).isoformat()
+        if any(_has_default_rows(conn, p, lo, hi) for p in parents):
+            created.extend(move_month_out_of_default(conn, parents, month))
+        else:
+            for parent in parents:
+                if create_month_partition(conn, parent, month):
+                    created.append(month_partition_name(parent, month))
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_month_partitions_for_engine(engine, months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    if engine.dialect.name != "postgresql":
+        return []
+    with engine.begin() as conn:
+        created = ensure_month_partitions(conn, months_ahead=months_ahead)
+    if created:
+        log.info("created partitions: %s", ", ".join(created))
+    return created
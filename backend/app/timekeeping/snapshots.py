@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.timekeeping.models import (
+    TkCrewLog,
+    TkCrewLogMember,
+    TkCrewLogSnapshot,
+    TkCrewLogSnapshotMember,
+    TkCrewWorkSegment,
+    TkEmployee,
+    TkSite,
+    TkVehicle,
+)
+
+
+def seg_type_name(v) -> str:
+    v = getattr(v, "value", v)
+    s = str(v or "").strip().lower()
+    if s in ("travel", "drive", "driving", "jazda", "dojazd"):
+        return "travel"
+    return "work"
+
+
+def _ceil15(minutes: int) -> int:
+    if minutes <= 0:
+        return 0
+    return ((minutes + 14) // 15) * 15
+
+
+def segment_row(seg, sites_by_id: dict) -> dict:
+    """Zamkniety segment w postaci do JSON (snapshot) - czasy jako ISO, strefa jak w zrodle."""
+    sid = getattr(seg, "site_id", None)
+    return {
+        "segment_id": getattr(seg, "id", None),
+        "segment_type": seg_type_name(getattr(seg, "segment_type", None)),
+        "start_at": seg.start_at.isoformat(),
+        "end_at": seg.end_at.isoformat(),
+        "site_id": sid,
+        "site_name": sites_by_id.get(int(sid)) if sid is not None else None,
+        "distance_km": float(getattr(seg, "distance_km", 0.0) or 0.0),
+    }
+
+
+def compute_crew_log_totals(log, segments: Iterable, members: Iterable, sites_by_id: dict, vehicle_plate: Optional[str]) -> dict:
+    """Liczy sumy jednego crew logu tak samo jak report_day (15 min per segment) i _aggregate_range (surowe minuty).
+
+    `segments` - zamkniete segmenty logu, `members` - pary (employee_id, full_name).
+    Funkcja nie dotyka bazy, zeby dalo sie jej uzyc takze dla danych z archiwum.
+    """
+    work_minutes = 0
+    travel_minutes = 0
+    work_raw = 0.0
+    travel_raw = 0.0
+    km = 0.0
+    count = 0
+    by_site = {}
+    # segmenty 1:1 (payroll po zablokowaniu/archiwizacji pokazuje te same wiersze co na zywo)
+    seg_rows = []
+
+    for seg in segments:
+        if not seg.start_at or not seg.end_at:
+            continue
+        count += 1
+        seg_rows.append(segment_row(seg, sites_by_id))
+        secs = (seg.end_at - seg.start_at).total_seconds()
+        raw = secs / 60.0
+        minutes_15 = _ceil15(max(0, int(secs // 60)))
+        is_travel = seg_type_name(getattr(seg, "segment_type", None)) == "travel"
+
+        if is_travel:
+            travel_minutes += minutes_15
+            travel_raw += raw
+            km += float(getattr(seg, "distance_km", 0.0) or 0.0)
+        else:
+            work_minutes += minutes_15
+            work_raw += raw
+
+        sid = getattr(seg, "site_id", None)
+        if sid is None:
+            continue
+        site = by_site.setdefault(int(sid), {
+            "site_id": int(sid),
+            "name": sites_by_id.get(int(sid)) or "",
+            "minutes_15": 0,
+            "work_minutes_raw": 0.0,
+            "travel_minutes_raw": 0.0,
+            "segments": 0,
+        })
+        site["minutes_15"] += minutes_15
+        site["segments"] += 1
+        if is_travel:
+            site["travel_minutes_raw"] += raw
+        else:
+            site["work_minutes_raw"] += raw
+
+    site_id = None
+    site_name = None
+    if by_site:
+        top = max(by_site.values(), key=lambda s: s["minutes_15"])
+        site_id = top["site_id"]
+        site_name = sites_by_id.get(site_id)
+
+    members = [(int(eid), name) for eid, name in members]
+
+    return {
+        "crew_log_id": int(log.id),
+        "work_date": log.work_date,
+        "vehicle_id": log.vehicle_id,
+        "vehicle_plate": vehicle_plate,
+        "site_id": site_id,
+        "site_name": site_name,
+        "work_minutes": work_minutes,
+        "travel_minutes": travel_minutes,
+        "work_minutes_raw": work_raw,
+        "travel_minutes_raw": travel_raw,
+        "km": km,
+        "segments_count": count,
+        "employee_names": [name for _, name in members],
+        "members": members,
+        "sites": list(by_site.values()),
+        "segments": seg_rows,
+    }
+
+
+def compute_crew_log_records(db: Session, logs: List[TkCrewLog]) -> dict:
+    """compute_crew_log_totals dla wielu logow naraz: {crew_log_id: rekord}.
+
+    Stala liczba zapytan niezaleznie od liczby logow (segmenty, czlonkowie, budowy, pojazdy).
+    """
+    if not logs:
+        return {}
+
+    log_ids = [log.id for log in logs]
+
+    segs_by_log = defaultdict(list)
+    for seg in (
+        db.query(TkCrewWorkSegment)
+        .filter(TkCrewWorkSegment.crew_log_id.in_(log_ids))
+        .filter(TkCrewWorkSegment.end_at.isnot(None))
+        .order_by(TkCrewWorkSegment.start_at.asc())
+        .all()
+    ):
+        segs_by_log[seg.crew_log_id].append(seg)
+
+    members_by_log = defaultdict(list)
+    for crew_log_id, employee_id, full_name in (
+        db.query(TkCrewLogMember.crew_log_id, TkCrewLogMember.employee_id, TkEmployee.full_name)
+        .join(TkEmployee, TkEmployee.id == TkCrewLogMember.employee_id)
+        .filter(TkCrewLogMember.crew_log_id.in_(log_ids))
+        .order_by(TkCrewLogMember.id.asc())
+        .all()
+    ):
+        members_by_log[crew_log_id].append((employee_id, full_name))
+
+    site_ids = {s.site_id for segs in segs_by_log.values() for s in segs if s.site_id is not None}
+    sites_by_id = {}
+    if site_ids:
+        sites_by_id = dict(db.query(TkSite.id, TkSite.name).filter(TkSite.id.in_(site_ids)).all())
+
+    vehicle_ids = {log.vehicle_id for log in logs if log.vehicle_id is not None}
+    plates = {}
+    if vehicle_ids:
+        plates = dict(db.query(TkVehicle.id, TkVehicle.plate).filter(TkVehicle.id.in_(vehicle_ids)).all())
+
+    return {
+        log.id: compute_crew_log_totals(log, segs_by_log.get(log.id, []), members_by_log.get(log.id, []), sites_by_id, plates.get(log.vehicle_id))
+        for log in logs
+    }
+
+
+def snapshot_crew_logs(db: Session, logs: List[TkCrewLog]) -> int:
+    """Buduje snapshoty dla podanych logow (batch przez compute_crew_log_records).
+
+    Nie robi commita - wywolujacy zmienia status i commituje w tej samej transakcji.
+    """
+    if not logs:
+        return 0
+
+    log_ids = [log.id for log in logs]
+    records = compute_crew_log_records(db, logs)
+
+    db.query(TkCrewLogSnapshotMember).filter(TkCrewLogSnapshotMember.crew_log_id.in_(log_ids)).delete(synchronize_session=False)
+    db.query(TkCrewLogSnapshot).filter(TkCrewLogSnapshot.crew_log_id.in_(log_ids)).delete(synchronize_session=False)
+
+    for log in logs:
+        rec = records[log.id]
+        db.add(TkCrewLogSnapshot(
+            crew_log_id=rec["crew_log_id"],
+            work_date=rec["work_date"],
+            vehicle_id=rec["vehicle_id"],
+            vehicle_plate=rec["vehicle_plate"],
+            site_id=rec["site_id"],
+            site_name=rec["site_name"],
+            work_minutes=rec["work_minutes"],
+            travel_minutes=rec["travel_minutes"],
+            work_minutes_raw=rec["work_minutes_raw"],
+            travel_minutes_raw=rec["travel_minutes_raw"],
+            km=rec["km"],
+            segments_count=rec["segments_count"],
+            employee_names=rec["employee_names"],
+            sites=rec["sites"],
+            segments=rec["segments"],
+            members=[
+                TkCrewLogSnapshotMember(employee_id=eid, employee_name=name, work_date=rec["work_date"])
+                for eid, name in rec["members"]
+            ],
+        ))
+
+    return len(logs)
+
+
+def drop_snapshots(db: Session, log_ids: List[int]) -> None:
+    if not log_ids:
+        return
+    db.query(TkCrewLogSnapshotMember).filter(TkCrewLogSnapshotMember.crew_log_id.in_(log_ids)).delete(synchronize_session=False)
+    db.query(TkCrewLogSnapshot).filter(TkCrewLogSnapshot.crew_log_id.in_(log_ids)).delete(synchronize_session=False)
+
+
+def snapshot_record(snap: TkCrewLogSnapshot) -> dict:
+    return {
+        "crew_log_id": snap.crew_log_id,
+        "work_date": snap.work_date,
+        "vehicle_id": snap.vehicle_id,
+        "vehicle_plate": snap.vehicle_plate,
+        "site_id": snap.site_id,
+        "site_name": snap.site_name,
+        "work_minutes": int(snap.work_minutes or 0),
+        "travel_minutes": int(snap.travel_minutes or 0),
+        "work_minutes_raw": float(snap.work_minutes_raw or 0.0),
+        "travel_minutes_raw": float(snap.travel_minutes_raw or 0.0),
+        "km": float(snap.km or 0.0),
+        "segments_count": int(snap.segments_count or 0),
+        "employee_names": list(snap.employee_names or []),
+        "members": [(m.employee_id, m.employee_name) for m in snap.members],
+        "sites": list(snap.sites or []),
+        # None: snapshot sprzed kolumny segments (payroll pokazuje wtedy sumy zamiast segmentow)
+        "segments": list(snap.segments) if snap.segments is not None else None,
+    }
+
+
+def load_locked_records(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    vehicle_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> List[dict]:
+    q = (
+        db.query(TkCrewLogSnapshot)
+        .filter(TkCrewLogSnapshot.work_date >= date_from)
+        .filter(TkCrewLogSnapshot.work_date <= date_to)
+    )
+    if vehicle_id is not None:
+        q = q.filter(TkCrewLogSnapshot.vehicle_id == vehicle_id)
+    if employee_id is not None:
+        q = q.filter(
+            TkCrewLogSnapshot.crew_log_id.in_(
+                db.query(TkCrewLogSnapshotMember.crew_log_id)
+                .filter(TkCrewLogSnapshotMember.employee_id == employee_id)
+                .filter(TkCrewLogSnapshotMember.work_date >= date_from)
+                .filter(TkCrewLogSnapshotMember.work_date <= date_to)
+            )
+        )
+    return [snapshot_record(s) for s in q.order_by(TkCrewLogSnapshot.work_date.asc(), TkCrewLogSnapshot.crew_log_id.asc()).all()]
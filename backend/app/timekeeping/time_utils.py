@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import math
+
+
+def ceil_minutes_to_quarters(minutes) -> int:
+    try:
+        m = float(minutes or 0.0)
+    except Exception:
+        return 0
+    if m <= 0:
+        return 0
+    # julianday() daje ulamki minut (np. 59.99999) - ucinamy szum przed zaokragleniem w gore
+    return int(math.ceil(round(m, 6) / 15.0))
+
+
+def split_work_travel_hours(work_minutes, travel_minutes) -> tuple[float, float, float]:
+    work_h = ceil_minutes_to_quarters(work_minutes) * 15 / 60.0
+    travel_h = ceil_minutes_to_quarters(travel_minutes) * 15 / 60.0
+    return round(work_h + travel_h, 2), round(work_h, 2), round(travel_h, 2)
@@ -0,0 +1,253 @@
+"""Lekkie spany etapow (query / aggregate / validate / render / stream) bez zewnetrznego kolektora.
+
+    with span("range.query", date_from=str(date_from)) as sp:
+        rows = db.execute(...).all()
+        sp.set(rows=len(rows))
+
+TRACE_EXPORT=stdout|file wlacza eksport (domyslnie wylaczony - span() jest wtedy no-opem).
+Jedna linia JSON na span: trace_id, span_id, parent_id, name, start, duration_ms, attrs, error.
+Spany w ramach requestu (TracingMiddleware) sa buforowane i zapisywane razem po zakonczeniu
+requestu, tylko gdy trwal >= TRACE_MIN_MS. Spany poza requestem (skrypty) ida od razu.
+
+Rodzic spanu to ContextVar - przechodzi do threadpoola (run_in_threadpool kopiuje kontekst).
+Odpowiedz dostaje X-Trace-Id oraz Server-Timing ze spanami zakonczonymi przed wyslaniem naglowkow
+(handler, validate, etapy raportu) - widac je w DevTools bez siegania do TRACE_FILE.
+Podsumowanie etapow per trasa: python -m app.scripts.trace_summary traces.jsonl
+"""
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+
+from app.config import settings
+from app.profiling import ProfilingRoute
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+_write_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return settings.TRACE_EXPORT in ("stdout", "file")
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "error", "t0", "wall", "duration_ms", "root", "buffer", "handler_end")
+
+    def __init__(self, name: str, parent: "Span | None", attrs: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.error = None
+        self.t0 = time.perf_counter()
+        self.wall = datetime.now(timezone.utc)
+        self.duration_ms = None
+        self.root = parent.root if parent else self
+        self.buffer = None
+        self.handler_end = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self, end: float | None = None) -> None:
+        self.duration_ms = ((end if end is not None else time.perf_counter()) - self.t0) * 1000.0
+        if self.root.buffer is not None:
+            # span requestu: zapis razem z korzeniem (albo wcale, gdy request byl szybki)
+            self.root.buffer.append(self.to_dict())
+            if self is self.root:
+                if self.duration_ms >= settings.TRACE_MIN_MS:
+                    _export(self.root.buffer)
+                self.root.buffer = None
+        else:
+            _export([self.to_dict()])
+
+    def finish_from(self, start: float) -> None:
+        """Span z przeszlym poczatkiem (validate zaczyna sie w chwili zakonczenia handlera)."""
+        self.wall = datetime.fromtimestamp(time.time() - (time.perf_counter() - start), timezone.utc)
+        self.t0 = start
+        self.finish()
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.wall.isoformat(),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _export(records: list[dict]) -> None:
+    lines = "".join(json.dumps(r, default=str, ensure_ascii=False) + "\n" for r in records)
+    with _write_lock:
+        if settings.TRACE_EXPORT == "stdout":
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+        else:
+            with open(settings.TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    if not enabled():
+        yield _NOOP
+        return
+    sp = Span(name, _current.get(), attrs)
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        _current.reset(token)
+        sp.finish()
+
+
+def traced(name: str):
+    """Dekorator: cala funkcja jako jeden span."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def _server_timing(records: list[dict]) -> str:
+    return ", ".join(f"{r['name']};dur={r['duration_ms']:.1f}" for r in records)
+
+
+class TracingMiddleware:
+    """Korzen trace per request + span "stream" (wysylanie body, np. StreamingResponse eksportu)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        root = Span(f"{scope.get('method')} {scope.get('path')}", None, {})
+        root.buffer = []
+        token = _current.set(root)
+        state = {"stream": None}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                root.set(status=message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", root.trace_id.encode("ascii")))
+                if root.buffer:
+                    headers.append((b"server-timing", _server_timing(root.buffer).encode("utf-8")))
+                message = {**message, "headers": headers}
+                state["stream"] = Span("stream", root, {})
+            elif message["type"] == "http.response.body":
+                sp = state["stream"]
+                if sp is not None:
+                    sp.attrs["bytes"] = sp.attrs.get("bytes", 0) + len(message.get("body") or b"")
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body") and state["stream"] is not None:
+                state["stream"].finish()
+                state["stream"] = None
+
+        try:
+            await self.app(scope, receive, _send)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"[:500]
+            raise
+        finally:
+            if state["stream"] is not None:
+                state["stream"].finish()
+            route = scope.get("route")
+            if route is not None:
+                root.set(route=getattr(route, "path", None))
+            _current.reset(token)
+            root.finish()
+
+
+class TracedRoute(ProfilingRoute):
+    """Route ze spanami "handler" (funkcja endpointu) i "validate" (response_model + serializacja).
+
+    FastAPI waliduje odpowiedz po powrocie z endpointu, poza nasza funkcja - "validate" to czas
+    od konca handlera do gotowej odpowiedzi.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            if not enabled():
+                return await handler(request)
+            with span("route") as sp:
+                response = await handler(request)
+                if sp.handler_end is not None:
+                    Span("validate", sp, {}).finish_from(sp.handler_end)
+                return response
+
+        return traced_handler
+
+
+def _wrap_endpoint(endpoint):
+    # include_router tworzy trasy ponownie z route.endpoint - nie owijamy drugi raz
+    if getattr(endpoint, "__traced__", False):
+        return endpoint
+
+    def _mark_end():
+        # rodzicem handlera jest span "route" - zapisujemy mu koniec handlera
+        parent = _current.get()
+        if parent is not None and parent.name == "route":
+            parent.handler_end = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            if not enabled():
+                return await endpoint(*args, **kwargs)
+            with span("handler"):
+                result = await endpoint(*args, **kwargs)
+            _mark_end()
+            return result
+        async_wrapper.__traced__ = True
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        if not enabled():
+            return endpoint(*args, **kwargs)
+        with span("handler"):
+            result = endpoint(*args, **kwargs)
+        _mark_end()
+        return result
+    wrapper.__traced__ = True
+    return wrapper
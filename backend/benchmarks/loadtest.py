@@ -0,0 +1,234 @@
+"""Load test: poranek ekip w terenie + biuro klikajace raporty, na zywym serwerze (httpx async).
+
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --fleets 10,25,50,100 --office-users 5
+
+Kazdy etap (rozmiar floty z --fleets) zaklada swoje pojazdy/pracownikow/budowe, a potem
+N pojazdow rownolegle robi: create_crew_log -> add_member x ekipa -> (segments/start ->
+segments/stop) x --segments, ze startami rozlozonymi na --ramp sekund. W tym czasie
+--office-users uzytkownikow biura odpytuje raporty i eksporty z czestotliwoscia --office-rate.
+
+Per trasa: p50/p95/p99 i odsetek bledow (status >= 400 albo wyjatek/timeout). Etap, ktory
+przekroczy --max-error-rate albo --max-p95-ms, jest punktem zalamania - kolejne sie nie uruchamiaja.
+Zapisuje dane do bazy serwera, wiec uruchamiac na bazie testowej/stagingowej.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import httpx
+
+_OFFICE_ROUTES = [
+    ("GET /reports/day", "/reports/day", lambda d: {"date": d}),
+    ("GET /reports/range", "/reports/range", lambda d: {"date_from": d.replace(day=1), "date_to": d}),
+    ("GET /reports/employee", "/reports/employee", None),
+    ("GET /reports/range.xlsx", "/reports/range.xlsx", lambda d: {"date_from": d.replace(day=1), "date_to": d}),
+    ("GET /reports/payroll.xlsx", "/reports/payroll.xlsx", lambda d: {"date_from": d.replace(day=1), "date_to": d}),
+]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.samples = defaultdict(list)
+
+    async def call(self, route: str, coro):
+        t0 = time.perf_counter()
+        try:
+            r = await coro
+        except Exception as e:
+            self._record(route, t0, f"{type(e).__name__}")
+            return None
+        self._record(route, t0, None if r.status_code < 400 else str(r.status_code))
+        return r
+
+    def _record(self, route, t0, error):
+        self.latencies[route].append((time.perf_counter() - t0) * 1000.0)
+        if error:
+            self.errors[route] += 1
+            if len(self.samples[route]) < 3:
+                self.samples[route].append(error)
+
+    def summary(self) -> dict:
+        out = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            n = len(values)
+            out[route] = {
+                "count": n,
+                "error_rate": round(self.errors[route] / n, 4) if n else 0.0,
+                "p50_ms": round(_pct(values, 50), 1),
+                "p95_ms": round(_pct(values, 95), 1),
+                "p99_ms": round(_pct(values, 99), 1),
+                "max_ms": round(values[-1], 1),
+                "error_samples": self.samples.get(route, []),
+            }
+        return out
+
+
+def _pct(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+async def _setup(client, run_tag, n_vehicles, crew_size):
+    """Pojazdy, pracownicy i jedna budowa dla etapu (poza statystykami)."""
+    async def post(path, payload):
+        r = await client.post(path, json=payload)
+        r.raise_for_status()
+        return r.json()["id"]
+
+    site_id = await post("/sites/ad-hoc", {"name": f"LT {run_tag} site", "lat": 50.26, "lng": 19.02, "radius_m": 200})
+    vehicles = []
+    for i in range(n_vehicles):
+        vid = await post("/vehicles", {"plate": f"LT-{run_tag}-{i:04d}", "make_model": "loadtest"})
+        crew = [await post("/employees", {"full_name": f"LT {run_tag} {i:04d}-{k}"}) for k in range(crew_size)]
+        vehicles.append((vid, crew))
+    return site_id, vehicles
+
+
+async def _vehicle_morning(client, stats, work_date, site_id, vehicle_id, crew, segments, think_s, start_delay):
+    await asyncio.sleep(start_delay)
+    r = await stats.call("POST /crew-logs", client.post("/crew-logs", json={
+        "work_date": work_date.isoformat(), "vehicle_id": vehicle_id, "created_by_employee_id": crew[0],
+    }))
+    if r is None or r.status_code >= 400:
+        return
+    log_id = r.json()["id"]
+    for emp_id in crew:
+        await stats.call("POST /crew-logs/{id}/members", client.post(f"/crew-logs/{log_id}/members", json={"employee_id": emp_id}))
+    for _ in range(segments):
+        await stats.call("POST /crew-logs/{id}/segments/start", client.post(f"/crew-logs/{log_id}/segments/start", json={"site_id": site_id}))
+        await asyncio.sleep(think_s * random.uniform(0.5, 1.5))
+        await stats.call("PATCH /crew-logs/{id}/segments/stop", client.patch(f"/crew-logs/{log_id}/segments/stop"))
+
+
+async def _office_user(client, stats, work_date, employee_ids, rate, stop: asyncio.Event):
+    interval = 1.0 / rate if rate > 0 else 1.0
+    while not stop.is_set():
+        route, path, params = random.choice(_OFFICE_ROUTES)
+        if params is None:
+            q = {"employee_id": random.choice(employee_ids), "date_from": work_date.replace(day=1), "date_to": work_date}
+        else:
+            q = params(work_date)
+        q = {k: (v.isoformat() if isinstance(v, date) else v) for k, v in q.items()}
+        await stats.call(route, client.get(path, params=q))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval * random.uniform(0.5, 1.5))
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_stage(args, n_vehicles: int, run_tag: str) -> dict:
+    base = f"{args.base_url.rstrip('/')}{args.api_prefix}/timekeeping"
+    limits = httpx.Limits(max_connections=n_vehicles + args.office_users + 10, max_keepalive_connections=n_vehicles + args.office_users)
+    async with httpx.AsyncClient(base_url=base, timeout=args.timeout, limits=limits) as client:
+        site_id, vehicles = await _setup(client, f"{run_tag}-{n_vehicles}", n_vehicles, args.crew_size)
+        work_date = date.fromisoformat(args.work_date) if args.work_date else date.today()
+        employee_ids = [e for _, crew in vehicles for e in crew]
+
+        stats = Stats()
+        stop = asyncio.Event()
+        office = [
+            asyncio.create_task(_office_user(client, stats, work_date, employee_ids, args.office_rate, stop))
+            for _ in range(args.office_users)
+        ]
+        t0 = time.perf_counter()
+        await asyncio.gather(*[
+            _vehicle_morning(client, stats, work_date, site_id, vid, crew, args.segments, args.think, random.uniform(0, args.ramp))
+            for vid, crew in vehicles
+        ])
+        stop.set()
+        await asyncio.gather(*office)
+        elapsed = time.perf_counter() - t0
+
+    routes = stats.summary()
+    total = sum(r["count"] for r in routes.values())
+    errors = sum(round(r["error_rate"] * r["count"]) for r in routes.values())
+    return {
+        "vehicles": n_vehicles,
+        "seconds": round(elapsed, 1),
+        "requests": total,
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "routes": routes,
+    }
+
+
+def _print_stage(stage):
+    print(f"\n=== {stage['vehicles']} vehicles: {stage['requests']} req in {stage['seconds']}s "
+          f"({stage['rps']} req/s), errors {stage['error_rate'] * 100:.2f}% ===")
+    print(f"{'route':40s} {'count':>6s} {'err%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    for route, r in stage["routes"].items():
+        print(f"{route:40s} {r['count']:>6d} {r['error_rate'] * 100:>6.2f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+def _breaks(stage, args) -> list[str]:
+    reasons = []
+    if stage["error_rate"] > args.max_error_rate:
+        reasons.append(f"error rate {stage['error_rate'] * 100:.2f}% > {args.max_error_rate * 100:.2f}%")
+    for route, r in stage["routes"].items():
+        if r["p95_ms"] > args.max_p95_ms:
+            reasons.append(f"{route} p95 {r['p95_ms']}ms > {args.max_p95_ms}ms")
+    return reasons
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Async load test: field crews + office reports")
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--api-prefix", default="/api/v1")
+    ap.add_argument("--fleets", default="10,25,50,100", help="rozmiary floty kolejnych etapow")
+    ap.add_argument("--crew-size", type=int, default=3)
+    ap.add_argument("--segments", type=int, default=3, help="par start/stop na pojazd")
+    ap.add_argument("--think", type=float, default=0.5, help="sredni czas miedzy start a stop [s]")
+    ap.add_argument("--ramp", type=float, default=5.0, help="rozlozenie startow pojazdow [s]")
+    ap.add_argument("--office-users", type=int, default=5)
+    ap.add_argument("--office-rate", type=float, default=1.0, help="zapytan/s na uzytkownika biura")
+    ap.add_argument("--work-date", default=None, help="YYYY-MM-DD, domyslnie dzis")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--max-p95-ms", type=float, default=2000.0)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", default="loadtest.json")
+    args = ap.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    fleets = [int(x) for x in args.fleets.split(",") if x.strip()]
+    # losowy sufiks: dwa uruchomienia w tej samej sekundzie (albo o tej samej godzinie innego dnia)
+    # nie zderzaja sie na unikalnych tablicach rejestracyjnych
+    run_tag = f"{datetime.now(timezone.utc):%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+    stages = []
+    breakdown = None
+    for n in fleets:
+        stage = asyncio.run(run_stage(args, n, run_tag))
+        stages.append(stage)
+        _print_stage(stage)
+        reasons = _breaks(stage, args)
+        if reasons:
+            breakdown = {"vehicles": n, "reasons": reasons}
+            print(f"\nBREAKDOWN at {n} vehicles: " + "; ".join(reasons))
+            break
+
+    Path(args.out).write_text(json.dumps({
+        "meta": {"created_at": datetime.now(timezone.utc).isoformat(), "base_url": args.base_url, "args": vars(args)},
+        "stages": stages,
+        "breakdown": breakdown,
+    }, indent=2, default=str), encoding="utf-8")
+    print(f"\nsaved {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Benchmark raportow i eksportow timekeeping - in-process (httpx ASGITransport), bez serwera na :8000.
+
+    python -m benchmarks.reports --sizes small,medium --repeat 5 --out bench_reports.json
+    python -m benchmarks.reports --sizes small --baseline bench_reports.json --fail-on-regress
+
+Dla kazdego rozmiaru: osobna baza SQLite w --data-dir (alembic upgrade head + seed_bench,
+przy kolejnym uruchomieniu uzywana ponownie), SessionLocal przepiety na jej engine.
+Na endpoint: czas (min/median/p95/max z --repeat wywolan) oraz liczba zapytan SQL i szczyt
+pamieci (tracemalloc) z pierwszego wywolania. Wynik idzie do JSON; --baseline porownuje mediane i liczbe zapytan.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine, event, select
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# argumenty dla app.seeds.seed_bench
+DATASETS = {
+    "small": ["--vehicles", "10", "--employees", "30", "--sites", "80", "--years", "1", "--quotes", "500"],
+    "medium": ["--vehicles", "50", "--employees", "150", "--sites", "300", "--years", "2", "--quotes", "5000"],
+    "large": ["--vehicles", "200", "--employees", "600", "--sites", "800", "--years", "5", "--quotes", "20000"],
+}
+DATASET_END = date(2026, 1, 31)
+
+
+def _endpoints(end: date, employee_id: int) -> list[tuple[str, str, dict]]:
+    """(nazwa, sciezka, parametry) - zakresy liczone od konca danych, zeby wyniki byly porownywalne."""
+    day = end
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    month_end = date(end.year, end.month, 1) - timedelta(days=1)
+    month_start = date(month_end.year, month_end.month, 1)
+    week_start = day - timedelta(days=day.weekday())
+    d30 = end - timedelta(days=29)
+    return [
+        ("daily", "/reports/daily", {"work_date": day}),
+        ("range_30d", "/reports/range", {"date_from": d30, "date_to": end}),
+        ("range_365d", "/reports/range", {"date_from": end - timedelta(days=364), "date_to": end}),
+        ("weekly", "/reports/weekly", {"week_start": week_start}),
+        ("monthly", "/reports/monthly", {"year": month_start.year, "month": month_start.month}),
+        ("day", "/reports/day", {"date": day}),
+        ("employee_90d", "/reports/employee", {"employee_id": employee_id, "date_from": end - timedelta(days=89), "date_to": end}),
+        ("day_xlsx", "/reports/day.xlsx", {"date": day}),
+        ("range_xlsx", "/reports/range.xlsx", {"date_from": d30, "date_to": end}),
+        ("range_pdf", "/reports/range.pdf", {"date_from": d30, "date_to": end}),
+        ("payroll_xlsx", "/reports/payroll.xlsx", {"date_from": month_start, "date_to": month_end}),
+    ]
+
+
+def _prepare_db(size: str, data_dir: Path, reseed: bool) -> str:
+    from alembic import command
+    from alembic.config import Config
+
+    from app.seeds.seed_bench import parse_args, seed_bench
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    db_path = data_dir / f"bench_{size}.db"
+    url = f"sqlite:///{db_path}"
+    if db_path.exists() and not reseed:
+        return url
+    db_path.unlink(missing_ok=True)
+
+    prev = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = url
+    try:
+        cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+        cfg.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+        command.upgrade(cfg, "head")
+    finally:
+        if prev is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = prev
+
+    eng = create_engine(url)
+    try:
+        summary = seed_bench(parse_args(DATASETS[size] + ["--end", DATASET_END.isoformat()]), bind=eng)
+    finally:
+        eng.dispose()
+    print(f"[{size}] seeded in {summary['seconds']}s: {summary['rows'].get('tk_crew_work_segments', 0)} segments", file=sys.stderr)
+    return url
+
+
+class _QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def _pct(values, p):
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+async def _run_endpoint(client, counter, path, params, repeat):
+    timings = []
+    status = None
+    size = 0
+    queries = 0
+    peak = 0
+    for i in range(repeat + 1):
+        # pierwsze wywolanie: zapytania i pamiec (tracemalloc mocno spowalnia, wiec bez pomiaru czasu);
+        # przy okazji rozgrzewa importy openpyxl/reportlab
+        warmup = i == 0
+        counter.count = 0
+        if warmup:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        r = await client.get(path, params=params)
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        status = r.status_code
+        size = len(r.content)
+        if warmup:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            queries = counter.count
+            continue
+        timings.append(elapsed)
+    return {
+        "status": status,
+        "bytes": size,
+        "queries": queries,
+        "peak_kb": round(peak / 1024.0, 1),
+        "ms_min": round(min(timings), 2),
+        "ms_median": round(statistics.median(timings), 2),
+        "ms_p95": round(_pct(timings, 95), 2),
+        "ms_max": round(max(timings), 2),
+    }
+
+
+async def _bench_size(size: str, url: str, repeat: int, only: set | None) -> dict:
+    from app.db import SessionLocal
+    from app.main import app
+    from app.config import settings
+    from app.timekeeping.models import TkEmployee
+
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    SessionLocal.configure(bind=engine)
+    counter = _QueryCounter(engine)
+    try:
+        with engine.connect() as conn:
+            employee_id = conn.execute(
+                select(TkEmployee.id).where(TkEmployee.full_name.like("%BENCH%")).order_by(TkEmployee.id).limit(1)
+            ).scalar() or 1
+
+        results = {}
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base = f"http://bench{settings.API_PREFIX}/timekeeping"
+        async with httpx.AsyncClient(transport=transport, base_url=base, timeout=600) as client:
+            for name, path, params in _endpoints(DATASET_END, employee_id):
+                if only and name not in only:
+                    continue
+                params = {k: (v.isoformat() if isinstance(v, date) else v) for k, v in params.items()}
+                results[name] = await _run_endpoint(client, counter, path, params, repeat)
+                r = results[name]
+                print(f"[{size}] {name:14s} {r['status']} median={r['ms_median']:>9.2f}ms q={r['queries']:>5d} peak={r['peak_kb']:>9.1f}kB", file=sys.stderr)
+        return results
+    finally:
+        engine.dispose()
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline: dict, max_slowdown: float, max_extra_queries: int) -> list[str]:
+    """Regresje: mediana wolniejsza o wiecej niz max_slowdown (np. 0.25 = +25%) albo wiecej zapytan."""
+    problems = []
+    for size, endpoints in current.get("results", {}).items():
+        base_size = baseline.get("results", {}).get(size, {})
+        for name, cur in endpoints.items():
+            base = base_size.get(name)
+            if not base:
+                continue
+            if base["ms_median"] > 0 and cur["ms_median"] > base["ms_median"] * (1.0 + max_slowdown):
+                problems.append(f"{size}/{name}: median {base['ms_median']}ms -> {cur['ms_median']}ms")
+            if cur["queries"] > base["queries"] + max_extra_queries:
+                problems.append(f"{size}/{name}: queries {base['queries']} -> {cur['queries']}")
+            if cur["status"] != base["status"]:
+                problems.append(f"{size}/{name}: status {base['status']} -> {cur['status']}")
+    return problems
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="In-process benchmark of timekeeping report endpoints")
+    ap.add_argument("--sizes", default="small", help="lista z: " + ",".join(DATASETS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", default="", help="nazwy endpointow, np. range_30d,payroll_xlsx")
+    ap.add_argument("--data-dir", default=str(BACKEND_DIR / ".bench"))
+    ap.add_argument("--reseed", action="store_true")
+    ap.add_argument("--out", default="bench_reports.json")
+    ap.add_argument("--baseline", default=None)
+    ap.add_argument("--max-slowdown", type=float, default=0.25)
+    ap.add_argument("--max-extra-queries", type=int, default=0)
+    ap.add_argument("--fail-on-regress", action="store_true")
+    args = ap.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in DATASETS]
+    if unknown:
+        ap.error(f"unknown sizes: {unknown}")
+    only = {x.strip() for x in args.only.split(",") if x.strip()} or None
+
+    urls = {size: _prepare_db(size, Path(args.data_dir), args.reseed) for size in sizes}
+
+    results = {}
+    for size in sizes:
+        results[size] = asyncio.run(_bench_size(size, urls[size], args.repeat, only))
+
+    out = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "dataset_end": DATASET_END.isoformat(),
+        },
+        "results": results,
+    }
+    Path(args.out).write_text(json.dumps(out, indent=2), encoding="utf-8")
+    print(f"saved {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        problems = compare(out, baseline, args.max_slowdown, args.max_extra_queries)
+        for p in problems:
+            print("REGRESSION", p, file=sys.stderr)
+        if problems and args.fail_on_regress:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
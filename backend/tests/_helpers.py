@@ -1,4 +1,8 @@
-﻿def find_path(openapi: dict, must_contain: list[str], method: str | None = None, no_params: bool = False) -> str | None:
+﻿import time
+import httpx
+import pytest
+
+def find_path(openapi: dict, must_contain: list[str], method: str | None = None, no_params: bool = False) -> str | None:
     paths = openapi.get("paths", {})
     for p, ops in paths.items():
         if no_params and "{" in p:
@@ -52,3 +56,41 @@ def make_min_payload(required: list[str]) -> dict:
         payload[k] = "test"
 
     return payload
+
+def create_quote(client, openapi: dict) -> dict:
+    """Klient -> obiekt -> deal -> oferta; skip, gdy srodowisko nie pozwala utworzyc oferty."""
+    clients = find_path(openapi, ["crm", "clients"], method="post", no_params=True)
+    sites = find_path(openapi, ["crm", "sites"], method="post", no_params=True)
+    deals = find_path(openapi, ["quoting", "deals"], method="post", no_params=True)
+    if not all([clients, sites, deals]):
+        pytest.skip("Brak endpointow CRM/ofert.")
+    tag = time.time_ns()
+    r = client.post(clients, json={"type": "company", "name": f"Client {tag}"})
+    assert r.status_code == 200, r.text
+    r = client.post(sites, json={"client_id": r.json()["id"], "name": f"Site {tag}"})
+    assert r.status_code == 200, r.text
+    r = client.post(deals, json={"site_id": r.json()["id"], "title": f"VRF {tag}"})
+    assert r.status_code == 200, r.text
+    r = client.post(f"{deals}/{r.json()['id']}/quotes", json={"scenario": "vrf"})
+    if r.status_code != 200:
+        # np. admin ze smoke seeda bez tenanta (brak tenant_settings)
+        pytest.skip(f"Nie udalo sie utworzyc oferty ({r.status_code}): {r.text[:200]}")
+    return r.json()
+
+def login_client(base_url: str, login_path: str, email: str, password: str) -> httpx.Client:
+    """Loguje uzytkownika we wlasnym kliencie: osobne cookie z refresh tokenem (jak osobne urzadzenie)."""
+    c = httpx.Client(base_url=base_url, timeout=10.0)
+    r = c.post(login_path, json={"email": email, "password": password})
+    assert r.status_code == 200, r.text
+    c.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+    return c
+
+def wait_for_import(client, url: str, timeout_s: float = 15.0) -> dict:
+    """Odpytuje GET /catalog/imports/{id} do statusu done/failed (import idzie w tle)."""
+    deadline = time.time() + timeout_s
+    while True:
+        r = client.get(url)
+        assert r.status_code == 200, r.text
+        if r.json()["status"] in ("done", "failed") or time.time() > deadline:
+            return r.json()
+        time.sleep(0.2)
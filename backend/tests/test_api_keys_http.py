@@ -0,0 +1,37 @@
+﻿import httpx
+import pytest
+from tests._helpers import find_path
+
+def test_api_key_scopes_and_revocation(client, openapi, base_url):
+    keys = find_path(openapi, ["admin", "api-keys"], method="post", no_params=True)
+    revoke = find_path(openapi, ["admin", "api-keys", "{key_id}"], method="delete")
+    clients = find_path(openapi, ["crm", "clients"], method="get", no_params=True)
+    users = find_path(openapi, ["admin", "users"], method="get", no_params=True)
+    if not all([keys, revoke, clients, users]):
+        pytest.skip("Brak endpointow kluczy API.")
+
+    r = client.post(keys, json={"name": "telematyka", "scopes": ["admin:write"]})
+    assert r.status_code == 422, r.text
+
+    r = client.post(keys, json={"name": "telematyka", "role": "sales", "scopes": ["crm:read"]})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["key"].startswith("hqp_") and body["prefix"] in body["key"]
+
+    machine = httpx.Client(base_url=base_url, headers={"Authorization": f"Bearer {body['key']}"}, timeout=10.0)
+    for _ in range(2):  # drugi raz z cache
+        assert machine.get(clients).status_code == 200
+    # zakres tylko do odczytu crm
+    assert machine.post(clients, json={"name": "x"}).status_code == 403
+    assert machine.get(users).status_code == 403
+
+    forged = body["key"][:-4] + ("aaaa" if not body["key"].endswith("aaaa") else "bbbb")
+    r = httpx.get(f"{base_url}{clients}", headers={"Authorization": f"Bearer {forged}"}, timeout=10.0)
+    assert r.status_code == 401
+
+    listed = client.get(keys).json()
+    assert any(k["id"] == body["id"] and "key" not in k for k in listed)
+
+    r = client.delete(revoke.replace("{key_id}", body["id"]))
+    assert r.status_code == 200, r.text
+    assert machine.get(clients).status_code == 401
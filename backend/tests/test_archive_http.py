@@ -0,0 +1,125 @@
+﻿import io
+import random
+import time
+import pytest
+from tests._helpers import find_path
+
+def _url(path: str, log_id) -> str:
+    return path.replace("{log_id}", str(log_id)).replace("{logId}", str(log_id))
+
+def _create_log_in_free_month(client, create_crewlog, vehicle_id, employee_id):
+    # miesiac sprzed horyzontu archiwum; zarchiwizowany (poprzedni przebieg) odpowiada 409
+    for _ in range(20):
+        n = random.randrange(20 * 12)
+        work_date = f"{2001 + n // 12}-{n % 12 + 1:02d}-14"
+        r = client.post(create_crewlog, json={"work_date": work_date, "vehicle_id": vehicle_id, "created_by_employee_id": employee_id})
+        if r.status_code in (200, 201):
+            return work_date, r.json()["id"]
+        assert r.status_code == 409, r.text
+    pytest.skip("Nie znaleziono wolnego miesiaca do archiwizacji.")
+
+def _sheet_rows(wb, name, crew_log_id=None, employee_ids=None):
+    rows = list(wb[name].iter_rows(values_only=True))
+    header, body = rows[0], rows[1:]
+    out = [dict(zip(header, r)) for r in body]
+    if crew_log_id is not None:
+        out = [r for r in out if r["crew_log_id"] == crew_log_id]
+    if employee_ids is not None:
+        out = [r for r in out if r["employee_id"] in employee_ids]
+    return out
+
+def test_archive_keeps_reports_and_payroll(client, openapi):
+    openpyxl = pytest.importorskip("openpyxl")
+    paths = {
+        "vehicle": find_path(openapi, ["timekeeping", "vehicles"], method="post", no_params=True),
+        "site": find_path(openapi, ["timekeeping", "sites", "ad-hoc"], method="post", no_params=True),
+        "employee": find_path(openapi, ["timekeeping", "employees"], method="post", no_params=True),
+        "crewlog": find_path(openapi, ["timekeeping", "crew-logs"], method="post", no_params=True),
+        "member": find_path(openapi, ["timekeeping", "crew-logs", "members"], method="post"),
+        "segment": find_path(openapi, ["timekeeping", "crew-logs", "segments"], method="post"),
+        "lock_range": find_path(openapi, ["timekeeping", "crew-logs", "lock-range"], method="post"),
+        "approve_range": find_path(openapi, ["timekeeping", "crew-logs", "approve-range"], method="post"),
+        "submit": find_path(openapi, ["timekeeping", "crew-logs", "submit"], method="post"),
+        "archive": find_path(openapi, ["timekeeping", "archive-month"], method="post"),
+        "day": find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True),
+        "range": find_path(openapi, ["timekeeping", "reports", "range"], method="get", no_params=True),
+        "payroll": find_path(openapi, ["timekeeping", "reports", "payroll.xlsx"], method="get"),
+    }
+    missing = [k for k, v in paths.items() if not v]
+    if missing:
+        pytest.skip(f"Brak endpointow: {missing}")
+
+    r = client.post(paths["vehicle"], json={"plate": f"ARCH-{time.time_ns() % 10**10}", "make_model": "pytest"})
+    assert r.status_code in (200, 201), r.text
+    vehicle_id = r.json()["id"]
+    r = client.post(paths["site"], json={"name": "PY ARCH SITE", "lat": 50.0, "lng": 19.0, "radius_m": 200})
+    assert r.status_code in (200, 201), r.text
+    site_id = r.json()["id"]
+    employee_ids = []
+    for name in ("PY ARCH A", "PY ARCH B"):
+        r = client.post(paths["employee"], json={"full_name": name})
+        assert r.status_code in (200, 201), r.text
+        employee_ids.append(r.json()["id"])
+
+    work_date, log_id = _create_log_in_free_month(client, paths["crewlog"], vehicle_id, employee_ids[0])
+    for eid in employee_ids:
+        assert client.post(_url(paths["member"], log_id), json={"employee_id": eid}).status_code in (200, 201)
+    for seg_type, start, end in [("work", "07:00", "09:10"), ("travel", "09:10", "09:32"), ("work", "09:32", "13:01")]:
+        r = client.post(_url(paths["segment"], log_id), json={
+            "site_id": site_id, "segment_type": seg_type,
+            "start_at": f"{work_date}T{start}:00", "end_at": f"{work_date}T{end}:00",
+        })
+        assert r.status_code in (200, 201), r.text
+
+    month_from = work_date[:8] + "01"
+    rng_params = {"date_from": month_from, "date_to": work_date, "vehicle_id": vehicle_id}
+
+    def _snapshot():
+        r = client.get(paths["range"], params=rng_params)
+        assert r.status_code == 200, r.text
+        rng = r.json()
+        r = client.get(paths["day"], params={"date": work_date})
+        assert r.status_code == 200, r.text
+        day = [x for x in r.json()["crew_logs"] if x["crew_log_id"] == log_id]
+        r = client.get(paths["payroll"], params={"date_from": month_from, "date_to": work_date})
+        assert r.status_code == 200, r.text
+        wb = openpyxl.load_workbook(io.BytesIO(r.content))
+        payroll = {
+            "segments": _sheet_rows(wb, "Segments", crew_log_id=log_id),
+            "payroll": _sheet_rows(wb, "Payroll", employee_ids=employee_ids),
+            "totals": _sheet_rows(wb, "Totals", employee_ids=employee_ids),
+        }
+        return rng, day, payroll
+
+    live = _snapshot()
+    # segment na czlonka, z czasami - nie jeden wiersz sumy na typ
+    assert len(live[2]["segments"]) == 3 * len(employee_ids)
+    assert all(row["start_at"] and row["segment_id"] for row in live[2]["segments"])
+
+    body = {"date_from": month_from, "date_to": work_date, "vehicle_id": vehicle_id}
+    assert client.post(_url(paths["submit"], log_id)).status_code == 200
+    assert client.post(paths["approve_range"], json=body).json()["approved"] == 1
+    assert client.post(paths["lock_range"], json=body).json()["locked"] == 1
+
+    # zablokowany log: raporty i payroll ze snapshotu, te same liczby i wiersze co na zywo
+    locked = _snapshot()
+    assert locked[0] == live[0]
+    assert locked[1] == live[1]
+    assert locked[2] == live[2]
+
+    # miesiac moze miec logi innych testow (nie-locked) - wtedy archiwizacja nie przejdzie
+    r = client.post(paths["archive"], json={"month": work_date})
+    if r.status_code == 409 and "not locked" in r.text:
+        pytest.skip(f"Miesiac {work_date[:7]} ma niezablokowane logi spoza testu.")
+    assert r.status_code == 200, r.text
+    assert r.json()["crew_logs"] >= 1
+
+    archived = _snapshot()
+    assert archived[0] == locked[0]
+    assert archived[1] == locked[1]
+    assert archived[2] == locked[2]
+
+    r = client.post(paths["archive"], json={"month": work_date})
+    assert r.status_code == 409, r.text
+    r = client.post(paths["crewlog"], json={"work_date": work_date, "vehicle_id": vehicle_id, "created_by_employee_id": employee_ids[0]})
+    assert r.status_code == 409, r.text
@@ -0,0 +1,89 @@
+﻿import time
+import uuid
+import pytest
+from tests._helpers import create_quote, find_path
+
+def test_generate_lines_from_bom_rules(client, openapi):
+    rules = find_path(openapi, ["quoting", "bom-rules"], method="post", no_params=True)
+    generate = find_path(openapi, ["quoting", "generate-lines"], method="post")
+    if not rules or not generate:
+        pytest.skip("Brak POST /quoting/bom-rules.")
+    quote = create_quote(client, openapi)
+    base = generate.replace("/generate-lines", "").replace("{quote_id}", quote["id"])
+    # reguly tenanta zostaja miedzy uruchomieniami - warunek na unikalnym parametrze izoluje ten test
+    run = f"run_{time.time_ns()}"
+
+    created = []
+    for payload in [
+        {"name": "Jednostka wewnetrzna", "line_type": "equipment", "qty_formula": "indoor_units", "condition": f"{run} == 1", "purchase_price_net": 2500, "sort_order": 1},
+        {"name": "Rura miedziana", "unit": "mb", "qty_formula": "ceil(indoor_units * pipe_m * 1.1)", "condition": f"{run} == 1", "purchase_price_net": 18.4, "markup_pct": 0.3, "sort_order": 2},
+        {"name": "Sterownik centralny", "qty_formula": "1", "condition": f"{run} == 1 and system == 'vrf'", "purchase_price_net": 1200, "sort_order": 3},
+        {"name": "Pompa skroplin", "qty_formula": "indoor_units - with_gravity_drain", "condition": f"{run} == 1", "purchase_price_net": 310, "sort_order": 4},
+    ]:
+        r = client.post(rules, json=payload)
+        assert r.status_code == 200, r.text
+        created.append(r.json())
+    assert created[1]["params"] == ["indoor_units", "pipe_m", run]
+
+    try:
+        params = [
+            {"key": run, "value_num": 1},
+            {"key": "indoor_units", "value_num": 4},
+            {"key": "pipe_m", "value_num": 7.5},
+            {"key": "system", "value_text": "vrf"},
+            {"key": "with_gravity_drain", "value_num": 4},
+        ]
+        assert client.put(f"{base}/params", json=params).status_code == 200
+        r = client.post(f"{base}/generate-lines")
+        assert r.status_code == 200, r.text
+        assert r.json()["created"] == 3 and r.json()["errors"] == []
+
+        lines = {l["name"]: l for l in client.get(f"{base}/lines").json()}
+        assert set(lines) == {"Jednostka wewnetrzna", "Rura miedziana", "Sterownik centralny"}
+        assert lines["Rura miedziana"]["qty"] == 33.0
+        assert lines["Rura miedziana"]["sell_price_net_unit"] == 23.92
+        assert all(l["source"] == "rule" for l in lines.values())
+        assert client.get(f"{base}/totals").json() == client.post(f"{base}/recalculate").json()
+
+        # po generate-lines zapis parametrow przelicza tylko reguly zalezne od zmienionych kluczy
+        r = client.post(f"{base}/lines", json={"line_type": "service", "name": "Montaz", "qty": 1, "purchase_price_net": 800})
+        assert r.status_code == 200, r.text
+        ids = {l["name"]: l["id"] for l in client.get(f"{base}/lines").json()}
+        params[3] = {"key": "system", "value_text": "split"}
+        r = client.put(f"{base}/params", json=params)
+        assert r.status_code == 200, r.text
+        assert r.json()["changed"] == ["system"]
+        assert (r.json()["lines"]["rules"], r.json()["lines"]["deleted"], r.json()["lines"]["created"]) == (1, 1, 0)
+        assert client.get(f"{base}/totals").json() == client.post(f"{base}/recalculate").json()
+
+        params[1] = {"key": "indoor_units", "value_num": 6}
+        r = client.put(f"{base}/params", json=params)
+        assert r.json()["changed"] == ["indoor_units"]
+        assert (r.json()["lines"]["updated"], r.json()["lines"]["created"]) == (2, 1)
+        lines = {l["name"]: l for l in client.get(f"{base}/lines").json()}
+        assert set(lines) == {"Jednostka wewnetrzna", "Rura miedziana", "Pompa skroplin", "Montaz"}
+        assert lines["Rura miedziana"]["qty"] == 50.0 and lines["Pompa skroplin"]["qty"] == 2.0
+        # linie aktualizowane w miejscu - te same id
+        assert all(lines[n]["id"] == ids[n] for n in ("Jednostka wewnetrzna", "Rura miedziana", "Montaz"))
+        assert client.get(f"{base}/totals").json() == client.post(f"{base}/recalculate").json()
+
+        # zapis bez zmian i ponowne generowanie niczego nie ruszaja
+        r = client.put(f"{base}/params", json=params)
+        assert r.json()["changed"] == [] and r.json()["lines"] is None
+        r = client.post(f"{base}/generate-lines")
+        assert (r.json()["created"], r.json()["updated"], r.json()["deleted"]) == (0, 0, 0)
+    finally:
+        for rule in created:
+            client.delete(f"{rules}/{rule['id']}")
+
+    for bad in ["__import__('os').system('id')", "indoor_units.__class__", "2 ** indoor_units", "ceil(", "(" * 9 + "9" + "**8)" * 9]:
+        r = client.post(rules, json={"name": "Zla", "qty_formula": bad})
+        assert r.status_code == 422, (bad, r.text)
+
+def test_generate_lines_unknown_quote_is_404(client, openapi):
+    generate = find_path(openapi, ["quoting", "generate-lines"], method="post")
+    if not generate:
+        pytest.skip("Brak POST /quoting/quotes/{quote_id}/generate-lines.")
+    # oferta innego tenanta wyglada tak samo jak brakujaca (filtr po tenant_id)
+    r = client.post(generate.replace("{quote_id}", str(uuid.uuid4())))
+    assert r.status_code == 404, r.text
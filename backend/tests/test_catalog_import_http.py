@@ -0,0 +1,54 @@
+﻿import time
+import pytest
+from tests._helpers import find_path, wait_for_import
+
+def _upload(client, path: str, supplier: str, filename: str, content: bytes):
+    return client.post(path, data={"supplier": supplier}, files={"file": (filename, content, "text/csv")})
+
+def test_price_list_import_upserts_catalog(client, openapi):
+    imports = find_path(openapi, ["catalog", "imports"], method="post", no_params=True)
+    items = find_path(openapi, ["catalog", "items"], method="get", no_params=True)
+    if not imports or not items:
+        pytest.skip("Brak POST /catalog/imports.")
+    supplier = f"Hurtownia {time.time_ns()}"
+
+    # polski eksport: cp1250, srednik, tytul nad naglowkiem, cena z przecinkiem i spacja tysiecy
+    csv_v1 = (
+        "Cennik hurtowy;;;\n"
+        "Indeks;Nazwa towaru;J.m.;Cena zakupu netto\n"
+        "RM-12;Rura miedziana 12 mm;mb;18,40\n"
+        "AG-5K;Agregat 5 kW;szt;4 210,00\n"
+        "XX-1;Bez ceny;szt;\n"
+    ).encode("cp1250")
+    r = _upload(client, imports, supplier, "cennik.csv", csv_v1)
+    if r.status_code != 202:
+        # np. admin ze smoke seeda bez tenanta
+        pytest.skip(f"Nie udalo sie zlecic importu ({r.status_code}): {r.text[:200]}")
+    job = wait_for_import(client, f"{imports}/{r.json()['id']}")
+    assert job["status"] == "done", job
+    assert (job["rows"], job["upserted"], job["skipped"]) == (3, 2, 1)
+
+    rows = {i["sku"]: i for i in client.get(items, params={"supplier": supplier}).json()}
+    assert set(rows) == {"RM-12", "AG-5K"}
+    assert rows["AG-5K"]["purchase_price_net"] == 4210.0
+    assert rows["RM-12"]["unit"] == "mb"
+
+    # kolejny miesiac: ta sama pozycja aktualizowana (to samo id), nowa dopisana
+    csv_v2 = b"sku,name,unit,price\nRM-12,Rura miedziana 12 mm,mb,19.10\nRM-15,Rura miedziana 15 mm,mb,23.90\n"
+    r = _upload(client, imports, supplier, "cennik-2.csv", csv_v2)
+    assert r.status_code == 202, r.text
+    assert wait_for_import(client, f"{imports}/{r.json()['id']}")["status"] == "done"
+
+    after = {i["sku"]: i for i in client.get(items, params={"supplier": supplier}).json()}
+    assert set(after) == {"RM-12", "AG-5K", "RM-15"}
+    assert after["RM-12"]["id"] == rows["RM-12"]["id"]
+    assert after["RM-12"]["purchase_price_net"] == 19.1
+
+    # plik bez rozpoznanego naglowka: import konczy sie bledem, katalog bez zmian
+    r = _upload(client, imports, supplier, "zly.csv", b"a;b\n1;2\n")
+    assert r.status_code == 202, r.text
+    job = wait_for_import(client, f"{imports}/{r.json()['id']}")
+    assert job["status"] == "failed" and job["error"]
+
+    r = _upload(client, imports, supplier, "cennik.pdf", b"%PDF")
+    assert r.status_code == 422
@@ -0,0 +1,42 @@
+﻿import time
+import pytest
+from tests._helpers import find_path, wait_for_import
+
+def test_catalog_search_prefix_model_and_typos(client, openapi):
+    imports = find_path(openapi, ["catalog", "imports"], method="post", no_params=True)
+    search = find_path(openapi, ["catalog", "search"], method="get", no_params=True)
+    if not imports or not search:
+        pytest.skip("Brak GET /catalog/search.")
+    supplier = f"Dystrybutor {time.time_ns()}"
+    price_list = (
+        "Kod;Nazwa;Producent;Model;Cena netto\n"
+        "FTXM35R;Klimatyzator ścienny Perfera 3,5 kW;Daikin;FTXM35R;3120,00\n"
+        "FTXM50R;Klimatyzator ścienny Perfera 5,0 kW;Daikin;FTXM50R;3890,00\n"
+        "MSZ-LN25;Jednostka wewnętrzna Kirigamine;Mitsubishi;MSZ-LN25VG2;2950,00\n"
+        "RM-12;Rura miedziana 12 mm;;;18,40\n"
+    ).encode("utf-8")
+    r = client.post(imports, data={"supplier": supplier}, files={"file": ("cennik.csv", price_list, "text/csv")})
+    if r.status_code != 202:
+        pytest.skip(f"Nie udalo sie zlecic importu ({r.status_code}): {r.text[:200]}")
+    assert wait_for_import(client, f"{imports}/{r.json()['id']}")["status"] == "done"
+
+    def skus(q: str) -> list[str]:
+        r = client.get(search, params={"q": q, "supplier": supplier})
+        assert r.status_code == 200, r.text
+        return [i["sku"] for i in r.json()]
+
+    # prefiks kodu producenta: najpierw SKU zaczynajace sie od zapytania
+    assert skus("ftxm")[:2] == ["FTXM35R", "FTXM50R"]
+    assert skus("FTXM50") == ["FTXM50R"]
+    # kilka slow, bez polskich znakow, poczatki slow
+    assert skus("klim scienny 5") == ["FTXM50R"]
+    assert skus("wewnetrzna") == ["MSZ-LN25"]
+    # model i producent
+    assert skus("ln25vg") == ["MSZ-LN25"]
+    assert "RM-12" not in skus("daikin")
+    # literowka
+    assert skus("klimatyzatr")[:2] == ["FTXM35R", "FTXM50R"]
+    assert skus("xyzzy") == []
+
+    r = client.get(search, params={"q": ""})
+    assert r.status_code == 422
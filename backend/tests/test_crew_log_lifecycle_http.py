@@ -0,0 +1,135 @@
+﻿import time
+import pytest
+from tests._helpers import find_path
+
+WORK_DATE = "2025-03-12"
+
+def _url(path: str, log_id) -> str:
+    return path.replace("{log_id}", str(log_id)).replace("{logId}", str(log_id))
+
+def _make_locked_candidate(client, openapi):
+    create_vehicle = find_path(openapi, ["timekeeping", "vehicles"], method="post", no_params=True)
+    create_site = find_path(openapi, ["timekeeping", "sites", "ad-hoc"], method="post", no_params=True)
+    create_employee = find_path(openapi, ["timekeeping", "employees"], method="post", no_params=True)
+    create_crewlog = find_path(openapi, ["timekeeping", "crew-logs"], method="post", no_params=True)
+    add_member = find_path(openapi, ["timekeeping", "crew-logs", "members"], method="post")
+    add_segment = find_path(openapi, ["timekeeping", "crew-logs", "segments"], method="post")
+    if not all([create_vehicle, create_site, create_employee, create_crewlog, add_member, add_segment]):
+        pytest.skip("Brak wymaganych endpointow w OpenAPI.")
+
+    r = client.post(create_vehicle, json={"plate": f"LOCK-{time.time_ns() % 10**10}", "make_model": "pytest"})
+    assert r.status_code in (200, 201), r.text
+    vehicle_id = r.json()["id"]
+
+    r = client.post(create_site, json={"name": "PY LOCK SITE", "lat": 50.0, "lng": 19.0, "radius_m": 200})
+    assert r.status_code in (200, 201), r.text
+    site_id = r.json()["id"]
+
+    r = client.post(create_employee, json={"full_name": "PY LOCK EMP"})
+    assert r.status_code in (200, 201), r.text
+    employee_id = r.json()["id"]
+
+    r = client.post(create_crewlog, json={"work_date": WORK_DATE, "vehicle_id": vehicle_id, "created_by_employee_id": employee_id})
+    assert r.status_code in (200, 201), r.text
+    log_id = r.json()["id"]
+
+    client.post(_url(add_member, log_id), json={"employee_id": employee_id})
+    for seg_type, start, end in [("work", "08:00", "10:05"), ("travel", "10:05", "10:40"), ("work", "10:40", "12:00")]:
+        r = client.post(_url(add_segment, log_id), json={
+            "site_id": site_id, "segment_type": seg_type,
+            "start_at": f"{WORK_DATE}T{start}:00", "end_at": f"{WORK_DATE}T{end}:00",
+        })
+        assert r.status_code in (200, 201), r.text
+
+    return log_id, vehicle_id, site_id
+
+def test_lock_freezes_reports(client, openapi):
+    submit = find_path(openapi, ["timekeeping", "crew-logs", "submit"], method="post")
+    approve = find_path(openapi, ["timekeeping", "crew-logs", "{", "approve"], method="post")
+    lock = find_path(openapi, ["timekeeping", "crew-logs", "{", "lock"], method="post")
+    reopen = find_path(openapi, ["timekeeping", "crew-logs", "reopen"], method="post")
+    day = find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True)
+    rng = find_path(openapi, ["timekeeping", "reports", "range"], method="get", no_params=True)
+    daily = find_path(openapi, ["timekeeping", "reports", "daily"], method="get", no_params=True)
+    if not all([submit, approve, lock, reopen, day, rng, daily]):
+        pytest.skip("Brak endpointow cyklu zycia crew logu.")
+
+    log_id, vehicle_id, site_id = _make_locked_candidate(client, openapi)
+
+    def _day_row():
+        r = client.get(day, params={"date": WORK_DATE})
+        assert r.status_code == 200, r.text
+        return next(x for x in r.json()["crew_logs"] if x["crew_log_id"] == log_id)
+
+    def _range():
+        r = client.get(rng, params={"date_from": WORK_DATE, "date_to": WORK_DATE, "vehicle_id": vehicle_id})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    def _daily_row():
+        r = client.get(daily, params={"work_date": WORK_DATE, "vehicle_id": vehicle_id})
+        assert r.status_code == 200, r.text
+        return next(x for x in r.json()["crew_logs"] if x["crew_log_id"] == log_id)
+
+    before_day = _day_row()
+    before_range = _range()
+    before_daily = _daily_row()
+    assert before_daily["work_minutes"] == 210 and before_daily["travel_minutes"] == 45
+
+    r = client.post(_url(lock, log_id))
+    assert r.status_code == 409, r.text
+
+    for path, status in [(submit, "submitted"), (approve, "approved"), (lock, "locked")]:
+        r = client.post(_url(path, log_id))
+        assert r.status_code == 200, r.text
+        assert r.json()["status"] == status
+
+    assert _day_row() == before_day
+    assert _range() == before_range
+    assert _daily_row() == before_daily
+
+    add_segment = find_path(openapi, ["timekeeping", "crew-logs", "segments"], method="post")
+    r = client.post(_url(add_segment, log_id), json={
+        "site_id": site_id, "segment_type": "work",
+        "start_at": f"{WORK_DATE}T13:00:00", "end_at": f"{WORK_DATE}T14:00:00",
+    })
+    assert r.status_code == 409, r.text
+
+    # kazda zmiana logu (czlonkowie, start segmentu) odbija sie od blokady
+    add_member = find_path(openapi, ["timekeeping", "crew-logs", "members"], method="post")
+    start = find_path(openapi, ["timekeeping", "crew-logs", "segments", "start"], method="post")
+    r = client.post(_url(add_member, log_id), json={"employee_id": 1})
+    assert r.status_code == 409, r.text
+    if start:
+        r = client.post(_url(start, log_id), json={"site_id": site_id})
+        assert r.status_code == 409, r.text
+
+    r = client.post(_url(reopen, log_id))
+    assert r.status_code == 200, r.text
+    assert r.json()["status"] == "draft"
+    assert _day_row() == before_day
+
+def test_bulk_approve_and_lock_range(client, openapi):
+    approve_range = find_path(openapi, ["timekeeping", "crew-logs", "approve-range"], method="post")
+    lock_range = find_path(openapi, ["timekeeping", "crew-logs", "lock-range"], method="post")
+    submit = find_path(openapi, ["timekeeping", "crew-logs", "submit"], method="post")
+    if not all([approve_range, lock_range, submit]):
+        pytest.skip("Brak endpointow approve-range / lock-range.")
+
+    log_id, vehicle_id, _ = _make_locked_candidate(client, openapi)
+    body = {"date_from": WORK_DATE, "date_to": WORK_DATE, "vehicle_id": vehicle_id}
+
+    r = client.post(approve_range, json=body)
+    assert r.status_code == 200, r.text
+    assert r.json()["approved"] == 0
+
+    assert client.post(_url(submit, log_id)).status_code == 200
+
+    r = client.post(approve_range, json=body)
+    assert r.status_code == 200, r.text
+    assert r.json()["approved"] == 1
+
+    r = client.post(lock_range, json=body)
+    assert r.status_code == 200, r.text
+    assert r.json()["locked"] == 1
+    assert r.json()["by_status"] == {"locked": 1}
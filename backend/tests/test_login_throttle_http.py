@@ -0,0 +1,29 @@
+﻿import time
+import httpx
+import pytest
+from tests._helpers import find_path
+
+def test_login_is_throttled_per_account(client, openapi, base_url):
+    login = find_path(openapi, ["auth", "login"], method="post")
+    create_user = find_path(openapi, ["admin", "users"], method="post", no_params=True)
+    if not login or not create_user:
+        pytest.skip("Brak endpointow logowania / tworzenia uzytkownika.")
+
+    email = f"throttle-{time.time_ns()}@example.com"
+    r = client.post(create_user, json={"email": email, "password": "Secret123!", "role": "sales"})
+    assert r.status_code == 200, r.text
+
+    statuses = []
+    for _ in range(12):
+        r = httpx.post(f"{base_url}{login}", json={"email": email, "password": "wrong-password"}, timeout=20.0)
+        statuses.append(r.status_code)
+        if r.status_code == 429:
+            break
+    if 429 not in statuses:
+        pytest.skip("Throttling logowania wylaczony na tym serwerze.")
+    assert set(statuses[:-1]) == {401}, statuses
+    assert int(r.headers["retry-after"]) > 0
+
+    # zablokowane konto nie loguje sie nawet poprawnym haslem
+    r = httpx.post(f"{base_url}{login}", json={"email": email, "password": "Secret123!"}, timeout=20.0)
+    assert r.status_code == 429, r.text
@@ -0,0 +1,29 @@
+﻿import httpx
+import pytest
+from tests._helpers import find_path
+
+def test_metrics_exposes_route_latency_and_pools(client, openapi, base_url):
+    day = find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True)
+    if not day:
+        pytest.skip("Brak endpointu raportu dziennego.")
+    r = client.get(day, params={"date": "2025-05-05"})
+    assert r.status_code == 200, r.text
+
+    r = httpx.get(f"{base_url}/metrics", timeout=10.0)
+    if r.status_code == 404:
+        pytest.skip("Brak /metrics.")
+    if r.status_code == 401:
+        pytest.skip("/metrics wymaga METRICS_TOKEN.")
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("text/plain")
+
+    text = r.text
+    for name in (
+        "hqp_http_request_duration_seconds_bucket",
+        "hqp_http_requests_in_progress",
+        "hqp_threadpool_waiting",
+        "hqp_db_pool_checked_out",
+    ):
+        assert name in text, name
+    # trasa jako szablon, bez parametrow zapytania
+    assert any('route="' in line and "reports/day\"" in line for line in text.splitlines()), text[:2000]
@@ -0,0 +1,57 @@
+﻿import time
+import pytest
+from tests._helpers import find_path, login_client
+
+def test_deactivation_applies_immediately(client, openapi, base_url):
+    login = find_path(openapi, ["auth", "login"], method="post")
+    create_user = find_path(openapi, ["admin", "users"], method="post", no_params=True)
+    deactivate = find_path(openapi, ["admin", "users", "deactivate"], method="patch")
+    clients = find_path(openapi, ["crm", "clients"], method="get", no_params=True)
+    if not all([login, create_user, deactivate, clients]):
+        pytest.skip("Brak endpointow administracji uzytkownikami.")
+
+    email = f"cache-{time.time_ns()}@example.com"
+    r = client.post(create_user, json={"email": email, "password": "Secret123!", "role": "sales"})
+    assert r.status_code == 200, r.text
+    user_id = r.json()["id"]
+
+    session = login_client(base_url, login, email, "Secret123!")
+    for _ in range(2):  # drugi raz z cache
+        r = session.get(clients)
+        assert r.status_code == 200, r.text
+
+    r = client.patch(deactivate.replace("{user_id}", user_id))
+    assert r.status_code == 200, r.text
+
+    r = session.get(clients)
+    assert r.status_code == 401, r.text
+
+def test_role_change_applies_immediately(client, openapi, base_url):
+    login = find_path(openapi, ["auth", "login"], method="post")
+    create_user = find_path(openapi, ["admin", "users"], method="post", no_params=True)
+    users = find_path(openapi, ["admin", "users"], method="get", no_params=True)
+    update_user = next((p for p, ops in openapi["paths"].items() if p.endswith("/admin/users/{user_id}") and "patch" in ops), None)
+    if not all([login, create_user, users, update_user]):
+        pytest.skip("Brak PATCH /admin/users/{user_id}.")
+
+    email = f"cache-role-{time.time_ns()}@example.com"
+    r = client.post(create_user, json={"email": email, "password": "Secret123!", "role": "sales"})
+    assert r.status_code == 200, r.text
+    user_id = r.json()["id"]
+
+    session = login_client(base_url, login, email, "Secret123!")
+    r = session.get(users)
+    assert r.status_code == 403, r.text
+
+    # tylko role aplikacji - nieznana rola (np. "superadmin") nie przechodzi ani przy tworzeniu, ani przy zmianie
+    r = client.patch(update_user.replace("{user_id}", user_id), json={"role": "superadmin"})
+    assert r.status_code == 422, r.text
+    r = client.post(create_user, json={"email": f"x-{email}", "password": "Secret123!", "role": "superadmin"})
+    assert r.status_code == 422, r.text
+
+    r = client.patch(update_user.replace("{user_id}", user_id), json={"role": "admin"})
+    assert r.status_code == 200, r.text
+    assert r.json()["role"] == "admin"
+
+    r = session.get(users)
+    assert r.status_code == 200, r.text
@@ -0,0 +1,32 @@
+﻿import httpx
+import pytest
+from tests._helpers import find_path
+
+def test_admin_can_profile_a_request(client, openapi, base_url):
+    day = find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True)
+    profiles = find_path(openapi, ["admin", "profiles"], method="get", no_params=True)
+    if not day or not profiles:
+        pytest.skip("Brak endpointow profilowania.")
+
+    r = client.get(day, params={"date": "2025-06-02"}, headers={"X-Profile": "1"})
+    assert r.status_code == 200, r.text
+    profile_id = r.headers.get("x-profile-id")
+    if not profile_id:
+        pytest.skip("Profilowanie wylaczone (PROFILE_ENABLED) albo uzytkownik nie jest adminem.")
+
+    r = client.get(r.headers["x-profile-url"])
+    assert r.status_code == 200, r.text
+    assert "cumulative" in r.text
+    # profil przypisany do tenanta admina - lista i pobieranie tylko w jego obrebie
+    r = client.get(r.request.url.path, params={"format": "json"})
+    assert r.status_code == 200, r.text
+    assert "tenant_id" in r.json()
+
+    r = client.get(profiles)
+    assert r.status_code == 200, r.text
+    assert any(p["id"] == profile_id for p in r.json())
+
+    # bez tokenu admina flaga jest ignorowana
+    r = httpx.get(f"{base_url}{day}", params={"date": "2025-06-02"}, headers={"X-Profile": "1"}, timeout=20.0)
+    assert r.status_code == 200, r.text
+    assert "x-profile-id" not in r.headers
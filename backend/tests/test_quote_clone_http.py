@@ -0,0 +1,66 @@
+﻿import pytest
+from tests._helpers import create_quote, find_path
+
+def test_clone_quote_and_template(client, openapi):
+    clone = find_path(openapi, ["quoting", "quotes", "clone"], method="post")
+    from_template = find_path(openapi, ["quoting", "quotes", "from-template"], method="post")
+    if not clone or not from_template:
+        pytest.skip("Brak POST /quotes/{quote_id}/clone.")
+    quote = create_quote(client, openapi)
+    base = clone.replace("/clone", "").replace("{quote_id}", quote["id"])
+
+    for qty, price in [(2, 1999.99), (35, 21.5), (1, 800)]:
+        r = client.post(f"{base}/lines", json={"line_type": "material", "name": f"Pozycja {qty}", "qty": qty, "purchase_price_net": price})
+        assert r.status_code == 200, r.text
+    assert client.put(f"{base}/params", json=[{"key": "indoor_units", "value_num": 4}]).status_code == 200
+    assert client.put(f"{base}/overheads", json=[{"overhead_type": "risk", "pct": 0.05}]).status_code == 200
+    totals = client.get(f"{base}/totals").json()
+
+    def snapshot(quote_base):
+        lines = sorted((l["name"], l["qty"], l["sell_price_net_total"]) for l in client.get(f"{quote_base}/lines").json())
+        return lines, client.get(f"{quote_base}/totals").json()
+
+    # nowa wersja: ten sam deal, wyzsza pricing_version, te same linie i sumy, inne id linii
+    r = client.post(clone.replace("{quote_id}", quote["id"]), json={})
+    assert r.status_code == 200, r.text
+    copy = r.json()
+    assert copy["id"] != quote["id"] and copy["quote_no"] != quote["quote_no"]
+    assert (copy["deal_id"], copy["pricing_version"], copy["is_template"]) == (quote["deal_id"], quote["pricing_version"] + 1, False)
+    copy_base = base.replace(quote["id"], copy["id"])
+    assert snapshot(copy_base) == snapshot(base)
+    assert client.get(f"{copy_base}/totals").json() == totals == client.post(f"{copy_base}/recalculate").json()
+    assert not {l["id"] for l in client.get(f"{copy_base}/lines").json()} & {l["id"] for l in client.get(f"{base}/lines").json()}
+
+    # zmiana w kopii nie rusza oryginalu
+    line_id = client.get(f"{copy_base}/lines").json()[0]["id"]
+    assert client.delete(f"{copy_base}/lines/{line_id}").status_code == 200
+    assert len(client.get(f"{base}/lines").json()) == 3
+    assert client.get(f"{base}/totals").json() == totals
+
+    # szablon -> nowa oferta w deal
+    r = client.post(clone.replace("{quote_id}", quote["id"]), json={"as_template": True})
+    assert r.status_code == 200, r.text
+    template = r.json()
+    assert template["is_template"] and template["quote_no"].startswith("TPL-")
+    # szablon nie nalezy do deala i nie jest ruszany przez hurtowe przeliczenie cen
+    assert template["deal_id"] is None
+    reprice = find_path(openapi, ["quoting", "reprice"], method="post")
+    if reprice:
+        r = client.post(reprice, json={"quote_ids": [template["id"]], "include_closed": True, "price_factor": 2})
+        assert r.status_code == 200, r.text
+        assert r.json()["lines"] == 0
+    assert client.post(clone.replace("{quote_id}", template["id"]), json={}).status_code == 409
+    templates = find_path(openapi, ["quoting", "templates"], method="get")
+    assert template["id"] in {q["id"] for q in client.get(templates).json()}
+
+    url = from_template.replace("{deal_id}", quote["deal_id"]).replace("{template_id}", template["id"])
+    r = client.post(url)
+    assert r.status_code == 200, r.text
+    created = r.json()
+    # kolejna wersja w deal (oryginal v1, kopia v2), nie zawsze 1
+    assert (created["deal_id"], created["is_template"], created["pricing_version"]) == (quote["deal_id"], False, copy["pricing_version"] + 1)
+    assert snapshot(base.replace(quote["id"], created["id"])) == snapshot(base)
+
+    # zwykla oferta nie jest szablonem
+    r = client.post(from_template.replace("{deal_id}", quote["deal_id"]).replace("{template_id}", quote["id"]))
+    assert r.status_code == 404
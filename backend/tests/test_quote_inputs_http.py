@@ -0,0 +1,32 @@
+﻿import pytest
+from tests._helpers import create_quote, find_path
+
+def test_params_and_overheads_report_changes(client, openapi):
+    params = find_path(openapi, ["quoting", "quotes", "params"], method="put")
+    if not params:
+        pytest.skip("Brak PUT /quotes/{quote_id}/params.")
+    quote = create_quote(client, openapi)
+    base = params.replace("/params", "").replace("{quote_id}", quote["id"])
+
+    def put(path, payload):
+        r = client.put(f"{base}/{path}", json=payload)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    r = put("params", [{"key": "floors", "value_num": 3}, {"key": "system", "value_text": "vrf"}])
+    assert (r["inserted"], r["updated"], r["deleted"]) == (["floors", "system"], [], [])
+
+    # ta sama wartosc w innym zapisie (3 vs 3.0000 w bazie) to nie zmiana
+    r = put("params", [{"key": "system", "value_text": "vrf"}, {"key": "floors", "value_num": 3.0}])
+    assert r["changed"] == []
+
+    # powtorzony klucz: wygrywa ostatni
+    r = put("params", [{"key": "floors", "value_num": 2}, {"key": "floors", "value_num": 4}, {"key": "pipe_m", "value_num": 7.5}])
+    assert (r["inserted"], r["updated"], r["deleted"]) == (["pipe_m"], ["floors"], ["system"])
+
+    r = put("overheads", [{"overhead_type": "risk", "pct": 0.05}, {"overhead_type": "logistics", "pct": 0.03}])
+    assert r["inserted"] == ["logistics", "risk"]
+    assert put("overheads", [{"overhead_type": "risk", "pct": 0.05}, {"overhead_type": "logistics", "pct": 0.03}])["changed"] == []
+    r = put("overheads", [{"overhead_type": "risk", "pct": 0.07}])
+    assert (r["updated"], r["deleted"]) == (["risk"], ["logistics"])
+    assert client.get(f"{base}/totals").json() == client.post(f"{base}/recalculate").json()
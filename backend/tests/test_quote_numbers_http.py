@@ -0,0 +1,23 @@
+﻿from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests._helpers import create_quote, find_path
+
+def test_quote_numbers_unique_under_concurrency(client, openapi):
+    deals = find_path(openapi, ["quoting", "deals"], method="post", no_params=True)
+    if not deals:
+        pytest.skip("Brak POST /quoting/deals.")
+    first = create_quote(client, openapi)
+    prefix, year, seq = first["quote_no"].rsplit("-", 2)
+
+    def create(_):
+        r = client.post(f"{deals}/{first['deal_id']}/quotes", json={"scenario": "split"})
+        assert r.status_code == 200, r.text
+        return r.json()["quote_no"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        numbers = list(pool.map(create, range(16)))
+    # bez duplikatow i bez dziur - kolejne numery po pierwszej ofercie (rownolegle testy moga sie wciac)
+    assert len(set(numbers)) == len(numbers)
+    seqs = sorted(int(n.rsplit("-", 1)[1]) for n in numbers)
+    assert all(n.startswith(f"{prefix}-{year}-") for n in numbers)
+    assert seqs[0] > int(seq)
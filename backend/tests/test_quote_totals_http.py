@@ -0,0 +1,96 @@
+﻿from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests._helpers import create_quote, find_path
+
+def test_recalculate_totals_exact(client, openapi):
+    recalc = find_path(openapi, ["quoting", "quotes", "recalculate"], method="post")
+    if not recalc:
+        pytest.skip("Brak POST /quotes/{quote_id}/recalculate.")
+    quote = create_quote(client, openapi)
+    base = recalc.replace("/recalculate", "").replace("{quote_id}", quote["id"])
+
+    # pusta oferta: zera, bez dzielenia przez zero
+    r = client.post(f"{base}/recalculate")
+    assert r.status_code == 200, r.text
+    assert r.json()["sell_net"] == 0 and r.json()["margin_pct"] == 0
+
+    for line in [
+        {"line_type": "equipment", "name": "Jednostka zewnetrzna", "qty": 2, "purchase_price_net": 100, "markup_pct": 0.25},
+        {"line_type": "material", "name": "Rura Cu", "qty": 4, "purchase_price_net": 12.5, "markup_pct": 0.1},
+    ]:
+        r = client.post(f"{base}/lines", json=line)
+        assert r.status_code == 200, r.text
+    r = client.put(f"{base}/overheads", json=[{"overhead_type": "risk", "pct": 0.05}, {"overhead_type": "logistics", "pct": 0.03}])
+    assert r.status_code == 200, r.text
+
+    # drugi raz: upsert istniejacego wiersza quote_totals
+    r = client.post(f"{base}/recalculate")
+    assert r.status_code == 200, r.text
+    totals = r.json()
+    vat = round(329.4 * quote["vat_rate"], 4)
+    assert totals["cost_net"] == 250.0
+    assert totals["sell_net"] == 329.4
+    assert totals["vat_amount"] == vat
+    assert totals["sell_gross"] == round(329.4 + vat, 4)
+    assert totals["margin_net"] == 79.4
+    assert totals["margin_pct"] == round(79.4 / 329.4, 6)
+
+    r = client.post(recalc.replace("{quote_id}", "00000000-0000-0000-0000-000000000000"))
+    assert r.status_code == 404
+
+def test_totals_follow_line_edits(client, openapi):
+    totals = find_path(openapi, ["quoting", "quotes", "totals"], method="get")
+    if not totals:
+        pytest.skip("Brak GET /quotes/{quote_id}/totals.")
+    quote = create_quote(client, openapi)
+    base = totals.replace("/totals", "").replace("{quote_id}", quote["id"])
+
+    def _check():
+        stored = client.get(f"{base}/totals")
+        assert stored.status_code == 200, stored.text
+        full = client.post(f"{base}/recalculate")
+        assert full.status_code == 200, full.text
+        assert stored.json() == full.json()
+        return stored.json()
+
+    ids = []
+    for qty, price, markup in [(3, 33.3333, 0.2), (1.5, 999.99, 0.15), (12, 4.05, 0.3)]:
+        r = client.post(f"{base}/lines", json={"line_type": "material", "name": "x", "qty": qty, "purchase_price_net": price, "markup_pct": markup})
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+    _check()
+
+    r = client.put(f"{base}/lines/{ids[1]}", json={"line_type": "material", "name": "x", "qty": 2, "purchase_price_net": 1000.01, "markup_pct": 0.1})
+    assert r.status_code == 200, r.text
+    r = client.put(f"{base}/overheads", json=[{"overhead_type": "risk", "pct": 0.0333}])
+    assert r.status_code == 200, r.text
+    _check()
+
+    r = client.delete(f"{base}/lines/{ids[0]}")
+    assert r.status_code == 200, r.text
+    assert _check()["cost_net"] == round(2 * 1000.01 + 12 * 4.05, 4)
+
+def test_concurrent_line_updates_keep_totals(client, openapi):
+    totals = find_path(openapi, ["quoting", "quotes", "totals"], method="get")
+    if not totals:
+        pytest.skip("Brak GET /quotes/{quote_id}/totals.")
+    quote = create_quote(client, openapi)
+    base = totals.replace("/totals", "").replace("{quote_id}", quote["id"])
+
+    r = client.post(f"{base}/lines", json={"line_type": "material", "name": "x", "qty": 1, "purchase_price_net": 10, "markup_pct": 0.2})
+    assert r.status_code == 200, r.text
+    line_id = r.json()["id"]
+
+    # rownolegle PUT tej samej linii: kazda delta sum liczona od wartosci, ktora faktycznie nadpisuje
+    def _put(qty):
+        return client.put(f"{base}/lines/{line_id}", json={"line_type": "material", "name": "x", "qty": qty, "purchase_price_net": 10, "markup_pct": 0.2})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = [r.status_code for r in pool.map(_put, range(2, 18))]
+    assert all(s == 200 for s in statuses), statuses
+
+    stored = client.get(f"{base}/totals")
+    assert stored.status_code == 200, stored.text
+    full = client.post(f"{base}/recalculate")
+    assert full.status_code == 200, full.text
+    assert stored.json() == full.json()
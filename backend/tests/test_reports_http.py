@@ -1,4 +1,5 @@
-﻿import pytest
+﻿import time
+import pytest
 from tests._helpers import find_path
 
 def test_daily_report_returns_shape(client, openapi):
@@ -15,3 +16,58 @@ def test_daily_report_returns_shape(client, openapi):
     assert "employees" in j and isinstance(j["employees"], list)
     assert "sites" in j and isinstance(j["sites"], list)
     assert "crew_logs" in j and isinstance(j["crew_logs"], list)
+
+def test_daily_report_credits_every_member(client, openapi):
+    create_vehicle = find_path(openapi, ["timekeeping", "vehicles"], method="post", no_params=True)
+    create_site = find_path(openapi, ["timekeeping", "sites", "ad-hoc"], method="post", no_params=True)
+    create_employee = find_path(openapi, ["timekeeping", "employees"], method="post", no_params=True)
+    create_crewlog = find_path(openapi, ["timekeeping", "crew-logs"], method="post", no_params=True)
+    add_member = find_path(openapi, ["timekeeping", "crew-logs", "members"], method="post")
+    add_segment = find_path(openapi, ["timekeeping", "crew-logs", "segments"], method="post")
+    daily = find_path(openapi, ["timekeeping", "reports", "daily"], method="get", no_params=True)
+    rng = find_path(openapi, ["timekeeping", "reports", "range"], method="get", no_params=True)
+    if not all([create_vehicle, create_site, create_employee, create_crewlog, add_member, add_segment, daily, rng]):
+        pytest.skip("Brak wymaganych endpointow w OpenAPI.")
+
+    work_date = "2025-04-09"
+    r = client.post(create_vehicle, json={"plate": f"DAILY-{time.time_ns() % 10**10}", "make_model": "pytest"})
+    assert r.status_code in (200, 201), r.text
+    vehicle_id = r.json()["id"]
+    r = client.post(create_site, json={"name": "PY DAILY SITE", "lat": 50.0, "lng": 19.0, "radius_m": 200})
+    assert r.status_code in (200, 201), r.text
+    site_id = r.json()["id"]
+    employee_ids = []
+    for name in ("PY DAILY A", "PY DAILY B"):
+        r = client.post(create_employee, json={"full_name": name})
+        assert r.status_code in (200, 201), r.text
+        employee_ids.append(r.json()["id"])
+
+    r = client.post(create_crewlog, json={"work_date": work_date, "vehicle_id": vehicle_id, "created_by_employee_id": employee_ids[0]})
+    assert r.status_code in (200, 201), r.text
+    log_id = r.json()["id"]
+    for eid in employee_ids:
+        r = client.post(add_member.replace("{log_id}", str(log_id)), json={"employee_id": eid})
+        assert r.status_code in (200, 201), r.text
+    for seg_type, start, end in [("work", "08:00", "10:05"), ("travel", "10:05", "10:40")]:
+        r = client.post(add_segment.replace("{log_id}", str(log_id)), json={
+            "site_id": site_id, "segment_type": seg_type,
+            "start_at": f"{work_date}T{start}:00", "end_at": f"{work_date}T{end}:00",
+        })
+        assert r.status_code in (200, 201), r.text
+
+    r = client.get(daily, params={"work_date": work_date, "vehicle_id": vehicle_id})
+    assert r.status_code == 200, r.text
+    j = r.json()
+    # 125 min pracy / 35 min dojazdu -> kwadranse w gore; kazdy czlonek dostaje caly log
+    assert (j["work_minutes"], j["travel_minutes"], j["total_minutes"]) == (135, 45, 165)
+    employees = {e["employee_id"]: e for e in j["employees"]}
+    assert set(employees) == set(employee_ids)
+
+    r = client.get(rng, params={"date_from": work_date, "date_to": work_date, "vehicle_id": vehicle_id})
+    assert r.status_code == 200, r.text
+    range_employees = {e["employee_id"]: e for e in r.json()["employees"]}
+    for eid in employee_ids:
+        e = employees[eid]
+        assert (e["work_minutes"], e["travel_minutes"], e["minutes"]) == (135, 45, 165)
+        re_ = range_employees[eid]
+        assert (re_["work_minutes"], re_["travel_minutes"], re_["minutes"]) == (e["work_minutes"], e["travel_minutes"], e["minutes"])
@@ -0,0 +1,81 @@
+﻿import uuid
+import pytest
+from tests._helpers import create_quote, find_path
+
+def test_reprice_by_ref_id_updates_lines_and_totals(client, openapi):
+    reprice = find_path(openapi, ["quoting", "reprice"], method="post")
+    lines = find_path(openapi, ["quoting", "quotes", "lines"], method="get")
+    status = find_path(openapi, ["quoting", "deals", "status"], method="patch")
+    if not all([reprice, lines, status]):
+        pytest.skip("Brak POST /quoting/reprice.")
+    quote = create_quote(client, openapi)
+    base = lines.replace("/lines", "").replace("{quote_id}", quote["id"])
+    ref_id = str(uuid.uuid4())
+
+    for payload in [
+        {"line_type": "equipment", "name": "Agregat", "qty": 2, "purchase_price_net": 1000, "markup_pct": 0.2, "ref_id": ref_id},
+        {"line_type": "material", "name": "Rura", "qty": 10, "purchase_price_net": 7.5, "markup_pct": 0.2},
+    ]:
+        r = client.post(f"{base}/lines", json=payload)
+        assert r.status_code == 200, r.text
+
+    # dostawca podnosi cene o 8%
+    r = client.post(reprice, json={"ref_id": ref_id, "price_factor": 1.08})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"lines": 1, "quotes": 1}
+
+    rows = {l["name"]: l for l in client.get(f"{base}/lines").json()}
+    assert rows["Agregat"]["purchase_price_net"] == 1080.0
+    assert rows["Agregat"]["sell_price_net_unit"] == 1296.0
+    assert rows["Agregat"]["sell_price_net_total"] == 2592.0
+    assert rows["Rura"]["purchase_price_net"] == 7.5
+
+    stored = client.get(f"{base}/totals").json()
+    assert stored["sell_net"] == 2592.0 + 90.0
+    assert stored == client.post(f"{base}/recalculate").json()
+
+    # zamkniety deal nie jest przeceniany
+    r = client.patch(status.replace("{deal_id}", quote["deal_id"]), json={"status": "won"})
+    assert r.status_code == 200, r.text
+    r = client.post(reprice, json={"quote_ids": [quote["id"]], "markup_pct": 0.5})
+    assert r.json() == {"lines": 0, "quotes": 0}
+    r = client.post(reprice, json={"quote_ids": [quote["id"]], "markup_pct": 0.5, "include_closed": True})
+    assert r.json() == {"lines": 2, "quotes": 1}
+    assert client.get(f"{base}/totals").json()["sell_net"] == round(2 * 1620.0 + 10 * 11.25, 4)
+
+    r = client.post(reprice, json={"price_factor": 1.1, "purchase_price_net": 5})
+    assert r.status_code == 422
+    # bez filtra nie wolno ruszac wszystkich linii tenanta
+    for payload in [{"purchase_price_net": 5}, {}, {"quote_ids": [], "markup_pct": 0.3}]:
+        r = client.post(reprice, json=payload)
+        assert r.status_code == 422, (payload, r.text)
+
+def test_reprice_all_open_quotes_is_explicit(client, openapi):
+    reprice = find_path(openapi, ["quoting", "reprice"], method="post")
+    lines = find_path(openapi, ["quoting", "quotes", "lines"], method="get")
+    status = find_path(openapi, ["quoting", "deals", "status"], method="patch")
+    if not all([reprice, lines, status]):
+        pytest.skip("Brak POST /quoting/reprice.")
+    open_quote = create_quote(client, openapi)
+    won_quote = create_quote(client, openapi)
+    bases = {}
+    for q in (open_quote, won_quote):
+        bases[q["id"]] = lines.replace("/lines", "").replace("{quote_id}", q["id"])
+        r = client.post(f"{bases[q['id']]}/lines", json={"line_type": "material", "name": "Kanal", "qty": 4, "purchase_price_net": 50, "markup_pct": 0.2})
+        assert r.status_code == 200, r.text
+    r = client.patch(status.replace("{deal_id}", won_quote["deal_id"]), json={"status": "won"})
+    assert r.status_code == 200, r.text
+
+    for payload in [{"all_open_quotes": False, "markup_pct": 0.3}, {"all_open_quotes": True, "include_closed": True}]:
+        r = client.post(reprice, json=payload)
+        assert r.status_code == 422, (payload, r.text)
+
+    # nowy narzut na wszystkie otwarte oferty tenanta (takze innych testow), zamkniete bez zmian
+    r = client.post(reprice, json={"all_open_quotes": True, "markup_pct": 0.35})
+    assert r.status_code == 200, r.text
+    assert r.json()["lines"] >= 1 and r.json()["quotes"] >= 1
+
+    open_base, won_base = bases[open_quote["id"]], bases[won_quote["id"]]
+    assert client.get(f"{open_base}/lines").json()[0]["sell_price_net_total"] == 270.0
+    assert client.get(f"{won_base}/lines").json()[0]["sell_price_net_total"] == 240.0
+    assert client.get(f"{open_base}/totals").json() == client.post(f"{open_base}/recalculate").json()
@@ -0,0 +1,64 @@
+﻿import time
+import pytest
+from tests._helpers import find_path
+
+def test_slow_requests_list_and_summary(client, openapi):
+    lst = find_path(openapi, ["admin", "slow-requests"], method="get", no_params=True)
+    summary = find_path(openapi, ["admin", "slow-requests", "summary"], method="get", no_params=True)
+    if not lst or not summary:
+        pytest.skip("Brak endpointow dziennika wolnych requestow.")
+
+    r = client.get(lst, params={"include_sampled": "true", "limit": 5})
+    assert r.status_code == 200, r.text
+    rows = r.json()
+    assert isinstance(rows, list) and len(rows) <= 5
+    for row in rows:
+        assert {"route", "duration_ms", "db_ms", "query_count", "params"} <= set(row)
+        assert "statements" not in row
+
+    for group_by in ("route", "tenant", "range", "caller"):
+        r = client.get(summary, params={"group_by": group_by, "include_sampled": "true"})
+        assert r.status_code == 200, r.text
+        for g in r.json()["groups"]:
+            assert g["count"] > 0 and g["max_ms"] >= g["avg_ms"]
+
+    r = client.get(summary, params={"group_by": "nope"})
+    assert r.status_code == 422, r.text
+
+    if rows:
+        detail = find_path(openapi, ["admin", "slow-requests", "{"], method="get")
+        if detail:
+            r = client.get(detail.replace("{entry_id}", str(rows[0]["id"])))
+            assert r.status_code == 200, r.text
+            assert isinstance(r.json()["statements"], list)
+
+def test_slow_timekeeping_range_visible_to_admin(client, openapi):
+    lst = find_path(openapi, ["admin", "slow-requests"], method="get", no_params=True)
+    rng = find_path(openapi, ["timekeeping", "reports", "range"], method="get", no_params=True)
+    if not lst or not rng:
+        pytest.skip("Brak endpointow dziennika wolnych requestow / raportu zakresowego.")
+
+    # trasy timekeeping sa bez logowania - wpis ma tenant_id NULL, a admin i tak ma go widziec
+    date_to = f"2019-12-{1 + time.time_ns() % 28:02d}"
+    r = client.get(rng, params={"date_from": "2019-01-01", "date_to": date_to})
+    assert r.status_code == 200, r.text
+
+    for _ in range(20):  # zapis dziennika idzie po wyslaniu odpowiedzi
+        r = client.get(lst, params={"route": "/timekeeping/reports/range", "include_sampled": "true", "limit": 50})
+        assert r.status_code == 200, r.text
+        rows = [x for x in r.json() if (x["params"] or {}).get("query", {}).get("date_to") == date_to]
+        if rows:
+            break
+        time.sleep(0.2)
+    else:
+        pytest.skip("Request nie trafil do dziennika (szybszy niz SLOW_REQUEST_MS, bez probkowania).")
+    assert rows[0]["tenant_id"] is None and rows[0]["route"] == "/timekeeping/reports/range"
+    assert rows[0]["query_count"] > 0
+
+    # statements: miejsce wywolania dla kazdego zapisanego zapytania, nie tylko po przekroczeniu progu
+    detail = find_path(openapi, ["admin", "slow-requests", "{"], method="get")
+    if detail:
+        r = client.get(detail.replace("{entry_id}", str(rows[0]["id"])))
+        assert r.status_code == 200, r.text
+        statements = r.json()["statements"]
+        assert statements and all(st["caller"] and st["caller"].startswith("app/") for st in statements), statements
@@ -0,0 +1,68 @@
+﻿import time
+import pytest
+from tests._helpers import find_path
+
+WORK_DATE = "2025-04-16"
+LOGS = 6
+
+def _url(path: str, log_id) -> str:
+    return path.replace("{log_id}", str(log_id)).replace("{logId}", str(log_id))
+
+def test_day_report_query_count_does_not_grow_per_log(client, openapi):
+    create_vehicle = find_path(openapi, ["timekeeping", "vehicles"], method="post", no_params=True)
+    create_site = find_path(openapi, ["timekeeping", "sites", "ad-hoc"], method="post", no_params=True)
+    create_employee = find_path(openapi, ["timekeeping", "employees"], method="post", no_params=True)
+    create_crewlog = find_path(openapi, ["timekeeping", "crew-logs"], method="post", no_params=True)
+    add_member = find_path(openapi, ["timekeeping", "crew-logs", "members"], method="post")
+    add_segment = find_path(openapi, ["timekeeping", "crew-logs", "segments"], method="post")
+    day = find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True)
+    if not all([create_vehicle, create_site, create_employee, create_crewlog, add_member, add_segment, day]):
+        pytest.skip("Brak wymaganych endpointow w OpenAPI.")
+
+    r = client.get(day, params={"date": WORK_DATE})
+    assert r.status_code == 200, r.text
+    if "x-db-queries" not in r.headers:
+        pytest.skip("Serwer nie zwraca naglowkow X-DB-* (SQL_STATS_HEADERS wylaczone).")
+    baseline = int(r.headers["x-db-queries"])
+
+    r = client.post(create_site, json={"name": "PY SQL SITE", "lat": 50.0, "lng": 19.0, "radius_m": 200})
+    assert r.status_code in (200, 201), r.text
+    site_id = r.json()["id"]
+
+    for i in range(LOGS):
+        r = client.post(create_vehicle, json={"plate": f"SQL-{time.time_ns() % 10**9}-{i}", "make_model": "pytest"})
+        assert r.status_code in (200, 201), r.text
+        vehicle_id = r.json()["id"]
+        r = client.post(create_employee, json={"full_name": f"PY SQL EMP {i}"})
+        assert r.status_code in (200, 201), r.text
+        employee_id = r.json()["id"]
+        r = client.post(create_crewlog, json={"work_date": WORK_DATE, "vehicle_id": vehicle_id, "created_by_employee_id": employee_id})
+        assert r.status_code in (200, 201), r.text
+        log_id = r.json()["id"]
+        client.post(_url(add_member, log_id), json={"employee_id": employee_id})
+        r = client.post(_url(add_segment, log_id), json={
+            "site_id": site_id, "segment_type": "work",
+            "start_at": f"{WORK_DATE}T08:00:00", "end_at": f"{WORK_DATE}T12:00:00",
+        })
+        assert r.status_code in (200, 201), r.text
+
+    r = client.get(day, params={"date": WORK_DATE})
+    assert r.status_code == 200, r.text
+    assert len(r.json()["crew_logs"]) >= LOGS
+    # stala liczba zapytan na raport, nie na crew log
+    assert int(r.headers["x-db-queries"]) - baseline < LOGS, r.headers
+    assert int(r.headers["x-db-max-repeat"]) < LOGS, r.headers
+
+def test_strict_mode_over_budget_returns_500(client, openapi):
+    day = find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True)
+    if not day:
+        pytest.skip("Brak endpointu raportu dnia w OpenAPI.")
+
+    r = client.get(day, params={"date": WORK_DATE}, headers={"X-DB-Budget": "1000"})
+    assert r.status_code == 200, r.text
+
+    # auth + raport to wiecej niz 1 zapytanie; po 500 serwer zamyka polaczenie, wiec to ostatni request
+    r = client.get(day, params={"date": WORK_DATE}, headers={"X-DB-Budget": "1"})
+    if r.status_code == 200:
+        pytest.skip("Serwer nie dziala w SQL_STRICT z ENV=dev (X-DB-Budget nie jest wiazacy).")
+    assert r.status_code == 500, r.text
@@ -0,0 +1,56 @@
+﻿import time
+import pytest
+from tests._helpers import find_path, login_client
+
+def _new_user(client, openapi, prefix):
+    create_user = find_path(openapi, ["admin", "users"], method="post", no_params=True)
+    email = f"{prefix}-{time.time_ns()}@example.com"
+    r = client.post(create_user, json={"email": email, "password": "Secret123!", "role": "sales"})
+    assert r.status_code == 200, r.text
+    return email
+
+def test_logout_revokes_all_sessions(client, openapi, base_url):
+    login = find_path(openapi, ["auth", "login"], method="post")
+    logout = find_path(openapi, ["auth", "logout"], method="post")
+    refresh = find_path(openapi, ["auth", "refresh"], method="post")
+    clients = find_path(openapi, ["crm", "clients"], method="get", no_params=True)
+    if not all([login, logout, refresh, clients]):
+        pytest.skip("Brak endpointow auth.")
+
+    email = _new_user(client, openapi, "revoke")
+    phone = login_client(base_url, login, email, "Secret123!")
+    laptop = login_client(base_url, login, email, "Secret123!")
+    for _ in range(2):  # drugi raz z cache tokenow
+        assert phone.get(clients).status_code == 200
+
+    r = laptop.post(logout)
+    assert r.status_code == 200, r.text
+
+    assert phone.get(clients).status_code == 401
+    assert phone.post(refresh).status_code == 401
+
+    again = login_client(base_url, login, email, "Secret123!")
+    assert again.get(clients).status_code == 200
+
+def test_password_change_revokes_other_sessions(client, openapi, base_url):
+    login = find_path(openapi, ["auth", "login"], method="post")
+    change = find_path(openapi, ["auth", "password"], method="post")
+    clients = find_path(openapi, ["crm", "clients"], method="get", no_params=True)
+    if not all([login, change, clients]):
+        pytest.skip("Brak POST /auth/password.")
+
+    email = _new_user(client, openapi, "passwd")
+    phone = login_client(base_url, login, email, "Secret123!")
+    laptop = login_client(base_url, login, email, "Secret123!")
+
+    r = laptop.post(change, json={"current_password": "wrong-one", "new_password": "Another123!"})
+    assert r.status_code == 400, r.text
+    assert phone.get(clients).status_code == 200
+
+    r = laptop.post(change, json={"current_password": "Secret123!", "new_password": "Another123!"})
+    assert r.status_code == 200, r.text
+    laptop.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+
+    assert phone.get(clients).status_code == 401
+    assert laptop.get(clients).status_code == 200
+    login_client(base_url, login, email, "Another123!")
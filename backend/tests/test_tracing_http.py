@@ -0,0 +1,27 @@
+﻿import pytest
+from tests._helpers import find_path
+
+def _server_timing(r) -> list[str]:
+    return [part.split(";")[0].strip() for part in r.headers.get("server-timing", "").split(",") if part.strip()]
+
+def test_trace_covers_handler_in_threadpool(client, openapi):
+    day = find_path(openapi, ["timekeeping", "reports", "day"], method="get", no_params=True)
+    if not day:
+        pytest.skip("Brak endpointu /timekeeping/reports/day.")
+
+    r = client.get(day, params={"date": "2025-06-02"})
+    assert r.status_code == 200, r.text
+    trace_id = r.headers.get("x-trace-id")
+    if not trace_id:
+        pytest.skip("Tracing wylaczony (TRACE_EXPORT).")
+    assert len(trace_id) == 32
+
+    # report_day to sync def - wykonuje sie w threadpoolu; jego spany trafiaja do trace requestu
+    # (Server-Timing) tylko wtedy, gdy ContextVar z rodzicem przeszedl do watku
+    names = _server_timing(r)
+    assert {"route", "handler", "validate", "day.query", "day.aggregate"} <= set(names), names
+
+    # kazdy request to osobny trace
+    r2 = client.get(day, params={"date": "2025-06-02"})
+    assert r2.headers["x-trace-id"] != trace_id
+    assert "day.query" in _server_timing(r2)